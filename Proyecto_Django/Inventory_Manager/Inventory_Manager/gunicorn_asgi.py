@@ -0,0 +1,16 @@
+# Perfil de despliegue ASGI (gunicorn + workers de uvicorn):
+#   gunicorn -c Inventory_Manager/gunicorn_asgi.py Inventory_Manager.asgi:application
+# Las rutas /api/async/ atienden muchas peticiones simultáneas por worker; las
+# vistas síncronas de DRF siguen funcionando y se ejecutan en un hilo aparte.
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+worker_class = 'uvicorn.workers.UvicornWorker'
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+# Las búsquedas lentas no deben cortarse antes que el cliente
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+keepalive = 5
+# Reinicia cada worker periódicamente para acotar el crecimiento de memoria
+max_requests = 10000
+max_requests_jitter = 1000
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -45,11 +46,15 @@ INSTALLED_APPS = [
     'corsheaders', # Include the app in the project
     'rest_framework', # Include the app in the project
     'my_api', # Include the app in the project
+    'tareas', # Cola de tareas en segundo plano
     'rest_framework_simplejwt.token_blacklist',
 ]
 
 MIDDLEWARE = [
+    'my_api.middleware.MetricasMiddleware', # Latencia y consultas por vista (/api/metrics)
+    'my_api.middleware.ReplicasMiddleware', # Lecturas en réplicas; primaria tras escribir
     'django.middleware.security.SecurityMiddleware',
+    'my_api.middleware.CompresionMiddleware', # gzip/brotli para respuestas grandes
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware', # Include the middleware in the project
     'django.middleware.common.CommonMiddleware',
@@ -92,9 +97,124 @@ DATABASES = {
         'PASSWORD': 'admin123',    # Contraseña del usuario
         'HOST': 'localhost',         # Dirección del servidor
         'PORT': '5432',              # Puerto de PostgreSQL
+        # Conexiones persistentes: se reutilizan entre peticiones y se
+        # comprueban antes de usarlas. Con ASGI use DB_CONN_MAX_AGE=0 o el pool.
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Pool de conexiones de psycopg 3 (pip install "psycopg[pool]"): DB_POOL=1.
+# Reemplaza a las conexiones persistentes.
+if os.environ.get('DB_POOL'):
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': int(os.environ.get('DB_POOL_MIN', 2)),
+            'max_size': int(os.environ.get('DB_POOL_MAX', 10)),
+            'timeout': 10,  # Segundos de espera por una conexión libre
+        },
+    }
+
+# Réplicas de lectura (my_api/replicas.py): DB_REPLICAS=host1,host2. Usan la
+# configuración de la primaria con otro HOST; en pruebas apuntan a la primaria.
+for numero, host in enumerate(filter(None, os.environ.get('DB_REPLICAS', '').split(',')), start=1):
+    DATABASES[f'replica{numero}'] = {**DATABASES['default'], 'HOST': host.strip(), 'TEST': {'MIRROR': 'default'}}
+
+# Base de datos SQLite local (pruebas de carga sin PostgreSQL):
+# INVENTARIO_SQLITE=/ruta/inventario.sqlite3 python manage.py migrate
+# INVENTARIO_SQLITE_REPLICAS=/ruta/copia1.sqlite3,/ruta/copia2.sqlite3 simula réplicas
+if os.environ.get('INVENTARIO_SQLITE'):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ['INVENTARIO_SQLITE'],
+        }
+    }
+    for numero, ruta in enumerate(filter(None, os.environ.get('INVENTARIO_SQLITE_REPLICAS', '').split(',')), start=1):
+        DATABASES[f'replica{numero}'] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': ruta.strip(),
+            'TEST': {'MIRROR': 'default'},
+        }
+
+DATABASE_ROUTERS = ['my_api.replicas.RouterReplicas']
+
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# La caché local sirve para desarrollo y pruebas; en producción debe usarse una
+# caché compartida entre procesos (por ejemplo django.core.cache.backends.redis.RedisCache)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'inventario',
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    }
+}
+
+# Caché de productos para lecturas por código e id (my_api/cache_productos.py)
+CACHE_PRODUCTOS = {
+    'LOCAL_MAX': 10000,  # Entradas en memoria de cada proceso
+    'LOCAL_TTL': 5,  # Segundos en memoria del proceso
+    'COMPARTIDA_TTL': 300,  # Segundos en la caché compartida
+}
+
+# Facetas de la búsqueda avanzada con ?facetas=true (my_api/facetas.py)
+FACETAS = {
+    'TRAMOS_PRECIO': [10, 50, 100, 500],  # Límites del histograma de precios
+    'STOCK_BAJO': 10,  # Stock máximo para contar un producto como "bajo"
+    'TTL': 300,  # Segundos en la caché compartida por combinación de filtros
+}
+
+# Compresión de respuestas (my_api/middleware.py)
+COMPRESION = {
+    'TAMANO_MINIMO': 1024,  # Bytes
+    'NIVEL_BROTLI': 5,  # Requiere el paquete brotli; sin él solo se usa gzip
+}
+
+# Métricas por vista (my_api/metricas.py)
+METRICAS = {
+    'PRESUPUESTO_CONSULTAS': 30,  # Se registra una advertencia por encima de este número de consultas
+    'TOKEN': os.environ.get('METRICAS_TOKEN'),  # Bearer para /api/metrics; sin él solo con DEBUG
+}
+
+# Usuarios autenticados por JWT (usuarios/authentication.py)
+CACHE_USUARIOS = {
+    'TTL': 60,  # Segundos; los cambios hechos con save() se aplican de inmediato
+}
+
+# Sincronización incremental (my_api/sincronizacion.py)
+SINCRONIZACION = {
+    'LIMITE': 500,  # Filas por colección en cada respuesta
+    'LIMITE_MAXIMO': 1000,
+    'MARGEN_SEGUNDOS': 5,  # Los cambios más recientes se entregan en la siguiente llamada
+    'RETENCION_DIAS': 90,  # Días que se conservan los registros de borrado
+}
+
+# Réplicas de lectura (my_api/replicas.py)
+REPLICAS = {
+    'FIJAR_SEGUNDOS': 5,  # Tras escribir, el cliente lee de la primaria durante este tiempo
+    'SALUD_SEGUNDOS': 10,  # Frecuencia con que cada proceso comprueba sus réplicas
+    'RETRASO_MAXIMO': 30,  # Una réplica con más retraso (segundos) no recibe lecturas
+}
+
+# Archivado de movimientos antiguos (my_api/archivo.py, comando archivar_movimientos)
+ARCHIVO = {
+    'RETENCION_DIAS': 365,  # Días de movimientos que quedan en movimientos_inventario
+    'BLOQUE': 10000,  # Movimientos trasladados por transacción
+}
+
+# Cola de tareas en segundo plano (tareas/, comando trabajador_tareas)
+TAREAS = {
+    'PROCESOS': 2,  # Procesos del trabajador
+    'MAX_INTENTOS': 3,
+    'REINTENTO_SEGUNDOS': 30,  # Espera antes del primer reintento; se duplica en cada uno
+    'DIRECTORIO': BASE_DIR / 'tareas_archivos',  # Archivos de importaciones y exportaciones
+    'RETENCION_DIAS': 7,  # Tareas terminadas que conserva purgar_tareas
+}
 
 
 # Password validation
@@ -117,11 +237,37 @@ AUTH_PASSWORD_VALIDATORS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'usuarios.authentication.CachedJWTAuthentication',  # JWT con el usuario en caché
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # JSON con orjson (si está instalado); los Decimal se envían como texto
+    'DEFAULT_RENDERER_CLASSES': (
+        'my_api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'my_api.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+    # Cubeta de fichas por usuario (o IP) y alcance, en la caché compartida
+    'DEFAULT_THROTTLE_CLASSES': (
+        'my_api.limites.LimiteCubeta',
+    ),
+}
+
+# Límites de peticiones (my_api/limites.py): alcance -> (capacidad, fichas por segundo)
+LIMITES = {
+    'ACTIVO': True,
+    'EXENTOS_STAFF': True,
+    'ALCANCES': {
+        'lectura': (120, 20),
+        'escritura': (30, 5),
+        'codigo': (60, 20),
+        'token': (10, 0.2),
+    },
 }
 
 from datetime import timedelta
@@ -1,23 +1,41 @@
 from django.contrib import admin
 from django.urls import path
-from my_api import views
-from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
-    TokenRefreshView,
-)
-from my_api.views import CustomTokenRefreshView, ProductoBusquedaAvanzadaView, ProductoPorCodigoView, CategoriaListView
+from my_api import views, vistas_asincronas
+from tareas import views as tareas_views
+from my_api.views import CustomTokenObtainPairView, CustomTokenRefreshView, ProductoBusquedaAvanzadaView, ProductoPorCodigoView, CategoriaListView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/productos/', views.ProductoListCreateView.as_view(), name='producto_list_create'),
     path('api/productos/<int:pk>/', views.ProductoDetailView.as_view(), name='producto_detail'),
     path('api/movimientos/', views.MovimientoListCreateView.as_view(), name='movimiento_list_create'),
+    path('api/movimientos/lote/', views.MovimientoLoteView.as_view(), name='movimiento_lote'),
     path('api/movimientos/<int:pk>/', views.MovimientoDetailView.as_view(), name='movimiento_detail'),
-    path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('api/token/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', CustomTokenRefreshView.as_view(), name='token_refresh'),
+    path('api/productos/importar/', views.ProductoImportacionView.as_view(), name='producto_importar'),
     path('api/productos/busqueda/', ProductoBusquedaAvanzadaView.as_view(), name='producto_busqueda_avanzada'),
     path('api/products/<int:pk>/', views.ProductoDetailView.as_view(), name='producto_detail'),
     path('api/movimientos/busqueda/', views.MovimientoBusquedaView.as_view(), name='movimiento_busqueda'),
+    path('api/productos/codigos/', views.ProductosPorCodigosView.as_view(), name='productos_por_codigos'),
     path('api/productos/codigo/<path:codigo>/', ProductoPorCodigoView.as_view(), name='producto_por_codigo'),
     path('api/categorias/', CategoriaListView.as_view(), name='categoria_list'),
+    path('api/reportes/kardex/<int:producto_id>/', views.KardexView.as_view(), name='reporte_kardex'),
+    path('api/reportes/resumen/', views.ResumenMovimientosView.as_view(), name='reporte_resumen'),
+    path('api/reportes/tablero/', views.TableroView.as_view(), name='reporte_tablero'),
+    path('api/productos/reorden/', views.ProductoReordenView.as_view(), name='producto_reorden'),
+    path('api/exportar/movimientos/', views.ExportarMovimientosView.as_view(), name='exportar_movimientos'),
+    path('api/exportar/productos/', views.ExportarProductosView.as_view(), name='exportar_productos'),
+    path('api/sync/', views.SincronizacionView.as_view(), name='sincronizacion'),
+    path('api/metrics', views.MetricasView.as_view(), name='metricas'),
+    # Tareas en segundo plano (importaciones, exportaciones y mantenimiento)
+    path('api/tareas/', tareas_views.TareaListCreateView.as_view(), name='tarea_list_create'),
+    path('api/tareas/<int:pk>/', tareas_views.TareaDetailView.as_view(), name='tarea_detalle'),
+    path('api/tareas/<int:pk>/cancelar/', tareas_views.TareaCancelarView.as_view(), name='tarea_cancelar'),
+    path('api/tareas/<int:pk>/descarga/', tareas_views.TareaDescargaView.as_view(), name='tarea_descarga'),
+    # Variantes asíncronas para despliegues ASGI
+    path('api/async/productos/busqueda/', vistas_asincronas.ProductoBusquedaAsincronaView.as_view(), name='async_producto_busqueda'),
+    path('api/async/movimientos/busqueda/', vistas_asincronas.MovimientoBusquedaAsincronaView.as_view(), name='async_movimiento_busqueda'),
+    path('api/async/productos/codigo/<path:codigo>/', vistas_asincronas.ProductoPorCodigoAsincronaView.as_view(), name='async_producto_por_codigo'),
+    path('api/async/categorias/', vistas_asincronas.CategoriaListAsincronaView.as_view(), name='async_categoria_list'),
 ]
\ No newline at end of file
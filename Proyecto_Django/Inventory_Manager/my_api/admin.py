@@ -1,5 +1,9 @@
+from django import forms
 from django.contrib import admin
+from django.db import transaction
 from .models import Producto, Movimiento, Categoria
+from .pagination import PaginadorEstimado
+from .services import delta_stock, registrar_movimiento, actualizar_movimiento, eliminar_movimiento
 
 @admin.register(Categoria)
 class CategoriaAdmin(admin.ModelAdmin):
@@ -12,13 +16,67 @@ class CategoriaAdmin(admin.ModelAdmin):
 @admin.register(Producto)
 class ProductoAdmin(admin.ModelAdmin):
     list_display = ('nombre', 'precio', 'stock', 'categoria', 'fecha_creacion')
+    list_select_related = ('categoria',)
     search_fields = ('nombre', 'categoria__nombre')
-    list_filter = ('categoria', 'fecha_creacion')
+    list_filter = ('categoria',)
+    date_hierarchy = 'fecha_creacion'  # Filtra por rangos sobre producto_creacion_idx
     ordering = ('nombre',)
+    autocomplete_fields = ('categoria',)
+    paginator = PaginadorEstimado
+    show_full_result_count = False  # Evita un segundo COUNT(*) al filtrar
+
+    # El stock inicial se fija al crear; después solo cambia con movimientos
+    def get_readonly_fields(self, request, obj=None):
+        return ('stock',) if obj is not None else ()
+
+
+# Formulario de movimientos: valida la cantidad según el tipo
+class MovimientoAdminForm(forms.ModelForm):
+    class Meta:
+        model = Movimiento
+        fields = '__all__'
+
+    def clean(self):
+        datos = super().clean()
+        producto = datos.get('producto')
+        delta = delta_stock(datos.get('tipo'), datos.get('cantidad') or 0)
+        if delta is None:
+            self.add_error('cantidad', 'Cantidad no válida para el tipo de movimiento.')
+        elif producto is not None:
+            # Comprobación previa para mostrar el error en el formulario;
+            # el servicio vuelve a validarlo de forma atómica al guardar
+            disponible = producto.stock
+            if self.instance.pk and self.instance.producto_id == producto.pk:
+                disponible -= delta_stock(self.instance.tipo, self.instance.cantidad) or 0
+            if disponible + delta < 0:
+                self.add_error('cantidad', 'No hay suficiente stock para realizar esta salida.')
+        return datos
 
 
 @admin.register(Movimiento)
 class MovimientoAdmin(admin.ModelAdmin):
+    form = MovimientoAdminForm
     list_display = ('producto', 'tipo', 'cantidad', 'fecha')
+    list_select_related = ('producto',)
     search_fields = ('producto__nombre',)
-    list_filter = ('tipo', 'fecha')
\ No newline at end of file
+    list_filter = ('tipo',)
+    date_hierarchy = 'fecha'  # Filtra por rangos sobre movimiento_fecha_idx
+    ordering = ('-fecha', '-id')
+    autocomplete_fields = ('producto',)  # No carga todos los productos en un <select>
+    paginator = PaginadorEstimado
+    show_full_result_count = False
+
+    # Todas las escrituras pasan por el servicio de stock
+    def save_model(self, request, obj, form, change):
+        if change:
+            actualizar_movimiento(obj)
+        else:
+            registrar_movimiento(obj)
+
+    def delete_model(self, request, obj):
+        eliminar_movimiento(obj)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            for movimiento in queryset:
+                eliminar_movimiento(movimiento)
\ No newline at end of file
@@ -0,0 +1,131 @@
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connection, transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .filtros import rango_fechas
+from .models import CorteArchivo, Movimiento, MovimientoArchivado, MovimientoDiario, MovimientoHistorico, Producto, SaldoApertura
+
+
+# Configuración por defecto; puede sobrescribirse con ARCHIVO en settings
+CONFIGURACION = {
+    'RETENCION_DIAS': 365,  # Los movimientos más antiguos se archivan
+    'BLOQUE': 10000,  # Movimientos trasladados por transacción
+}
+
+
+def configuracion(clave):
+    return getattr(settings, 'ARCHIVO', {}).get(clave, CONFIGURACION[clave])
+
+
+CLAVE_CORTE = 'archivo:corte'
+
+
+# Fecha del último corte (None si nunca se archivó), guardada en la caché
+# compartida; se lee de la base primaria para no guardar el de una réplica atrasada
+def corte_actual():
+    corte = cache.get(CLAVE_CORTE)
+    if corte is None:
+        corte = CorteArchivo.objects.using(DEFAULT_DB_ALIAS).order_by('-fecha_corte').values_list('fecha_corte', flat=True).first() or False
+        cache.set(CLAVE_CORTE, corte, None)
+    return corte or None
+
+
+# Las búsquedas leen solo movimientos_inventario, salvo que el rango de fechas
+# empiece antes del corte (o no tenga inicio pero sí fin), o se pida
+# ?historico=true
+def incluye_archivo(params):
+    corte = corte_actual()
+    if corte is None:
+        return False
+    if params.get('historico') in ('1', 'true'):
+        return True
+    desde, hasta = rango_fechas(params)
+    if desde is None:
+        return hasta is not None
+    return desde < corte
+
+
+# Modelo a consultar para una búsqueda de movimientos
+def movimientos(params):
+    return MovimientoHistorico.objects.all() if incluye_archivo(params) else Movimiento.objects.all()
+
+
+# Traslada a movimientos_archivados los movimientos anteriores al día `dia`
+# (medianoche local, así el corte coincide con el resumen diario) y registra
+# el saldo de apertura de cada producto. Devuelve los movimientos archivados.
+def archivar(dia, bloque=None):
+    bloque = bloque or configuracion('BLOQUE')
+    corte = timezone.make_aware(datetime.combine(dia, time.min))
+    anterior = corte_actual()
+    if anterior is not None and corte < anterior:
+        raise ValueError(f'El corte no puede ser anterior al último ({timezone.localdate(anterior)})')
+
+    # El corte se registra antes de mover el primer bloque: si el proceso se
+    # interrumpe, las búsquedas ya incluyen los movimientos archivados, y
+    # volver a ejecutar con el mismo día continúa donde quedó
+    with transaction.atomic():
+        registro, _ = CorteArchivo.objects.get_or_create(fecha_corte=corte, defaults={'movimientos': 0})
+        _olvidar_corte()
+
+    tabla = MovimientoArchivado._meta.db_table
+    pendientes = Movimiento.objects.filter(fecha__lt=corte).order_by('id')
+    total, ultimo = 0, 0
+    while True:
+        ids = list(pendientes.filter(id__gt=ultimo).values_list('id', flat=True)[:bloque])
+        if not ids:
+            break
+        ultimo = ids[-1]
+        lote = Movimiento.objects.filter(id__gte=ids[0], id__lte=ultimo, fecha__lt=corte)
+        consulta, parametros = lote.values_list('id', 'producto_id', 'tipo', 'cantidad', 'fecha').query.sql_with_params()
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'INSERT INTO {tabla} (id, producto_id, tipo, cantidad, fecha) {consulta}', parametros)
+            movidos = lote.delete()[0]
+            CorteArchivo.objects.filter(pk=registro.pk).update(movimientos=F('movimientos') + movidos)
+            total += movidos
+
+    with transaction.atomic():
+        registrar_saldos(corte)
+    return total
+
+
+def _olvidar_corte():
+    cache.delete(CLAVE_CORTE)
+    transaction.on_commit(lambda: cache.delete(CLAVE_CORTE))
+
+
+# Saldo al corte de los productos con movimientos anteriores: el stock actual
+# menos la variación neta de los días posteriores (desde el resumen diario)
+def registrar_saldos(corte, bloque=5000):
+    dia = timezone.localdate(corte)
+    posteriores = (
+        MovimientoDiario.objects.filter(producto=OuterRef('pk'), dia__gte=dia).order_by().values('producto')
+        .annotate(neto=Sum(F('entradas') - F('salidas') + F('ajustes'))).values('neto')
+    )
+    saldos = (
+        Producto.objects.filter(id__in=MovimientoDiario.objects.filter(dia__lt=dia).values('producto'))
+        .annotate(saldo=F('stock') - Coalesce(Subquery(posteriores), 0))
+        .order_by('id').values_list('id', 'saldo')
+    )
+    filas = []
+    for producto_id, saldo in saldos.iterator(chunk_size=bloque):
+        filas.append(SaldoApertura(producto_id=producto_id, fecha_corte=corte, saldo=saldo))
+        if len(filas) == bloque:
+            _guardar_saldos(filas)
+            filas = []
+    _guardar_saldos(filas)
+
+
+def _guardar_saldos(filas):
+    SaldoApertura.objects.bulk_create(
+        filas, update_conflicts=True, unique_fields=['producto'], update_fields=['fecha_corte', 'saldo'],
+    )
+
+
+# Día de corte para una retención en días
+def dia_de_corte(dias=None):
+    return timezone.localdate() - timedelta(days=dias or configuracion('RETENCION_DIAS'))
@@ -0,0 +1,321 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from .models import Categoria, Producto
+from . import condicional
+
+
+# Configuración por defecto; puede sobrescribirse con CACHE_PRODUCTOS en settings
+CONFIGURACION = {
+    'LOCAL_MAX': 10000,  # Entradas en la caché del proceso
+    'LOCAL_TTL': 5,  # Segundos; acota cuánto puede atrasarse otro proceso tras una invalidación
+    'COMPARTIDA_TTL': 300,  # Segundos en la caché compartida (settings.CACHES)
+}
+
+
+def configuracion(clave):
+    return getattr(settings, 'CACHE_PRODUCTOS', {}).get(clave, CONFIGURACION[clave])
+
+
+# Lo que llena la caché compartida se lee siempre de la base primaria: una
+# réplica atrasada dejaría en ella el valor anterior a una escritura ya
+# invalidada, durante COMPARTIDA_TTL
+PRIMARIA = DEFAULT_DB_ALIAS
+
+
+# Caché LRU en memoria del proceso con expiración por entrada
+class CacheLRU:
+    def __init__(self, maximo, ttl):
+        self.maximo = maximo
+        self.ttl = ttl
+        self._datos = OrderedDict()
+        self._candado = threading.Lock()
+
+    def get(self, clave):
+        with self._candado:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return None
+            valor, vence = entrada
+            if vence < time.monotonic():
+                del self._datos[clave]
+                return None
+            self._datos.move_to_end(clave)
+            return valor
+
+    def set(self, clave, valor):
+        with self._candado:
+            self._datos[clave] = (valor, time.monotonic() + self.ttl)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.maximo:
+                self._datos.popitem(last=False)
+
+    def delete(self, clave):
+        with self._candado:
+            self._datos.pop(clave, None)
+
+    def clear(self):
+        with self._candado:
+            self._datos.clear()
+
+
+local = CacheLRU(configuracion('LOCAL_MAX'), configuracion('LOCAL_TTL'))
+
+# Contadores de aciertos por nivel
+_contadores = {'local': 0, 'compartida': 0, 'fallos': 0}
+_candado_contadores = threading.Lock()
+
+
+def _contar(nivel):
+    with _candado_contadores:
+        _contadores[nivel] += 1
+
+
+def estadisticas():
+    with _candado_contadores:
+        datos = dict(_contadores)
+    total = sum(datos.values())
+    datos['total'] = total
+    datos['tasa_aciertos'] = (datos['local'] + datos['compartida']) / total if total else 0.0
+    return datos
+
+
+def reiniciar_estadisticas():
+    with _candado_contadores:
+        for nivel in _contadores:
+            _contadores[nivel] = 0
+
+
+def clave_id(pk):
+    return f'producto:id:{pk}'
+
+
+def clave_codigo(codigo):
+    return f'producto:codigo:{codigo}'
+
+
+def clave_categoria(pk):
+    return f'categoria:nombre:{pk}'
+
+
+def clave_version(clave):
+    return f'{clave}:version'
+
+
+# Cada clave de la caché compartida tiene una versión que las escrituras
+# cambian al invalidar; el valor se guarda junto con la versión leída antes de
+# consultar la base. Un llenado que termina después de una invalidación deja
+# una versión vieja y las lecturas lo tratan como un fallo, en lugar de
+# servir el valor anterior durante COMPARTIDA_TTL.
+def _vigente(valores, clave):
+    version, entrada = valores.get(clave_version(clave)), valores.get(clave)
+    if version is None or entrada is None or entrada[0] != version:
+        return None
+    return entrada[1]
+
+
+# Versión con la que se guarda un llenado; si la clave aún no tiene una se crea
+# con un valor nuevo, y si otro proceso la crea a la vez no se guarda nada
+def _version_de_llenado(valores, clave):
+    version = valores.get(clave_version(clave))
+    if version is None:
+        version = time.time_ns()
+        if not cache.add(clave_version(clave), version, None):
+            return None
+    return version
+
+
+async def _aversion_de_llenado(valores, clave):
+    version = valores.get(clave_version(clave))
+    if version is None:
+        version = time.time_ns()
+        if not await cache.aadd(clave_version(clave), version, None):
+            return None
+    return version
+
+
+# Lectura en dos niveles: proceso y caché compartida; `cargar` se llama en un
+# fallo. Devuelve (valor, nivel) donde nivel es 'local', 'compartida' o 'fallos'.
+def _leer(clave, cargar):
+    valor = local.get(clave)
+    if valor is not None:
+        return valor, 'local'
+    valores = cache.get_many([clave, clave_version(clave)])
+    valor = _vigente(valores, clave)
+    nivel = 'compartida'
+    if valor is None:
+        nivel = 'fallos'
+        valor = cargar()
+        if valor is None:
+            return None, nivel
+        version = _version_de_llenado(valores, clave)
+        if version is not None:
+            cache.set(clave, (version, valor), configuracion('COMPARTIDA_TTL'))
+    local.set(clave, valor)
+    return valor, nivel
+
+
+# Nivel más lento de una lectura compuesta
+def _peor(*niveles):
+    for nivel in ('fallos', 'compartida'):
+        if nivel in niveles:
+            return nivel
+    return 'local'
+
+
+# La búsqueda por código guarda también el producto en la caché del proceso;
+# la compartida se llena por id, con su propia versión
+def _guardar(producto):
+    from .serializers import ProductoSerializer  # serializers -> services -> este módulo
+    datos = dict(ProductoSerializer(producto).data)
+    # El nombre de la categoría se resuelve al leer, así renombrar una
+    # categoría no obliga a invalidar todos sus productos
+    datos.pop('categoria_nombre', None)
+    local.set(clave_id(producto.pk), datos)
+    return datos
+
+
+def _con_categoria(datos):
+    datos = dict(datos)
+    if datos['categoria'] is not None:
+        def cargar():
+            return {'nombre': Categoria.objects.using(PRIMARIA).filter(pk=datos['categoria']).values_list('nombre', flat=True).first()}
+        nombre = _leer(clave_categoria(datos['categoria']), cargar)[0]['nombre']
+        if nombre is not None:
+            datos['categoria_nombre'] = nombre
+    return datos
+
+
+def _cargar_producto(**filtro):
+    producto = Producto.objects.using(PRIMARIA).select_related('categoria').filter(**filtro).first()
+    return _guardar(producto) if producto else None
+
+
+# Producto serializado (formato de ProductoSerializer) o None si no existe
+def producto_por_id(pk):
+    datos, nivel = _leer(clave_id(pk), lambda: _cargar_producto(pk=pk))
+    _contar(nivel)
+    return _con_categoria(datos) if datos else None
+
+
+def producto_por_codigo(codigo, reintentar=True):
+    cargados = {}
+
+    def cargar():
+        cargados['datos'] = _cargar_producto(codigo=codigo)
+        return cargados['datos']['id'] if cargados['datos'] else None
+
+    pk, nivel_codigo = _leer(clave_codigo(codigo), cargar)
+    if pk is None:
+        _contar(nivel_codigo)
+        return None
+    if 'datos' in cargados:
+        datos, nivel = cargados['datos'], nivel_codigo
+    else:
+        datos, nivel_id = _leer(clave_id(pk), lambda: _cargar_producto(pk=pk))
+        nivel = _peor(nivel_codigo, nivel_id)
+    if datos is None or datos['codigo'] != codigo:
+        # El código cambió desde que se guardó el puntero: se vuelve a consultar
+        _borrar(clave_codigo(codigo))
+        return producto_por_codigo(codigo, reintentar=False) if reintentar else None
+    _contar(nivel)
+    return _con_categoria(datos)
+
+
+# Variantes asíncronas para las vistas ASGI: mismas claves y formato, con la
+# caché compartida y la base de datos consultadas con la API async de Django
+async def _aleer(clave, acargar):
+    valor = local.get(clave)
+    if valor is not None:
+        return valor, 'local'
+    valores = await cache.aget_many([clave, clave_version(clave)])
+    valor = _vigente(valores, clave)
+    nivel = 'compartida'
+    if valor is None:
+        nivel = 'fallos'
+        valor = await acargar()
+        if valor is None:
+            return None, nivel
+        version = await _aversion_de_llenado(valores, clave)
+        if version is not None:
+            await cache.aset(clave, (version, valor), configuracion('COMPARTIDA_TTL'))
+    local.set(clave, valor)
+    return valor, nivel
+
+
+async def _acon_categoria(datos):
+    datos = dict(datos)
+    if datos['categoria'] is not None:
+        async def acargar():
+            return {'nombre': await Categoria.objects.using(PRIMARIA).filter(pk=datos['categoria']).values_list('nombre', flat=True).afirst()}
+        nombre = (await _aleer(clave_categoria(datos['categoria']), acargar))[0]['nombre']
+        if nombre is not None:
+            datos['categoria_nombre'] = nombre
+    return datos
+
+
+async def _acargar_producto(**filtro):
+    producto = await Producto.objects.using(PRIMARIA).select_related('categoria').filter(**filtro).afirst()
+    return _guardar(producto) if producto else None
+
+
+async def aproducto_por_codigo(codigo, reintentar=True):
+    cargados = {}
+
+    async def acargar():
+        cargados['datos'] = await _acargar_producto(codigo=codigo)
+        return cargados['datos']['id'] if cargados['datos'] else None
+
+    pk, nivel_codigo = await _aleer(clave_codigo(codigo), acargar)
+    if pk is None:
+        _contar(nivel_codigo)
+        return None
+    if 'datos' in cargados:
+        datos, nivel = cargados['datos'], nivel_codigo
+    else:
+        datos, nivel_id = await _aleer(clave_id(pk), lambda: _acargar_producto(pk=pk))
+        nivel = _peor(nivel_codigo, nivel_id)
+    if datos is None or datos['codigo'] != codigo:
+        local.delete(clave_codigo(codigo))
+        await cache.adelete(clave_codigo(codigo))
+        return await aproducto_por_codigo(codigo, reintentar=False) if reintentar else None
+    _contar(nivel)
+    return await _acon_categoria(datos)
+
+
+def _borrar(*claves):
+    for clave in claves:
+        local.delete(clave)
+    cache.delete_many(list(claves))
+
+
+# Cambia la versión de las claves: lo guardado antes, y lo que guarde un
+# llenado que empezó antes, deja de ser vigente
+def _invalidar(*claves):
+    for clave in claves:
+        local.delete(clave)
+    version = time.time_ns()
+    cache.set_many({clave_version(clave): version for clave in claves}, None)
+
+
+# Invalida productos por id. Se repite al confirmar la transacción: un llenado
+# que leyó la base antes de confirmar queda con la versión anterior.
+def invalidar_productos(ids, codigos=()):
+    claves = [clave_id(pk) for pk in ids] + [clave_codigo(codigo) for codigo in codigos if codigo]
+    if not claves:
+        return
+    _invalidar(*claves)
+    transaction.on_commit(lambda: _invalidar(*claves))
+    condicional.incrementar('productos')
+
+
+def invalidar_categoria(pk):
+    _invalidar(clave_categoria(pk))
+    transaction.on_commit(lambda: _invalidar(clave_categoria(pk)))
+    # Los productos muestran el nombre de su categoría
+    condicional.incrementar('categorias', 'productos')
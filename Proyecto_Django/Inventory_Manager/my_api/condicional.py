@@ -0,0 +1,76 @@
+import hashlib
+import json
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+
+# Versiones de colecciones guardadas en la caché compartida. Cada escritura
+# guarda el instante actual (ns), del que se deriva el ETag. No se envía
+# Last-Modified: su resolución de un segundo daría 304 con datos viejos a un
+# cliente que leyó antes de una escritura ocurrida en el mismo segundo.
+def clave_version(nombre):
+    return f'version:{nombre}'
+
+
+def _marcar(nombres):
+    ahora = time.time_ns()
+    cache.set_many({clave_version(nombre): ahora for nombre in nombres}, None)
+
+
+# Cambia la versión de las colecciones indicadas. Se repite al confirmar la
+# transacción para que una lectura concurrente no conserve la versión anterior.
+def incrementar(*nombres):
+    _marcar(nombres)
+    transaction.on_commit(lambda: _marcar(nombres))
+
+
+# Versiones actuales; si alguna se perdió de la caché se crea una nueva
+def versiones(*nombres):
+    claves = [clave_version(nombre) for nombre in nombres]
+    actuales = cache.get_many(claves)
+    faltantes = {clave: time.time_ns() for clave in claves if clave not in actuales}
+    for clave, valor in faltantes.items():
+        if not cache.add(clave, valor, None):
+            valor = cache.get(clave, valor)
+        actuales[clave] = valor
+    return [actuales[clave] for clave in claves]
+
+
+# ETag para un recurso que depende de varias colecciones
+def validadores(nombres, variante=''):
+    valores = versiones(*nombres)
+    resumen = hashlib.md5(f"{variante}|{'|'.join(map(str, valores))}".encode()).hexdigest()
+    return quote_etag(resumen)
+
+
+# ETag calculado a partir de una representación ya serializada
+def etag_contenido(datos):
+    return quote_etag(hashlib.md5(json.dumps(datos, sort_keys=True, cls=DjangoJSONEncoder).encode()).hexdigest())
+
+
+# Agrega el validador a la respuesta (también a un 304)
+def con_validadores(response, etag):
+    if 200 <= response.status_code < 300 or response.status_code == 304:
+        response['ETag'] = etag
+    return response
+
+
+# Decora el método get de una vista cuya respuesta depende de las colecciones
+# indicadas: responde 304 sin ejecutar la consulta ni el serializador
+def respuesta_condicional(*colecciones):
+    def decorador(metodo):
+        @wraps(metodo)
+        def envoltura(self, request, *args, **kwargs):
+            etag = validadores(colecciones, request.get_full_path())
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = metodo(self, request, *args, **kwargs)
+            return con_validadores(response, etag)
+        return envoltura
+    return decorador
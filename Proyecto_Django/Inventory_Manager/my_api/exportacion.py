@@ -0,0 +1,55 @@
+import csv
+import io
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+# Filas leídas de la base de datos por bloque (cursor del lado del servidor en PostgreSQL)
+TAMANO_BLOQUE = 2000
+
+# Columnas exportadas de cada modelo
+COLUMNAS_MOVIMIENTOS = ['id', 'producto', 'producto__nombre', 'producto__codigo', 'tipo', 'cantidad', 'fecha']
+COLUMNAS_PRODUCTOS = ['id', 'codigo', 'nombre', 'descripcion', 'stock', 'precio', 'categoria', 'categoria__nombre', 'fecha_creacion']
+
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+# Recorre el queryset sin cargarlo completo en memoria
+def _filas(queryset, columnas):
+    return queryset.order_by('id').values_list(*columnas).iterator(chunk_size=TAMANO_BLOQUE)
+
+
+# Genera el CSV por bloques de texto; la memoria usada no depende del total de filas
+def generar_csv(queryset, columnas):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(columnas)
+    for numero, fila in enumerate(_filas(queryset, columnas), start=1):
+        escritor.writerow(fila)
+        if numero % TAMANO_BLOQUE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+# Genera un objeto JSON por línea
+def generar_ndjson(queryset, columnas):
+    lineas = []
+    for fila in _filas(queryset, columnas):
+        lineas.append(json.dumps(dict(zip(columnas, fila)), cls=DjangoJSONEncoder, ensure_ascii=False))
+        if len(lineas) == TAMANO_BLOQUE:
+            yield '\n'.join(lineas) + '\n'
+            lineas = []
+    if lineas:
+        yield '\n'.join(lineas) + '\n'
+
+
+def generar(formato, queryset, columnas):
+    if formato == 'csv':
+        return generar_csv(queryset, columnas)
+    return generar_ndjson(queryset, columnas)
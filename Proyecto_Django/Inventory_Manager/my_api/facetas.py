@@ -0,0 +1,100 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Case, Count, IntegerField, Value, When
+
+from . import condicional
+from .models import Producto
+
+
+# Configuración por defecto; puede sobrescribirse con FACETAS en settings
+CONFIGURACION = {
+    'TRAMOS_PRECIO': [10, 50, 100, 500],  # Límites de los tramos del histograma de precios
+    'STOCK_BAJO': 10,  # Hasta este stock (inclusive) un producto cuenta como "bajo"
+    'TTL': 300,  # Segundos en la caché compartida
+}
+
+
+def configuracion(clave):
+    return getattr(settings, 'FACETAS', {}).get(clave, CONFIGURACION[clave])
+
+
+# Parámetros de la búsqueda avanzada que cambian las facetas (no la paginación)
+PARAMETROS = ('nombre', 'categoria', 'precio_min', 'precio_max')
+
+ESTADOS_STOCK = ('agotado', 'bajo', 'disponible')
+
+
+def pedidas(params):
+    return params.get('facetas') in ('1', 'true')
+
+
+# Clave por combinación de filtros y versión del catálogo: cualquier cambio en
+# productos (incluido el stock) o categorías genera claves nuevas
+def clave(params):
+    filtros = '&'.join(f'{nombre}={params.get(nombre, "").strip().lower()}' for nombre in PARAMETROS)
+    version = '|'.join(map(str, condicional.versiones('productos', 'categorias')))
+    return f"facetas:{hashlib.md5(f'{version}|{filtros}'.encode()).hexdigest()}"
+
+
+def _tramo(limites):
+    return Case(
+        *[When(precio__lt=limite, then=Value(posicion)) for posicion, limite in enumerate(limites)],
+        default=Value(len(limites)), output_field=IntegerField(),
+    )
+
+
+def _estado_stock(bajo):
+    return Case(
+        When(stock__lte=0, then=Value(0)), When(stock__lte=bajo, then=Value(1)),
+        default=Value(2), output_field=IntegerField(),
+    )
+
+
+# Conteos por categoría, tramo de precio y estado de stock de los productos
+# del queryset, en una sola consulta agrupada por las tres dimensiones. Se
+# leen de la base primaria: el resultado queda en la caché compartida bajo la
+# versión actual y una réplica atrasada guardaría conteos anteriores a ella.
+def calcular(productos):
+    limites = configuracion('TRAMOS_PRECIO')
+    if productos.query.annotations or productos.query.group_by:
+        # La búsqueda por nombre anota la relevancia: se agrupa sobre sus ids
+        productos = Producto.objects.filter(pk__in=productos.values('pk'))
+    grupos = (
+        productos.using(DEFAULT_DB_ALIAS).order_by()
+        .annotate(tramo=_tramo(limites), estado=_estado_stock(configuracion('STOCK_BAJO')))
+        .values('categoria', 'categoria__nombre', 'tramo', 'estado')
+        .annotate(total=Count('*'))
+    )
+
+    categorias, tramos, estados = {}, [0] * (len(limites) + 1), [0] * len(ESTADOS_STOCK)
+    for grupo in grupos:
+        categoria = categorias.setdefault(grupo['categoria'], {
+            'id': grupo['categoria'], 'nombre': grupo['categoria__nombre'], 'total': 0,
+        })
+        categoria['total'] += grupo['total']
+        tramos[grupo['tramo']] += grupo['total']
+        estados[grupo['estado']] += grupo['total']
+
+    bordes = [None, *limites, None]
+    return {
+        'categorias': sorted(categorias.values(), key=lambda c: (-c['total'], c['nombre'] is None, c['nombre'] or '')),
+        'precios': [
+            {'desde': bordes[posicion], 'hasta': bordes[posicion + 1], 'total': total}
+            for posicion, total in enumerate(tramos)
+        ],
+        'stock': dict(zip(ESTADOS_STOCK, estados)),
+    }
+
+
+# Facetas de una búsqueda, desde la caché compartida si la combinación de
+# filtros ya se pidió con la versión actual del catálogo
+def facetas(productos, params):
+    clave_facetas = clave(params)
+    datos = cache.get(clave_facetas)
+    if datos is None:
+        datos = calcular(productos)
+        cache.set(clave_facetas, datos, configuracion('TTL'))
+    return datos
@@ -0,0 +1,86 @@
+from datetime import datetime, time, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+
+from .models import Categoria
+
+
+# Convierte 'AAAA-MM-DD' en la medianoche de ese día en la zona horaria local
+def inicio_del_dia(valor, parametro):
+    try:
+        fecha = parse_date(valor) if valor else None
+    except ValueError:  # Formato correcto pero fecha inexistente (2024-13-40)
+        fecha = None
+    if fecha is None:
+        raise ValidationError({parametro: 'Fecha inválida, use el formato AAAA-MM-DD.'})
+    return timezone.make_aware(datetime.combine(fecha, time.min))
+
+
+# Rango semiabierto [desde, hasta) sobre la columna `fecha`.
+# Comparar la columna directamente (en lugar de fecha__date) permite usar los índices.
+def rango_fechas(params):
+    fecha = params.get('fecha', None)  # Fecha exacta
+    fecha_desde = params.get('fecha_desde', None)  # Desde este día (inclusive)
+    fecha_hasta = params.get('fecha_hasta', None)  # Hasta este día (inclusive)
+
+    desde = hasta = None
+    if fecha:
+        desde = inicio_del_dia(fecha, 'fecha')
+        hasta = inicio_del_dia(fecha, 'fecha') + timedelta(days=1)
+    if fecha_desde:
+        inicio = inicio_del_dia(fecha_desde, 'fecha_desde')
+        desde = max(desde, inicio) if desde else inicio
+    if fecha_hasta:
+        fin = inicio_del_dia(fecha_hasta, 'fecha_hasta') + timedelta(days=1)
+        hasta = min(hasta, fin) if hasta else fin
+    return desde, hasta
+
+
+# Filtros de búsqueda de movimientos a partir de los parámetros de la petición
+def filtros_movimientos(params):
+    producto_nombre = params.get('producto_nombre', None)
+    tipos = params.getlist('tipo', None)  # Permite seleccionar múltiples tipos
+    cantidad = params.get('cantidad', None)  # Cantidad exacta
+
+    filtros = Q()
+
+    # 🔎 Filtro por nombre de producto
+    if producto_nombre:
+        filtros &= Q(producto__nombre__icontains=producto_nombre)
+
+    # 🔎 Filtro por tipo (entrada, salida, ajuste)
+    if tipos:
+        filtros &= Q(tipo__in=tipos)
+
+    # 🔎 Filtro por cantidad exacta
+    if cantidad:
+        filtros &= Q(cantidad=cantidad)
+
+    # 🔎 Filtro por rango de fechas
+    desde, hasta = rango_fechas(params)
+    if desde:
+        filtros &= Q(fecha__gte=desde)
+    if hasta:
+        filtros &= Q(fecha__lt=hasta)
+
+    return filtros
+
+
+# Filtros de la búsqueda avanzada de productos (sin el nombre, que se busca por trigramas)
+def filtros_productos(params):
+    categoria = params.get('categoria', None)
+    precio_min = params.get('precio_min', None)
+    precio_max = params.get('precio_max', None)
+
+    filtros = Q()
+    if categoria:
+        # La tabla de categorías es pequeña: se resuelven primero sus ids
+        filtros &= Q(categoria__in=Categoria.objects.filter(nombre__icontains=categoria).values('id'))
+    if precio_min:
+        filtros &= Q(precio__gte=precio_min)
+    if precio_max:
+        filtros &= Q(precio__lte=precio_max)
+    return filtros
@@ -0,0 +1,220 @@
+import codecs
+import csv
+import io
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from .models import Categoria, Producto, generar_codigo
+from .search import indexar_productos
+from .cache_productos import invalidar_productos
+from . import condicional
+from . import valoracion
+
+
+# Filas validadas y escritas por transacción
+TAMANO_BLOQUE = 1000
+
+# Campos que se actualizan cuando el código ya existe. El stock no se toca en
+# productos existentes: solo cambia a través de movimientos.
+CAMPOS_ACTUALIZABLES = ['nombre', 'descripcion', 'precio', 'categoria', 'fecha_actualizacion']
+
+PRECIO_MAXIMO = Decimal('99999999.99')  # max_digits=10, decimal_places=2
+
+
+# El archivo no se puede leer como el formato indicado
+class ArchivoInvalido(ValueError):
+    pass
+
+
+# Marca una línea NDJSON que no es JSON válido; se informa como error de su fila
+JSON_INVALIDO = object()
+
+
+# Recorre el archivo binario una vez antes de importar: un byte inválido al
+# final no debe aparecer después de haber guardado los primeros bloques
+def _comprobar_utf8(archivo):
+    decodificador = codecs.getincrementaldecoder('utf-8')()
+    try:
+        for bloque in iter(lambda: archivo.read(1 << 16), b''):
+            decodificador.decode(bloque)
+        decodificador.decode(b'', final=True)
+    except UnicodeDecodeError as error:
+        raise ArchivoInvalido('El archivo no está codificado en UTF-8.') from error
+    finally:
+        archivo.seek(0)
+
+
+def _lineas_json(texto):
+    for linea in texto:
+        if linea.strip():
+            try:
+                yield json.loads(linea)
+            except ValueError:
+                yield JSON_INVALIDO
+
+
+def _filas_csv(texto):
+    try:
+        yield from csv.DictReader(texto)
+    except csv.Error as error:
+        raise ArchivoInvalido(f'CSV inválido: {error}') from error
+
+
+# Lee un archivo CSV, JSON (lista) o NDJSON y devuelve un iterador de filas.
+# Lanza ArchivoInvalido si el archivo no se puede decodificar.
+def leer_filas(archivo, formato):
+    if isinstance(archivo, (bytes, bytearray)):
+        archivo = io.BytesIO(archivo)
+    if 'b' in getattr(archivo, 'mode', 'b'):
+        if archivo.seekable():
+            _comprobar_utf8(archivo)
+        texto = io.TextIOWrapper(archivo, encoding='utf-8-sig')
+    else:
+        texto = archivo
+    if formato == 'csv':
+        return _filas_csv(texto)
+    if formato == 'ndjson':
+        return _lineas_json(texto)
+    try:
+        filas = json.load(texto)
+    except ValueError as error:
+        raise ArchivoInvalido(f'JSON inválido: {error}') from error
+    if not isinstance(filas, list):
+        raise ArchivoInvalido('El JSON debe ser una lista de productos.')
+    return iter(filas)
+
+
+# Validación ligera de una fila (sin consultas a la base de datos)
+def validar_fila(fila):
+    if fila is JSON_INVALIDO:
+        return {}, {'fila': 'JSON inválido.'}
+    if not isinstance(fila, dict):
+        return {}, {'fila': 'Debe ser un objeto con los campos del producto.'}
+    errores = {}
+    datos = {
+        'nombre': str(fila.get('nombre') or '').strip(),
+        'descripcion': str(fila.get('descripcion') or ''),
+        'codigo': str(fila.get('codigo') or '').strip() or None,
+        'categoria': str(fila.get('categoria') or '').strip() or None,
+    }
+    if not datos['nombre']:
+        errores['nombre'] = 'Este campo es obligatorio.'
+    elif len(datos['nombre']) > 100:
+        errores['nombre'] = 'Máximo 100 caracteres.'
+    if datos['codigo'] and len(datos['codigo']) > 50:
+        errores['codigo'] = 'Máximo 50 caracteres.'
+    if datos['categoria'] and len(datos['categoria']) > 100:
+        errores['categoria'] = 'Máximo 100 caracteres.'
+    try:
+        datos['stock'] = int(fila.get('stock') or 0)
+        if datos['stock'] < 0:
+            errores['stock'] = 'No puede ser negativo.'
+    except (TypeError, ValueError):
+        errores['stock'] = 'Debe ser un número entero.'
+    try:
+        datos['precio'] = Decimal(str(fila.get('precio'))).quantize(Decimal('0.01'))
+        if not Decimal(0) <= datos['precio'] <= PRECIO_MAXIMO:
+            errores['precio'] = 'Fuera de rango.'
+    except (InvalidOperation, ValueError):
+        errores['precio'] = 'Debe ser un número decimal.'
+    return datos, errores
+
+
+# Reserva `cantidad` códigos nuevos comprobando colisiones con una consulta por ronda
+def reservar_codigos(cantidad, ocupados=()):
+    codigos = set()
+    while len(codigos) < cantidad:
+        candidatos = {generar_codigo() for _ in range(cantidad - len(codigos))} - set(ocupados) - codigos
+        existentes = set(Producto.objects.filter(codigo__in=candidatos).values_list('codigo', flat=True))
+        codigos |= candidatos - existentes
+    return list(codigos)
+
+
+# Categorías por nombre: una consulta por bloque y creación en lote de las que faltan
+def resolver_categorias(nombres):
+    categorias = {}
+    for categoria in Categoria.objects.filter(nombre__in=nombres).order_by('-id'):
+        categorias[categoria.nombre] = categoria  # Con nombres repetidos gana el id menor
+    nuevas = [Categoria(nombre=nombre) for nombre in nombres if nombre not in categorias]
+    for categoria in Categoria.objects.bulk_create(nuevas):
+        categorias[categoria.nombre] = categoria
+    if nuevas:
+        condicional.incrementar('categorias')
+    return categorias
+
+
+# Inserta o actualiza (por código) un bloque de filas ya validadas
+def _guardar_bloque(filas):
+    categorias = resolver_categorias({datos['categoria'] for _, datos in filas if datos['categoria']})
+    dados = [datos['codigo'] for _, datos in filas if datos['codigo']]
+    # Estado previo de los existentes: su stock y punto de reorden no cambian
+    anteriores = {
+        codigo: (categoria_id, stock, precio, punto_reorden)
+        for codigo, categoria_id, stock, precio, punto_reorden in Producto.objects.filter(codigo__in=dados)
+        .values_list('codigo', 'categoria_id', 'stock', 'precio', 'punto_reorden')
+    }
+    existentes = set(anteriores)
+    codigos_nuevos = iter(reservar_codigos(len(filas) - len(dados), ocupados=dados))
+
+    productos = [
+        Producto(
+            nombre=datos['nombre'],
+            descripcion=datos['descripcion'],
+            codigo=datos['codigo'] or next(codigos_nuevos),
+            stock=datos['stock'],
+            precio=datos['precio'],
+            categoria=categorias.get(datos['categoria']),
+        )
+        for _, datos in filas
+    ]
+    with transaction.atomic():
+        productos = Producto.objects.bulk_create(
+            productos,
+            update_conflicts=True,
+            unique_fields=['codigo'],
+            update_fields=CAMPOS_ACTUALIZABLES,
+        )
+        indexar_productos(productos)
+        aportes = []
+        for producto in productos:
+            anterior = anteriores.get(producto.codigo)
+            if anterior is not None:
+                _, producto.stock, _, producto.punto_reorden = anterior
+                aportes.append(valoracion.aporte(*anterior, signo=-1))
+            aportes.append(valoracion.aporte_de(producto))
+        valoracion.acumular(aportes)
+        invalidar_productos([producto.pk for producto in productos], [producto.codigo for producto in productos])
+    return len(productos) - len(existentes), len(existentes)
+
+
+# Importa productos por bloques. `progreso` recibe el resumen tras cada bloque.
+def importar_productos(filas, tamano_bloque=TAMANO_BLOQUE, progreso=None):
+    resumen = {'procesadas': 0, 'creados': 0, 'actualizados': 0, 'errores': []}
+    bloque = {}  # codigo (o número de fila) -> (número, datos)
+
+    def guardar():
+        creados, actualizados = _guardar_bloque(list(bloque.values()))
+        resumen['creados'] += creados
+        resumen['actualizados'] += actualizados
+        bloque.clear()
+        if progreso:
+            progreso(resumen)
+
+    for numero, fila in enumerate(filas, start=1):
+        resumen['procesadas'] += 1
+        datos, errores = validar_fila(fila)
+        if errores:
+            resumen['errores'].append({'fila': numero, 'errores': errores})
+            continue
+        clave = datos['codigo'] or numero
+        if clave in bloque:
+            # Un mismo código no puede insertarse dos veces en la misma sentencia
+            guardar()
+        bloque[clave] = (numero, datos)
+        if len(bloque) >= tamano_bloque:
+            guardar()
+    if bloque:
+        guardar()
+    return resumen
@@ -0,0 +1,215 @@
+import math
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.redis import RedisCache
+from rest_framework.exceptions import Throttled
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import BaseThrottle
+
+from . import metricas
+
+
+# Configuración por defecto; puede sobrescribirse con LIMITES en settings
+CONFIGURACION = {
+    'ACTIVO': True,
+    'EXENTOS_STAFF': True,  # Los administradores no tienen límite
+    # Alcance -> (capacidad, fichas por segundo). Las vistas eligen su alcance con
+    # `throttle_scope`; las demás usan 'lectura' (GET/HEAD/OPTIONS) o 'escritura'.
+    'ALCANCES': {
+        'lectura': (120, 20),
+        'escritura': (30, 5),
+        'codigo': (60, 20),  # Lecturas por código de barras (escáneres)
+        'token': (10, 0.2),  # Obtención y renovación de tokens, por IP si no hay usuario
+    },
+}
+
+
+def configuracion(clave):
+    return getattr(settings, 'LIMITES', {}).get(clave, CONFIGURACION[clave])
+
+
+def alcance_de(request, vista):
+    alcance = getattr(vista, 'throttle_scope', None)
+    if alcance:
+        return alcance
+    return 'lectura' if request.method in SAFE_METHODS else 'escritura'
+
+
+def clave_limite(alcance, identidad):
+    return f'limite:{alcance}:{identidad}'
+
+
+# Cubeta de fichas como GCRA: en lugar de las fichas restantes se guarda un solo
+# valor, el instante teórico (ms) en que la cubeta vuelve a estar llena. Cada
+# petición lo lleva a max(instante, ahora) + intervalo (1/tasa); se rechaza si
+# queda más lejos que la capacidad. Con Redis el paso completo es un script
+# Lua; con otras cachés el valor solo cambia con add, incr y decr (atómicos
+# en Memcached y LocMemCache; DatabaseCache y FileBasedCache usan get/set).
+def _intervalo(por_segundo):
+    return max(1, round(1000 / por_segundo))
+
+
+def _ms(segundos):
+    return int(segundos * 1000)
+
+
+# Segundos hasta que la clave vence: cuando la cubeta vuelve a estar llena
+def _vence(lleno, ahora):
+    return max(1, math.ceil((lleno - ahora) / 1000))
+
+
+# Segundos de espera (0 si se permite) para el instante `lleno` que dejó esta
+# petición al adelantar la cubeta
+def _evaluar(lleno, ahora, capacidad, intervalo):
+    espera = lleno - intervalo - ahora - intervalo * (capacidad - 1)
+    return espera / 1000 if espera > 0 else 0
+
+
+GCRA_LUA = """
+local ahora = tonumber(ARGV[1])
+local intervalo = tonumber(ARGV[2])
+local lleno = math.max(tonumber(redis.call('GET', KEYS[1]) or 0), ahora)
+local espera = lleno - ahora - tonumber(ARGV[3])
+if espera > 0 then
+    return espera
+end
+redis.call('SET', KEYS[1], lleno + intervalo, 'PX', lleno + intervalo - ahora)
+return 0
+"""
+
+
+def _usa_redis():
+    return isinstance(cache, RedisCache)
+
+
+def _consumir_redis(clave, ahora, capacidad, intervalo):
+    cliente = cache._cache.get_client(clave, write=True)
+    espera = cliente.eval(GCRA_LUA, 1, cache.make_and_validate_key(clave), ahora, intervalo, intervalo * (capacidad - 1))
+    return espera / 1000 if espera > 0 else 0
+
+
+# Adelanta la cubeta un intervalo con add/incr y devuelve el nuevo instante
+def _adelantar(clave, ahora, intervalo):
+    if cache.add(clave, ahora + intervalo, _vence(ahora + intervalo, ahora)):
+        return ahora + intervalo
+    try:
+        lleno = cache.incr(clave, intervalo)
+    except ValueError:
+        # Venció entre add e incr: la cubeta está llena
+        cache.add(clave, ahora + intervalo, _vence(ahora + intervalo, ahora))
+        return ahora + intervalo
+    return _ajustar(clave, lleno, ahora, intervalo, cache.incr)
+
+
+async def _aadelantar(clave, ahora, intervalo):
+    if await cache.aadd(clave, ahora + intervalo, _vence(ahora + intervalo, ahora)):
+        return ahora + intervalo
+    try:
+        lleno = await cache.aincr(clave, intervalo)
+    except ValueError:
+        await cache.aadd(clave, ahora + intervalo, _vence(ahora + intervalo, ahora))
+        return ahora + intervalo
+    return await sync_to_async(_ajustar)(clave, lleno, ahora, intervalo, cache.incr)
+
+
+# Si el instante guardado ya pasó (la cubeta se llenó y el tráfico siguió
+# renovando la clave), se lleva a ahora + intervalo sumando el atraso: sin
+# esto la cubeta acumularía fichas sin límite. Si varias peticiones ven el
+# mismo atraso a la vez, cada una lo suma y el instante queda adelantado de
+# más: el error limita de más, nunca de menos.
+def _ajustar(clave, lleno, ahora, intervalo, incr):
+    atraso = ahora - (lleno - intervalo)
+    if atraso <= 0:
+        return lleno
+    try:
+        incr(clave, atraso)
+    except ValueError:
+        pass  # La clave ya venció: la cubeta está llena
+    return ahora + intervalo
+
+
+# Consume una ficha del alcance para la identidad; devuelve los segundos que
+# faltan para la próxima (0 si se permite). El estado vive en la caché
+# compartida, así el límite es común a todos los procesos. Una petición
+# rechazada no consume ficha.
+def consumir(alcance, identidad):
+    capacidad, por_segundo = configuracion('ALCANCES')[alcance]
+    clave = clave_limite(alcance, identidad)
+    intervalo, ahora = _intervalo(por_segundo), _ms(time.time())
+    if _usa_redis():
+        return _consumir_redis(clave, ahora, capacidad, intervalo)
+    lleno = _adelantar(clave, ahora, intervalo)
+    espera = _evaluar(lleno, ahora, capacidad, intervalo)
+    try:
+        if espera:
+            cache.decr(clave, intervalo)
+        else:
+            cache.touch(clave, _vence(lleno, ahora))
+    except ValueError:
+        pass  # La clave ya venció
+    return espera
+
+
+async def aconsumir(alcance, identidad):
+    capacidad, por_segundo = configuracion('ALCANCES')[alcance]
+    clave = clave_limite(alcance, identidad)
+    intervalo, ahora = _intervalo(por_segundo), _ms(time.time())
+    if _usa_redis():
+        return await sync_to_async(_consumir_redis)(clave, ahora, capacidad, intervalo)
+    lleno = await _aadelantar(clave, ahora, intervalo)
+    espera = _evaluar(lleno, ahora, capacidad, intervalo)
+    try:
+        if espera:
+            await cache.adecr(clave, intervalo)
+        else:
+            await cache.atouch(clave, _vence(lleno, ahora))
+    except ValueError:
+        pass
+    return espera
+
+
+# Identidad limitada: el usuario autenticado o, sin usuario, la IP del cliente.
+# None si la petición no tiene límite (desactivado, alcance sin límite o staff).
+def identidad(request, alcance, ip):
+    if not configuracion('ACTIVO') or alcance not in configuracion('ALCANCES'):
+        return None
+    usuario = getattr(request, 'user', None)
+    if usuario is not None and usuario.is_authenticated:
+        if usuario.is_staff and configuracion('EXENTOS_STAFF'):
+            return None
+        return f'u{usuario.pk}'
+    return f'ip{ip}'
+
+
+def _rechazada(alcance, espera):
+    if espera:
+        metricas.incrementar('inventario_limite_excedido_total', alcance=alcance)
+    return espera
+
+
+# Limitador de DRF (DEFAULT_THROTTLE_CLASSES). DRF responde 429 con Retry-After.
+class LimiteCubeta(BaseThrottle):
+    def allow_request(self, request, view):
+        self.espera = 0
+        alcance = alcance_de(request, view)
+        quien = identidad(request, alcance, self.get_ident(request))
+        if quien is None:
+            return True
+        self.espera = _rechazada(alcance, consumir(alcance, quien))
+        return not self.espera
+
+    def wait(self):
+        return self.espera
+
+
+# Mismo límite para las vistas asíncronas; lanza Throttled si se supera
+async def acomprobar(request, vista):
+    alcance = alcance_de(request, vista)
+    quien = identidad(request, alcance, BaseThrottle().get_ident(request))
+    if quien is not None:
+        espera = _rechazada(alcance, await aconsumir(alcance, quien))
+        if espera:
+            raise Throttled(wait=espera)
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from my_api import archivo
+
+
+class Command(BaseCommand):
+    help = 'Traslada los movimientos antiguos a movimientos_archivados y registra los saldos de apertura'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--antes-de', help='Archiva los movimientos anteriores a este día (AAAA-MM-DD)')
+        parser.add_argument('--dias', type=int, default=None, help='Días a conservar (por defecto ARCHIVO["RETENCION_DIAS"])')
+        parser.add_argument('--bloque', type=int, default=None, help='Movimientos por transacción')
+
+    def handle(self, *args, **options):
+        if options['antes_de']:
+            try:
+                dia = parse_date(options['antes_de'])
+            except ValueError:
+                dia = None
+            if dia is None:
+                raise CommandError('Fecha inválida, use el formato AAAA-MM-DD.')
+        else:
+            dia = archivo.dia_de_corte(options['dias'])
+        try:
+            total = archivo.archivar(dia, options['bloque'])
+        except ValueError as error:
+            raise CommandError(str(error))
+        self.stdout.write(self.style.SUCCESS(f'{total} movimientos anteriores al {dia} archivados'))
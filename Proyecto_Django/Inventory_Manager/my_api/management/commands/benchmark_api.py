@@ -0,0 +1,285 @@
+import json
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, get_resolver
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from my_api import limites, metricas
+from my_api.models import Categoria, Movimiento, Producto
+from tareas import trabajador
+from tareas.models import Tarea
+from tareas.registro import almacenamiento, encolar
+from usuarios.models import Usuario
+
+
+class Rollback(Exception):
+    pass
+
+
+# Rutas que no son de la API
+RUTAS_OMITIDAS = ('admin/',)
+
+CLAVE_USUARIO = 'benchmark'
+
+
+# Escenarios por ruta de urls.py: (etiqueta, método, url, cuerpo, opciones).
+# Las escrituras se revierten después de cada petición. `max` limita las
+# repeticiones de las rutas costosas (hash de contraseña, exportaciones).
+def escenarios(datos):
+    producto, movimiento = datos['producto'], datos['movimiento']
+    hoy = timezone.localdate()
+    hace_30_dias = (hoy - timedelta(days=30)).isoformat()
+    nuevo = {'nombre': 'Benchmark', 'descripcion': 'Producto de prueba', 'precio': '9.90', 'stock': 0, 'codigo': 'BENCHMARK-API'}
+    linea = {'producto': producto.id, 'tipo': 'entrada', 'cantidad': 1}
+    return {
+        'api/productos/': [
+            ('', 'GET', '/api/productos/', None, {}),
+            ('fields', 'GET', '/api/productos/?fields=id,nombre,codigo,stock', None, {}),
+            ('', 'POST', '/api/productos/', nuevo, {}),
+        ],
+        'api/productos/<int:pk>/': [
+            ('', 'GET', f'/api/productos/{producto.id}/', None, {}),
+            ('', 'PATCH', f'/api/productos/{producto.id}/', {'precio': '1.00'}, {}),
+        ],
+        'api/products/<int:pk>/': [('', 'GET', f'/api/products/{producto.id}/', None, {})],
+        'api/movimientos/': [
+            ('', 'GET', '/api/movimientos/', None, {}),
+            ('', 'POST', '/api/movimientos/', linea, {}),
+        ],
+        'api/movimientos/lote/': [('50 líneas', 'POST', '/api/movimientos/lote/', {'movimientos': [linea] * 50}, {})],
+        'api/movimientos/<int:pk>/': [
+            ('', 'GET', f'/api/movimientos/{movimiento.id}/', None, {}),
+            ('', 'PATCH', f'/api/movimientos/{movimiento.id}/', {'cantidad': movimiento.cantidad}, {}),
+        ],
+        'api/token/': [('', 'POST', '/api/token/', {'email': datos['email'], 'password': CLAVE_USUARIO}, {'max': 3})],
+        'api/token/refresh/': [('', 'POST', '/api/token/refresh/', {'refresh': datos['refresh']}, {'max': 5})],
+        'api/productos/importar/': [
+            ('100 filas', 'POST', '/api/productos/importar/', [
+                {'codigo': f'BENCHMARK-IMP{i}', 'nombre': f'Importado {i}', 'precio': '1.00', 'stock': 1}
+                for i in range(100)
+            ], {}),
+        ],
+        'api/productos/busqueda/': [
+            ('nombre', 'GET', f"/api/productos/busqueda/?nombre={producto.nombre.split()[0].lower()}", None, {}),
+            ('precio', 'GET', '/api/productos/busqueda/?precio_min=10&precio_max=50', None, {}),
+            ('facetas', 'GET', '/api/productos/busqueda/?precio_min=10&facetas=true', None, {}),
+        ],
+        'api/movimientos/busqueda/': [
+            ('', 'GET', f'/api/movimientos/busqueda/?tipo=salida&fecha_desde={hace_30_dias}', None, {}),
+        ],
+        'api/productos/codigos/': [('100 códigos', 'POST', '/api/productos/codigos/', {'codigos': datos['codigos']}, {})],
+        'api/productos/codigo/<path:codigo>/': [('', 'GET', f'/api/productos/codigo/{producto.codigo}/', None, {})],
+        'api/categorias/': [('', 'GET', '/api/categorias/', None, {})],
+        'api/reportes/kardex/<int:producto_id>/': [('', 'GET', f'/api/reportes/kardex/{producto.id}/', None, {})],
+        'api/reportes/resumen/': [('', 'GET', f'/api/reportes/resumen/?fecha_desde={hace_30_dias}', None, {})],
+        'api/reportes/tablero/': [('', 'GET', '/api/reportes/tablero/', None, {})],
+        'api/productos/reorden/': [('', 'GET', '/api/productos/reorden/', None, {})],
+        'api/exportar/movimientos/': [('un día', 'GET', f'/api/exportar/movimientos/?fecha={hoy.isoformat()}', None, {'max': 3})],
+        'api/exportar/productos/': [('', 'GET', '/api/exportar/productos/', None, {'max': 1})],
+        'api/sync/': [('', 'GET', '/api/sync/?limite=500', None, {})],
+        'api/metrics': [('', 'GET', '/api/metrics', None, {'metricas': True})],
+        'api/async/productos/busqueda/': [
+            ('nombre', 'GET', f"/api/async/productos/busqueda/?nombre={producto.nombre.split()[0].lower()}", None, {}),
+            ('facetas', 'GET', '/api/async/productos/busqueda/?precio_min=10&facetas=true', None, {}),
+        ],
+        'api/async/movimientos/busqueda/': [
+            ('', 'GET', f'/api/async/movimientos/busqueda/?tipo=salida&fecha_desde={hace_30_dias}', None, {}),
+        ],
+        'api/async/productos/codigo/<path:codigo>/': [
+            ('', 'GET', f'/api/async/productos/codigo/{producto.codigo}/', None, {}),
+        ],
+        'api/async/categorias/': [('', 'GET', '/api/async/categorias/', None, {})],
+        'api/tareas/': [
+            ('', 'GET', '/api/tareas/', None, {}),
+            ('', 'POST', '/api/tareas/', {'tipo': 'reconstruir_resumen'}, {}),
+        ],
+        'api/tareas/<int:pk>/': [('', 'GET', f"/api/tareas/{datos['exportacion'].id}/", None, {})],
+        'api/tareas/<int:pk>/cancelar/': [('', 'POST', f"/api/tareas/{datos['pendiente'].id}/cancelar/", {}, {})],
+        'api/tareas/<int:pk>/descarga/': [('', 'GET', f"/api/tareas/{datos['exportacion'].id}/descarga/", None, {'max': 5})],
+    }
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(round(p / 100 * (len(valores) - 1))))]
+
+
+class Command(BaseCommand):
+    help = 'Mide cada ruta de urls.py con un cliente autenticado y compara con una línea base'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iteraciones', type=int, default=20, help='Peticiones medidas por escenario')
+        parser.add_argument('--calentamiento', type=int, default=1, help='Peticiones previas sin medir')
+        parser.add_argument('--salida', help='Archivo JSON de resultados (por defecto, la salida estándar)')
+        parser.add_argument('--linea-base', help='Resultados anteriores con los que comparar')
+        parser.add_argument('--guardar-linea-base', help='Guarda estos resultados como nueva línea base')
+        parser.add_argument('--tolerancia', type=float, default=0.25, help='Aumento relativo del p95 tolerado')
+        parser.add_argument('--umbral-ms', type=float, default=2.0, help='Aumento absoluto del p95 que se ignora')
+
+    def handle(self, *args, **options):
+        movimiento = Movimiento.objects.select_related('producto').order_by('-id').first()
+        if movimiento is None:
+            raise CommandError('No hay movimientos: ejecute primero generar_datos')
+
+        # Todo se ejecuta dentro de una transacción que se revierte al final
+        self.archivo_exportado = None
+        try:
+            with transaction.atomic():
+                resultados = self._ejecutar(movimiento, options)
+                raise Rollback
+        except Rollback:
+            pass
+        finally:
+            if self.archivo_exportado:
+                almacenamiento().delete(self.archivo_exportado)
+
+        texto = json.dumps(resultados, indent=2, ensure_ascii=False)
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as archivo:
+                archivo.write(texto)
+        else:
+            self.stdout.write(texto)
+        if options['guardar_linea_base']:
+            with open(options['guardar_linea_base'], 'w', encoding='utf-8') as archivo:
+                archivo.write(texto)
+        if options['linea_base']:
+            self._comparar(resultados, options)
+
+    def _ejecutar(self, movimiento, options):
+        usuario = Usuario.objects.create_user(
+            email='benchmark-api@local', password=CLAVE_USUARIO, nombre='Bench', apellido='Api', is_staff=True,
+        )
+        refresh = RefreshToken.for_user(usuario)
+        datos = {
+            'producto': movimiento.producto,
+            'movimiento': movimiento,
+            'email': usuario.email,
+            'refresh': str(refresh),
+            'codigos': list(Producto.objects.order_by('id').values_list('codigo', flat=True)[:100]),
+            'pendiente': encolar('reconstruir_resumen', usuario=usuario),
+            'exportacion': self._exportacion(usuario),
+        }
+        cliente = Client(HTTP_HOST='localhost', HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        token_metricas = metricas.configuracion('TOKEN')
+
+        rutas = [
+            str(patron.pattern) for patron in get_resolver().url_patterns
+            if isinstance(patron, URLPattern) and not str(patron.pattern).startswith(RUTAS_OMITIDAS)
+        ]
+        definidos = escenarios(datos)
+        resultados = {
+            'fecha': timezone.now().isoformat(),
+            'base_de_datos': connection.vendor,
+            'volumen': {
+                'categorias': Categoria.objects.count(),
+                'productos': Producto.objects.count(),
+                'movimientos': Movimiento.objects.order_by('-id').values_list('id', flat=True).first(),
+            },
+            'iteraciones': options['iteraciones'],
+            'escenarios': {},
+            'sin_escenario': [ruta for ruta in rutas if ruta not in definidos],
+            'limite_por_peticion': self._medir_limite(),
+        }
+        for ruta in dict.fromkeys(rutas):
+            for etiqueta, metodo, url, cuerpo, opciones in definidos.get(ruta, []):
+                cabeceras = {}
+                if opciones.get('metricas') and token_metricas:
+                    cabeceras['HTTP_AUTHORIZATION'] = f'Bearer {token_metricas}'
+                iteraciones = min(options['iteraciones'], opciones.get('max', options['iteraciones']))
+                nombre = f'{metodo} {ruta}' + (f' [{etiqueta}]' if etiqueta else '')
+                resultados['escenarios'][nombre] = self._medir(
+                    cliente, metodo, url, cuerpo, cabeceras, iteraciones, options['calentamiento'],
+                )
+                self.stderr.write(f"{nombre}: p95 {resultados['escenarios'][nombre]['p95_ms']} ms")
+        return resultados
+
+    # Exportación pequeña ya terminada, para medir el estado y la descarga. Se
+    # ejecuta aquí mismo (no la toma un trabajador); su archivo se borra al final.
+    def _exportacion(self, usuario):
+        tarea = Tarea.objects.create(
+            tipo='exportar', usuario=usuario, estado='en_curso', trabajador='benchmark_api', intentos=1,
+            parametros={'nombre': 'movimientos', 'formato': 'csv', 'consulta': f'fecha={timezone.localdate().isoformat()}'},
+            ejecutar_desde=timezone.now(),
+        )
+        trabajador.ejecutar(tarea)
+        tarea.refresh_from_db()
+        self.archivo_exportado = tarea.resultado['archivo']
+        return tarea
+
+    # Costo del límite de peticiones (una lectura y una escritura en la caché
+    # configurada). El usuario del benchmark es staff y está exento, así que se
+    # mide aparte, con identidades distintas para que nunca se rechace.
+    def _medir_limite(self, repeticiones=1000):
+        alcance = next(iter(limites.configuracion('ALCANCES')))
+        tiempos = []
+        for numero in range(repeticiones):
+            inicio = time.perf_counter()
+            limites.consumir(alcance, f'benchmark-{numero}')
+            tiempos.append((time.perf_counter() - inicio) * 1_000_000)
+        return {'p50_us': round(percentil(tiempos, 50), 1), 'p95_us': round(percentil(tiempos, 95), 1)}
+
+    def _peticion(self, cliente, metodo, url, cuerpo, cabeceras):
+        # Las escrituras se revierten para que cada repetición vea los mismos datos
+        with transaction.atomic():
+            if metodo == 'GET':
+                response = cliente.get(url, **cabeceras)
+            else:
+                response = getattr(cliente, metodo.lower())(
+                    url, json.dumps(cuerpo), content_type='application/json', **cabeceras,
+                )
+            if response.streaming:
+                b''.join(response.streaming_content)
+            transaction.set_rollback(True)
+        return response
+
+    def _medir(self, cliente, metodo, url, cuerpo, cabeceras, iteraciones, calentamiento):
+        for _ in range(calentamiento):
+            self._peticion(cliente, metodo, url, cuerpo, cabeceras)
+        tiempos, consultas, estados = [], [], set()
+        inicio_total = time.perf_counter()
+        for _ in range(iteraciones):
+            with CaptureQueriesContext(connection) as capturadas:
+                inicio = time.perf_counter()
+                response = self._peticion(cliente, metodo, url, cuerpo, cabeceras)
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+            # Sin contar los SAVEPOINT de la reversión
+            consultas.append(sum(1 for consulta in capturadas if 'SAVEPOINT' not in consulta['sql'].upper()))
+            estados.add(response.status_code)
+        total = time.perf_counter() - inicio_total
+        return {
+            'p50_ms': round(percentil(tiempos, 50), 2),
+            'p95_ms': round(percentil(tiempos, 95), 2),
+            'p99_ms': round(percentil(tiempos, 99), 2),
+            'peticiones_por_segundo': round(iteraciones / total, 1),
+            'consultas': statistics.median(consultas),
+            'estados': sorted(estados),
+        }
+
+    def _comparar(self, resultados, options):
+        with open(options['linea_base'], encoding='utf-8') as archivo:
+            base = json.load(archivo)['escenarios']
+        regresiones = []
+        for nombre, actual in resultados['escenarios'].items():
+            anterior = base.get(nombre)
+            if anterior is None:
+                self.stdout.write(f'Nuevo escenario: {nombre}')
+                continue
+            limite = max(anterior['p95_ms'] * (1 + options['tolerancia']), anterior['p95_ms'] + options['umbral_ms'])
+            if actual['p95_ms'] > limite:
+                regresiones.append(f"{nombre}: p95 {anterior['p95_ms']} -> {actual['p95_ms']} ms")
+            if actual['consultas'] > anterior['consultas']:
+                regresiones.append(f"{nombre}: consultas {anterior['consultas']} -> {actual['consultas']}")
+            if any(estado >= 400 for estado in actual['estados']) and not any(estado >= 400 for estado in anterior['estados']):
+                regresiones.append(f"{nombre}: estados {anterior['estados']} -> {actual['estados']}")
+        for nombre in base.keys() - resultados['escenarios'].keys():
+            self.stdout.write(f'Escenario eliminado: {nombre}')
+        if regresiones:
+            raise CommandError('Regresiones respecto de la línea base:\n' + '\n'.join(regresiones))
+        self.stdout.write(self.style.SUCCESS('Sin regresiones respecto de la línea base'))
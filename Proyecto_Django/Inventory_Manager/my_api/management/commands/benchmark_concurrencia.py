@@ -0,0 +1,140 @@
+import asyncio
+import io
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.db.backends.signals import connection_created
+from rest_framework_simplejwt.tokens import AccessToken
+
+from my_api import valoracion
+from my_api.models import Eliminacion, Producto
+from my_api.search import indexar_productos
+from usuarios.models import Usuario
+
+
+PREFIJO = 'BENCHCONC'
+
+
+class Command(BaseCommand):
+    help = 'Compara peticiones por segundo del camino WSGI (DRF) y del ASGI (vistas asíncronas) con muchos clientes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ruta', default='productos/busqueda/?nombre=bench&page_size=20',
+                            help='Ruta bajo /api/ (WSGI) y /api/async/ (ASGI)')
+        parser.add_argument('--peticiones', type=int, default=400)
+        parser.add_argument('--clientes', type=int, default=100, help='Peticiones simultáneas')
+        parser.add_argument('--hilos', type=int, default=8, help='Hilos del servidor WSGI')
+        parser.add_argument('--latencia-ms', type=float, default=5.0,
+                            help='Espera agregada a cada consulta para simular la red hasta la base de datos')
+        parser.add_argument('--productos', type=int, default=500)
+
+    def handle(self, *args, **options):
+        # Los datos se confirman porque las peticiones usan otras conexiones; se borran al final
+        usuario = Usuario.objects.create_user(email=f'{PREFIJO.lower()}@local', password=None, nombre='Bench', apellido='Conc')
+        productos = Producto.objects.bulk_create([
+            Producto(nombre=f'Bench {i}', descripcion='', precio=1, stock=i, codigo=f'{PREFIJO}{i:06d}')
+            for i in range(options['productos'])
+        ])
+        indexar_productos(productos)
+        valoracion.acumular(valoracion.aporte_de(producto) for producto in productos)  # Se restan al borrarlos
+        latencia = options['latencia_ms'] / 1000
+
+        # Simula la latencia de red de una base de datos remota: la espera libera
+        # el GIL igual que una consulta real
+        def esperar(execute, sql, params, many, context):
+            time.sleep(latencia)
+            return execute(sql, params, many, context)
+
+        def instalar(sender, connection, **kwargs):
+            connection.execute_wrappers.append(esperar)
+
+        if latencia:
+            connection_created.connect(instalar)
+        try:
+            token = f'Bearer {AccessToken.for_user(usuario)}'
+            ruta = options['ruta']
+            self.stdout.write(f"Ruta: {ruta}, peticiones: {options['peticiones']}, clientes: {options['clientes']}, "
+                              f"hilos WSGI: {options['hilos']}, latencia por consulta: {options['latencia_ms']} ms")
+            wsgi = self._wsgi(f'/api/{ruta}', token, options['peticiones'], options['hilos'])
+            asgi = asyncio.run(self._asgi(f'/api/async/{ruta}', token, options['peticiones'], options['clientes']))
+            self._informe('WSGI (DRF)', *wsgi)
+            self._informe('ASGI (async)', *asgi)
+            self.stdout.write(self.style.SUCCESS(f'Relación ASGI/WSGI: x{(asgi[0] / wsgi[0]):.1f} peticiones por segundo'))
+        finally:
+            connection_created.disconnect(instalar)
+            ids = [producto.pk for producto in productos]
+            Producto.objects.filter(pk__in=ids).delete()
+            Eliminacion.objects.filter(modelo='producto', objeto_id__in=ids).delete()
+            usuario.delete()
+
+    def _informe(self, nombre, por_segundo, tiempos, errores):
+        tiempos = sorted(tiempos)
+        p95 = tiempos[int(len(tiempos) * 0.95) - 1]
+        self.stdout.write(f'{nombre:13} {por_segundo:8.1f} pet/s  p50 {statistics.median(tiempos) * 1000:7.1f} ms  '
+                          f'p95 {p95 * 1000:7.1f} ms  errores {errores}')
+
+    # Camino síncrono: la aplicación WSGI atendida por un número fijo de hilos,
+    # como un worker gthread de gunicorn
+    def _wsgi(self, url, token, total, hilos):
+        aplicacion = get_wsgi_application()
+        partes = urlsplit(url)
+
+        def peticion():
+            estado = {}
+            environ = {
+                'REQUEST_METHOD': 'GET', 'PATH_INFO': partes.path, 'QUERY_STRING': partes.query,
+                'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'HTTP_HOST': 'localhost',
+                'HTTP_AUTHORIZATION': token, 'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(),
+                'wsgi.errors': io.StringIO(), 'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+            }
+            inicio = time.perf_counter()
+            respuesta = aplicacion(environ, lambda status, headers: estado.setdefault('status', status))
+            b''.join(respuesta)
+            respuesta.close()
+            return time.perf_counter() - inicio, estado['status'].startswith('200')
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=hilos) as ejecutor:
+            resultados = list(ejecutor.map(lambda _: peticion(), range(total)))
+        duracion = time.perf_counter() - inicio
+        return total / duracion, [tiempo for tiempo, _ in resultados], sum(not ok for _, ok in resultados)
+
+    # Camino asíncrono: la aplicación ASGI con `clientes` peticiones en curso a la vez
+    async def _asgi(self, url, token, total, clientes):
+        aplicacion = get_asgi_application()
+        partes = urlsplit(url)
+        semaforo = asyncio.Semaphore(clientes)
+
+        async def peticion():
+            estado = {'recibido': False}
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+                'scheme': 'http', 'path': partes.path, 'raw_path': partes.path.encode(), 'root_path': '',
+                'query_string': partes.query.encode(), 'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+                'headers': [(b'host', b'localhost'), (b'authorization', token.encode())],
+            }
+
+            async def receive():
+                if estado['recibido']:
+                    await asyncio.Future()  # El cliente no se desconecta
+                estado['recibido'] = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+            async def send(mensaje):
+                if mensaje['type'] == 'http.response.start':
+                    estado['status'] = mensaje['status']
+
+            async with semaforo:
+                inicio = time.perf_counter()
+                await aplicacion(scope, receive, send)
+                return time.perf_counter() - inicio, estado['status'] == 200
+
+        inicio = time.perf_counter()
+        resultados = await asyncio.gather(*(peticion() for _ in range(total)))
+        duracion = time.perf_counter() - inicio
+        return total / duracion, [tiempo for tiempo, _ in resultados], sum(not ok for _, ok in resultados)
@@ -0,0 +1,78 @@
+import gzip
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from my_api.middleware import brotli, configuracion
+from my_api.models import Categoria, Movimiento, Producto
+from my_api.renderers import ORJSONRenderer
+from my_api.serializers import MovimientoSerializer, ProductoSerializer
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compara el tiempo de codificación JSON y el tamaño de la respuesta con y sin compresión'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--productos', type=int, default=2000, help='Productos en la respuesta')
+        parser.add_argument('--movimientos', type=int, default=5000, help='Movimientos en la respuesta')
+        parser.add_argument('--repeticiones', type=int, default=5, help='Se informa el mejor tiempo')
+
+    def handle(self, *args, **options):
+        # Todo se ejecuta dentro de una transacción que se revierte al final
+        try:
+            with transaction.atomic():
+                self._ejecutar(options['productos'], options['movimientos'], options['repeticiones'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _medir(self, funcion, repeticiones):
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            resultado = funcion()
+            tiempos.append(time.perf_counter() - inicio)
+        return min(tiempos), resultado
+
+    def _ejecutar(self, total_productos, total_movimientos, repeticiones):
+        categoria = Categoria.objects.create(nombre='Bench')
+        productos = Producto.objects.bulk_create([
+            Producto(nombre=f'Bench {i}', descripcion=f'Producto de prueba número {i}', precio=i % 100 + 0.99,
+                     stock=i, codigo=f'BENCH{i:07d}', categoria=categoria)
+            for i in range(total_productos)
+        ])
+        Movimiento.objects.bulk_create([
+            Movimiento(producto=productos[i % total_productos], tipo='entrada', cantidad=i % 10 + 1)
+            for i in range(total_movimientos)
+        ])
+        cargas = {
+            'productos': ProductoSerializer().representar_filas(
+                ProductoSerializer().valores(Producto.objects.filter(categoria=categoria))),
+            'movimientos': MovimientoSerializer().representar_filas(
+                MovimientoSerializer().valores(Movimiento.objects.filter(producto__categoria=categoria))),
+        }
+
+        for nombre, datos in cargas.items():
+            self.stdout.write(f'{nombre} ({len(datos)} filas):')
+            drf, cuerpo = self._medir(lambda: JSONRenderer().render(datos), repeticiones)
+            rapido, _ = self._medir(lambda: ORJSONRenderer().render(datos), repeticiones)
+            self.stdout.write(f'  JSONRenderer (json):    {drf * 1000:8.1f} ms')
+            self.stdout.write(f'  ORJSONRenderer:         {rapido * 1000:8.1f} ms (x{drf / rapido:.1f})')
+
+            self.stdout.write(f'  Sin comprimir:          {len(cuerpo):10,d} bytes')
+            tiempo, comprimido = self._medir(lambda: gzip.compress(cuerpo, compresslevel=6), repeticiones)
+            self.stdout.write(f'  gzip:                   {len(comprimido):10,d} bytes '
+                              f'({len(comprimido) / len(cuerpo):.0%}, {tiempo * 1000:.1f} ms)')
+            if brotli is not None:
+                nivel = configuracion('NIVEL_BROTLI')
+                tiempo, comprimido = self._medir(lambda: brotli.compress(cuerpo, quality=nivel), repeticiones)
+                self.stdout.write(f'  brotli (nivel {nivel}):       {len(comprimido):10,d} bytes '
+                                  f'({len(comprimido) / len(cuerpo):.0%}, {tiempo * 1000:.1f} ms)')
+            else:
+                self.stdout.write('  brotli: no instalado')
@@ -0,0 +1,70 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from my_api.models import Producto
+from my_api.views import MovimientoListCreateView, MovimientoLoteView
+from usuarios.models import Usuario
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compara el registro de movimientos uno por uno contra el endpoint de lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lineas', type=int, default=500, help='Movimientos por prueba')
+        parser.add_argument('--productos', type=int, default=50, help='Productos distintos en el lote')
+
+    def handle(self, *args, **options):
+        # Todo se ejecuta dentro de una transacción que se revierte al final
+        try:
+            with transaction.atomic():
+                self._ejecutar(options['lineas'], options['productos'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _ejecutar(self, total_lineas, total_productos):
+        usuario = Usuario(email='benchmark@local', nombre='Bench', apellido='Mark', is_staff=True)
+        usuario.save()
+        productos = Producto.objects.bulk_create([
+            Producto(nombre=f'Bench {i}', descripcion='', precio=1, stock=0, codigo=f'BENCH{i:06d}')
+            for i in range(total_productos)
+        ])
+        lineas = [
+            {'producto': productos[i % total_productos].id, 'tipo': 'entrada', 'cantidad': 1}
+            for i in range(total_lineas)
+        ]
+        factory = APIRequestFactory()
+
+        # Camino actual: un POST por movimiento
+        vista = MovimientoListCreateView.as_view()
+        with CaptureQueriesContext(connection) as consultas:
+            inicio = time.perf_counter()
+            for linea in lineas:
+                request = factory.post('/api/movimientos/', linea, format='json')
+                force_authenticate(request, user=usuario)
+                vista(request)
+            por_fila = time.perf_counter() - inicio
+        consultas_por_fila = len(consultas)
+
+        # Camino nuevo: un solo POST con todo el lote
+        vista = MovimientoLoteView.as_view()
+        with CaptureQueriesContext(connection) as consultas:
+            inicio = time.perf_counter()
+            request = factory.post('/api/movimientos/lote/', {'movimientos': lineas}, format='json')
+            force_authenticate(request, user=usuario)
+            vista(request)
+            por_lote = time.perf_counter() - inicio
+        consultas_por_lote = len(consultas)
+
+        self.stdout.write(f'Líneas: {total_lineas}, productos: {total_productos}')
+        self.stdout.write(f'Uno por uno: {por_fila:.3f}s, {consultas_por_fila} consultas')
+        self.stdout.write(f'Lote:        {por_lote:.3f}s, {consultas_por_lote} consultas')
+        self.stdout.write(self.style.SUCCESS(f'Aceleración: x{por_fila / por_lote:.1f}'))
@@ -0,0 +1,59 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from my_api.models import Categoria, Producto
+from my_api.serializers import ProductoSerializer
+
+
+class Rollback(Exception):
+    pass
+
+
+# Campos de las pantallas de listado
+CAMPOS_LISTADO = ['id', 'nombre', 'codigo', 'stock']
+
+
+class Command(BaseCommand):
+    help = 'Compara la serialización de listados con ModelSerializer contra el camino rápido con values()'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--productos', type=int, default=5000, help='Productos a serializar')
+        parser.add_argument('--repeticiones', type=int, default=3, help='Se informa el mejor tiempo')
+
+    def handle(self, *args, **options):
+        # Todo se ejecuta dentro de una transacción que se revierte al final
+        try:
+            with transaction.atomic():
+                self._ejecutar(options['productos'], options['repeticiones'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _medir(self, funcion, repeticiones):
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            funcion()
+            tiempos.append(time.perf_counter() - inicio)
+        return min(tiempos)
+
+    def _ejecutar(self, total, repeticiones):
+        categoria = Categoria.objects.create(nombre='Bench')
+        Producto.objects.bulk_create([
+            Producto(nombre=f'Bench {i}', descripcion='Descripción larga ' * 10, precio=i % 100, stock=i,
+                     codigo=f'BENCH{i:07d}', categoria=categoria)
+            for i in range(total)
+        ])
+        queryset = Producto.objects.filter(categoria=categoria).select_related('categoria').order_by('id')
+
+        self.stdout.write(f'Productos: {total}')
+        for etiqueta, campos in (('Todos los campos', None), ('Campos de listado', CAMPOS_LISTADO)):
+            serializer = ProductoSerializer(campos=campos)
+            actual = self._medir(lambda: ProductoSerializer(queryset, many=True, campos=campos).data, repeticiones)
+            rapido = self._medir(lambda: serializer.representar_filas(serializer.valores(queryset)), repeticiones)
+            self.stdout.write(f'{etiqueta}:')
+            self.stdout.write(f'  ModelSerializer: {actual:.3f}s ({total / actual:,.0f} filas/s)')
+            self.stdout.write(f'  values():        {rapido:.3f}s ({total / rapido:,.0f} filas/s)')
+            self.stdout.write(self.style.SUCCESS(f'  Aceleración: x{actual / rapido:.1f}'))
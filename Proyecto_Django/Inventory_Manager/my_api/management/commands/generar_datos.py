@@ -0,0 +1,148 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Case, F, IntegerField, OuterRef, Subquery, Sum, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from my_api import condicional, resumenes, valoracion
+from my_api.models import Categoria, Movimiento, Producto
+from my_api.search import indexar_productos
+
+
+# Prefijo de los códigos generados; permite borrar solo los datos sintéticos
+PREFIJO = 'GEN'
+
+TIPOS = ['Leche', 'Arroz', 'Aceite', 'Azúcar', 'Café', 'Galletas', 'Detergente', 'Jabón', 'Fideos', 'Atún',
+         'Yogur', 'Queso', 'Harina', 'Avena', 'Gaseosa', 'Agua', 'Cerveza', 'Pan', 'Mantequilla', 'Sal']
+MARCAS = ['Andina', 'Del Valle', 'Costeña', 'Gloria', 'Norteño', 'Selva', 'Sol', 'Altiplano', 'Primor', 'Real']
+VARIANTES = ['500 g', '1 kg', '1 L', '2 L', 'pack x6', 'light', 'familiar', 'premium', 'clásico', 'integral']
+
+
+class Command(BaseCommand):
+    help = 'Genera datos sintéticos (categorías, productos y movimientos) con inserciones por lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--categorias', type=int, default=1000)
+        parser.add_argument('--productos', type=int, default=500_000)
+        parser.add_argument('--movimientos', type=int, default=20_000_000)
+        parser.add_argument('--dias', type=int, default=365, help='Los movimientos se reparten en los últimos N días')
+        parser.add_argument('--bloque', type=int, default=20_000, help='Filas por transacción')
+        parser.add_argument('--semilla', type=int, default=42, help='Misma semilla, mismos datos')
+        parser.add_argument('--limpiar', action='store_true', help='Borra antes los datos generados anteriormente')
+
+    def handle(self, *args, **options):
+        self.inicio = time.perf_counter()
+        self.azar = random.Random(options['semilla'])
+        self.bloque = options['bloque']
+        if connection.vendor == 'sqlite' and not connection.in_atomic_block:
+            with connection.cursor() as cursor:
+                # Carga inicial: se puede repetir si se interrumpe
+                cursor.execute('PRAGMA synchronous = OFF')
+        if options['limpiar']:
+            self._limpiar()
+
+        categorias = self._categorias(options['categorias'])
+        productos = self._productos(options['productos'], categorias)
+        self._movimientos(options['movimientos'], productos, options['dias'])
+        self._actualizar_stock()
+        self._progreso(f'{resumenes.reconstruir()} filas de resumen diario')
+        self._progreso(f'{valoracion.reconstruir()} filas de valoración por categoría')
+        # Las inserciones por lotes no pasan por las señales: se invalidan los ETag
+        condicional.incrementar('productos', 'categorias')
+        self.stdout.write(self.style.SUCCESS(f'Datos generados en {time.perf_counter() - self.inicio:.1f}s'))
+
+    def _progreso(self, mensaje):
+        self.stdout.write(f'[{time.perf_counter() - self.inicio:7.1f}s] {mensaje}')
+
+    def _limpiar(self):
+        generados = Producto.objects.filter(codigo__startswith=PREFIJO)
+        with transaction.atomic():
+            Movimiento.objects.filter(producto__in=generados).delete()
+            generados.delete()
+            Categoria.objects.filter(nombre__startswith=f'{PREFIJO} ').delete()
+        self._progreso('Datos generados anteriormente borrados')
+
+    def _categorias(self, total):
+        existentes = Categoria.objects.filter(nombre__startswith=f'{PREFIJO} ').count()
+        Categoria.objects.bulk_create(
+            [Categoria(nombre=f'{PREFIJO} Categoría {i}', descripcion='') for i in range(existentes, total)],
+            batch_size=self.bloque,
+        )
+        self._progreso(f'{total} categorías')
+        return list(Categoria.objects.filter(nombre__startswith=f'{PREFIJO} ').values_list('id', flat=True)[:total])
+
+    def _productos(self, total, categorias):
+        inicio = Producto.objects.filter(codigo__startswith=PREFIJO).count()
+        for desde in range(inicio, total, self.bloque):
+            lote = [
+                Producto(
+                    nombre=f'{self.azar.choice(TIPOS)} {self.azar.choice(MARCAS)} {self.azar.choice(VARIANTES)}',
+                    descripcion=f'Producto sintético {i}',
+                    codigo=f'{PREFIJO}{i:09d}',
+                    stock=0,
+                    precio=round(self.azar.uniform(0.5, 500), 2),
+                    categoria_id=self.azar.choice(categorias) if categorias else None,
+                )
+                for i in range(desde, min(desde + self.bloque, total))
+            ]
+            with transaction.atomic():
+                indexar_productos(Producto.objects.bulk_create(lote))
+            self._progreso(f'{desde + len(lote)} productos')
+        return list(Producto.objects.filter(codigo__startswith=PREFIJO).values_list('id', flat=True))
+
+    # Movimientos en orden cronológico: el stock simulado de cada producto nunca
+    # queda negativo. Se insertan con SQL directo, sin crear objetos del ORM.
+    def _movimientos(self, total, productos, dias):
+        if not productos or not total:
+            return
+        stock = dict.fromkeys(productos, 0)
+        ahora = timezone.now()
+        inicio = ahora - timedelta(days=dias)
+        paso = (ahora - inicio) / total
+        tabla = Movimiento._meta.db_table
+        sql = f'INSERT INTO {tabla} (producto_id, tipo, cantidad, fecha) VALUES (%s, %s, %s, %s)'
+        adaptar = connection.ops.adapt_datetimefield_value
+        filas = []
+        for i in range(total):
+            producto = self.azar.choice(productos)
+            azar = self.azar.random()
+            if azar < 0.55 or stock[producto] == 0:
+                tipo, cantidad = 'entrada', self.azar.randint(1, 50)
+            elif azar < 0.95:
+                tipo, cantidad = 'salida', self.azar.randint(1, stock[producto])
+            else:
+                tipo = 'ajuste'
+                cantidad = self.azar.choice([-1, 1]) * self.azar.randint(1, 5)
+                cantidad = max(cantidad, -stock[producto]) or 1
+            stock[producto] += -cantidad if tipo == 'salida' else cantidad
+            filas.append((producto, tipo, cantidad, adaptar(inicio + paso * i)))
+            if len(filas) == self.bloque:
+                self._insertar(sql, filas)
+                filas = []
+                if (i + 1) % (self.bloque * 50) == 0:
+                    self._progreso(f'{i + 1} movimientos')
+        self._insertar(sql, filas)
+        self._progreso(f'{total} movimientos')
+
+    def _insertar(self, sql, filas):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(sql, filas)
+
+    # El stock de cada producto generado es el saldo de sus movimientos
+    def _actualizar_stock(self):
+        saldo = (
+            Movimiento.objects.filter(producto=OuterRef('pk')).order_by().values('producto')
+            .annotate(total=Sum(Case(
+                When(tipo='salida', then=-F('cantidad')),
+                default=F('cantidad'),
+                output_field=IntegerField(),
+            )))
+            .values('total')
+        )
+        with transaction.atomic():
+            Producto.objects.filter(codigo__startswith=PREFIJO).update(stock=Coalesce(Subquery(saldo), 0))
+        self._progreso('Stock recalculado')
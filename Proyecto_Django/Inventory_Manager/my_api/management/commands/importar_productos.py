@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from my_api.importacion import TAMANO_BLOQUE, importar_productos, leer_filas
+
+
+class Command(BaseCommand):
+    help = 'Importa o actualiza productos desde un archivo CSV, JSON o NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del archivo a importar')
+        parser.add_argument('--formato', choices=['csv', 'json', 'ndjson'], help='Por defecto se deduce de la extensión')
+        parser.add_argument('--bloque', type=int, default=TAMANO_BLOQUE, help='Filas por transacción')
+
+    def handle(self, *args, **options):
+        formato = options['formato'] or options['archivo'].rsplit('.', 1)[-1].lower()
+        if formato not in ('csv', 'json', 'ndjson'):
+            raise CommandError('No se pudo deducir el formato; use --formato')
+        inicio = time.perf_counter()
+
+        def progreso(resumen):
+            transcurrido = time.perf_counter() - inicio
+            self.stdout.write(
+                f"{resumen['procesadas']} filas ({resumen['procesadas'] / transcurrido:.0f}/s): "
+                f"{resumen['creados']} creados, {resumen['actualizados']} actualizados, {len(resumen['errores'])} errores"
+            )
+
+        with open(options['archivo'], 'rb') as archivo:
+            resumen = importar_productos(leer_filas(archivo, formato), tamano_bloque=options['bloque'], progreso=progreso)
+
+        for error in resumen['errores'][:20]:
+            self.stderr.write(f"Fila {error['fila']}: {error['errores']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Importación terminada en {time.perf_counter() - inicio:.1f}s: "
+            f"{resumen['creados']} creados, {resumen['actualizados']} actualizados, {len(resumen['errores'])} errores"
+        ))
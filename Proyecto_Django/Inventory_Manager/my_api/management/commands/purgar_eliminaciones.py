@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from my_api.sincronizacion import purgar_eliminaciones
+
+
+class Command(BaseCommand):
+    help = 'Borra los registros de eliminación más antiguos que la retención de sincronización'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=None, help='Días a conservar (por defecto SINCRONIZACION["RETENCION_DIAS"])')
+
+    def handle(self, *args, **options):
+        total = purgar_eliminaciones(options['dias'])
+        self.stdout.write(self.style.SUCCESS(f'{total} registros de eliminación borrados'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from my_api.search import reconstruir_indice, usa_pg_trgm
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de trigramas usado por la búsqueda de productos'
+
+    def handle(self, *args, **options):
+        if usa_pg_trgm():
+            self.stdout.write('PostgreSQL mantiene el índice GIN de trigramas; no hay nada que reconstruir.')
+            return
+        total = reconstruir_indice()
+        self.stdout.write(self.style.SUCCESS(f'{total} productos indexados'))
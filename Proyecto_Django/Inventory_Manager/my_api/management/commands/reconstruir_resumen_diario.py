@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from my_api.resumenes import reconstruir
+
+
+class Command(BaseCommand):
+    help = 'Recalcula el resumen diario de movimientos por producto'
+
+    def handle(self, *args, **options):
+        total = reconstruir()
+        self.stdout.write(self.style.SUCCESS(f'{total} filas de resumen generadas'))
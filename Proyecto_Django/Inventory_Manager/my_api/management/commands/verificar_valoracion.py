@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from my_api import valoracion
+
+
+class Command(BaseCommand):
+    help = 'Compara la valoración por categoría con los productos y, con --reparar, la reconstruye'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reparar', action='store_true', help='Reconstruye la tabla si hay diferencias')
+
+    def handle(self, *args, **options):
+        diferencias = valoracion.diferencias()
+        if not diferencias:
+            self.stdout.write(self.style.SUCCESS('La valoración por categoría coincide con los productos'))
+            return
+        for categoria_id, columna, guardado, calculado in diferencias:
+            categoria = 'sin categoría' if categoria_id is None else f'categoría {categoria_id}'
+            self.stdout.write(f'{categoria}: {columna} guardado {guardado}, calculado {calculado}')
+        if not options['reparar']:
+            raise CommandError(f'{len(diferencias)} diferencias en la valoración por categoría')
+        filas = valoracion.reconstruir()
+        self.stdout.write(self.style.SUCCESS(f'Valoración reconstruida: {filas} categorías'))
@@ -0,0 +1,176 @@
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+
+# Configuración por defecto; puede sobrescribirse con METRICAS en settings
+CONFIGURACION = {
+    'PRESUPUESTO_CONSULTAS': 30,  # Consultas por petición antes de registrar una advertencia
+    'TOKEN': None,  # Bearer exigido por /api/metrics; sin token solo se expone con DEBUG
+}
+
+
+def configuracion(clave):
+    return getattr(settings, 'METRICAS', {}).get(clave, CONFIGURACION[clave])
+
+
+# Límites de los histogramas
+LIMITES_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+LIMITES_CONSULTAS = (0, 1, 2, 5, 10, 20, 50, 100)
+LIMITES_BYTES = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+
+class Histograma:
+    def __init__(self, limites):
+        self.limites = limites
+        self.cubetas = [0] * len(limites)  # No acumuladas; se acumulan al exportar
+        self.suma = 0
+        self.total = 0
+
+    def observar(self, valor):
+        posicion = bisect.bisect_left(self.limites, valor)
+        if posicion < len(self.cubetas):
+            self.cubetas[posicion] += 1
+        self.suma += valor
+        self.total += 1
+
+
+# Métricas del proceso: cada worker lleva las suyas
+_candado = threading.Lock()
+_histogramas = {}  # (métrica, etiquetas) -> Histograma
+_contadores = {}  # (métrica, etiquetas) -> valor
+
+DESCRIPCIONES = {
+    'inventario_peticion_segundos': ('histogram', 'Latencia de las peticiones por vista'),
+    'inventario_peticion_consultas': ('histogram', 'Consultas a la base de datos por petición'),
+    'inventario_respuesta_bytes': ('histogram', 'Tamaño del cuerpo de la respuesta'),
+    'inventario_peticiones_total': ('counter', 'Peticiones atendidas por vista y código de estado'),
+    'inventario_consultas_segundos_total': ('counter', 'Tiempo en la base de datos por vista'),
+    'inventario_serializacion_segundos_total': ('counter', 'Tiempo en serializadores por vista'),
+    'inventario_render_segundos_total': ('counter', 'Tiempo de codificación JSON por vista'),
+    'inventario_presupuesto_excedido_total': ('counter', 'Peticiones que superaron el presupuesto de consultas'),
+    'inventario_cache_productos_total': ('counter', 'Lecturas de la caché de productos por nivel'),
+    'inventario_limite_excedido_total': ('counter', 'Peticiones rechazadas (429) por alcance del límite'),
+}
+
+
+# Mediciones de la petición en curso. Las vistas asíncronas ejecutan las
+# consultas en otros hilos; contextvars las sigue hasta ellos.
+_peticion = contextvars.ContextVar('metricas_peticion', default=None)
+
+
+def iniciar_peticion():
+    medicion = {'consultas': 0, 'consultas_segundos': 0.0, 'serializacion': 0.0, 'render': 0.0}
+    return medicion, _peticion.set(medicion)
+
+
+def terminar_peticion(token):
+    _peticion.reset(token)
+
+
+# Envoltura de ejecución instalada en cada conexión (ver signals)
+def contar_consulta(execute, sql, params, many, context):
+    medicion = _peticion.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicion['consultas'] += 1
+        medicion['consultas_segundos'] += time.perf_counter() - inicio
+
+
+# Acumula en la petición en curso el tiempo de un bloque ('serializacion' o 'render')
+@contextmanager
+def medir(tipo):
+    medicion = _peticion.get()
+    if medicion is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        medicion[tipo] += time.perf_counter() - inicio
+
+
+def registrar(vista, metodo, estado, segundos, medicion, tamano=None):
+    etiquetas = (('vista', vista), ('metodo', metodo))
+    with _candado:
+        for nombre, limites, valor in (
+            ('inventario_peticion_segundos', LIMITES_SEGUNDOS, segundos),
+            ('inventario_peticion_consultas', LIMITES_CONSULTAS, medicion['consultas']),
+            ('inventario_respuesta_bytes', LIMITES_BYTES, tamano),
+        ):
+            if valor is not None:
+                _histogramas.setdefault((nombre, etiquetas), Histograma(limites)).observar(valor)
+        for nombre, valor in (
+            ('inventario_peticiones_total', 1),
+            ('inventario_consultas_segundos_total', medicion['consultas_segundos']),
+            ('inventario_serializacion_segundos_total', medicion['serializacion']),
+            ('inventario_render_segundos_total', medicion['render']),
+        ):
+            clave = (nombre, etiquetas + (('estado', str(estado)),) if nombre == 'inventario_peticiones_total' else etiquetas)
+            _contadores[clave] = _contadores.get(clave, 0) + valor
+
+
+def incrementar(nombre, **etiquetas):
+    clave = (nombre, tuple(sorted(etiquetas.items())))
+    with _candado:
+        _contadores[clave] = _contadores.get(clave, 0) + 1
+
+
+def reiniciar():
+    with _candado:
+        _histogramas.clear()
+        _contadores.clear()
+
+
+def _etiquetas(pares):
+    if not pares:
+        return ''
+    texto = ','.join(
+        '{}="{}"'.format(nombre, str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for nombre, valor in pares
+    )
+    return '{' + texto + '}'
+
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+# Formato de texto de Prometheus (versión 0.0.4)
+def exportar(extra=()):
+    with _candado:
+        histogramas = {clave: (list(h.cubetas), h.suma, h.total, h.limites) for clave, h in _histogramas.items()}
+        contadores = dict(_contadores)
+    for nombre, etiquetas, valor in extra:
+        contadores[(nombre, tuple(sorted(etiquetas.items())))] = valor
+
+    lineas = []
+    for nombre, (tipo, descripcion) in DESCRIPCIONES.items():
+        series = sorted(clave for clave in (histogramas if tipo == 'histogram' else contadores) if clave[0] == nombre)
+        if not series:
+            continue
+        lineas.append(f'# HELP {nombre} {descripcion}')
+        lineas.append(f'# TYPE {nombre} {tipo}')
+        for clave in series:
+            etiquetas = clave[1]
+            if tipo == 'counter':
+                lineas.append(f'{nombre}{_etiquetas(etiquetas)} {_numero(contadores[clave])}')
+                continue
+            cubetas, suma, total, limites = histogramas[clave]
+            acumulado = 0
+            for limite, cantidad in zip(limites, cubetas):
+                acumulado += cantidad
+                lineas.append(f'{nombre}_bucket{_etiquetas(etiquetas + (("le", _numero(limite)),))} {acumulado}')
+            lineas.append(f'{nombre}_bucket{_etiquetas(etiquetas + (("le", "+Inf"),))} {total}')
+            lineas.append(f'{nombre}_sum{_etiquetas(etiquetas)} {_numero(suma)}')
+            lineas.append(f'{nombre}_count{_etiquetas(etiquetas)} {total}')
+    return '\n'.join(lineas) + '\n'
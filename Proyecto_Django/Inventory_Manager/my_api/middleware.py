@@ -0,0 +1,170 @@
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+from . import metricas, replicas
+
+try:
+    import brotli
+except ImportError:  # Sin brotli solo se ofrece gzip
+    brotli = None
+
+
+logger = logging.getLogger(__name__)
+
+# Configuración por defecto; puede sobrescribirse con COMPRESION en settings
+CONFIGURACION = {
+    'TAMANO_MINIMO': 1024,  # Bytes; las respuestas más pequeñas no se comprimen
+    'NIVEL_BROTLI': 5,  # 0-11; los niveles altos son demasiado lentos para respuestas dinámicas
+}
+
+
+def configuracion(clave):
+    return getattr(settings, 'COMPRESION', {}).get(clave, CONFIGURACION[clave])
+
+
+# Codificaciones aceptadas por el cliente (las que tienen q=0 se descartan)
+def codificaciones_aceptadas(request):
+    aceptadas = set()
+    for parte in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        nombre, _, parametros = parte.strip().partition(';')
+        calidad = parametros.strip()
+        if calidad.startswith('q='):
+            try:
+                if float(calidad[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if nombre:
+            aceptadas.add(nombre.strip().lower())
+    return aceptadas
+
+
+# Comprime con brotli o gzip según Accept-Encoding. Las respuestas en
+# streaming (exportaciones) se comprimen con gzip por bloques.
+class CompresionMiddleware(GZipMiddleware):
+    def process_response(self, request, response):
+        if not response.streaming and len(response.content) < configuracion('TAMANO_MINIMO'):
+            return response
+        if response.has_header('Content-Encoding'):
+            return response
+
+        aceptadas = codificaciones_aceptadas(request)
+        if brotli is not None and 'br' in aceptadas and not response.streaming:
+            patch_vary_headers(response, ('Accept-Encoding',))
+            comprimido = brotli.compress(response.content, quality=configuracion('NIVEL_BROTLI'))
+            if len(comprimido) >= len(response.content):
+                return response
+            response.content = comprimido
+            response.headers['Content-Length'] = str(len(comprimido))
+            etag = response.get('ETag')
+            if etag and etag.startswith('"'):
+                response.headers['ETag'] = 'W/' + etag
+            response.headers['Content-Encoding'] = 'br'
+            return response
+        if 'gzip' not in aceptadas:
+            patch_vary_headers(response, ('Accept-Encoding',))
+            return response
+        return super().process_response(request, response)
+
+
+# Registra por vista (nombre de la ruta) la latencia, las consultas y su
+# tiempo, el tiempo de serialización y el tamaño de la respuesta. Advierte en
+# el log cuando una petición supera el presupuesto de consultas.
+class MetricasMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.asincrono = iscoroutinefunction(get_response)
+        if self.asincrono:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.asincrono:
+            return self.__acall__(request)
+        medicion, token = metricas.iniciar_peticion()
+        inicio = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metricas.terminar_peticion(token)
+        self.registrar(request, response, time.perf_counter() - inicio, medicion)
+        return response
+
+    async def __acall__(self, request):
+        medicion, token = metricas.iniciar_peticion()
+        inicio = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metricas.terminar_peticion(token)
+        self.registrar(request, response, time.perf_counter() - inicio, medicion)
+        return response
+
+    def registrar(self, request, response, segundos, medicion):
+        # Sin ruta (404) todas las peticiones comparten una serie para acotar las etiquetas
+        vista = request.resolver_match.view_name if request.resolver_match else 'sin_ruta'
+        tamano = None if response.streaming else len(response.content)
+        metricas.registrar(vista, request.method, response.status_code, segundos, medicion, tamano)
+
+        presupuesto = metricas.configuracion('PRESUPUESTO_CONSULTAS')
+        if presupuesto is not None and medicion['consultas'] > presupuesto:
+            metricas.incrementar('inventario_presupuesto_excedido_total', vista=vista)
+            logger.warning(
+                '%s %s (%s): %d consultas, presupuesto %d',
+                request.method, request.path, vista, medicion['consultas'], presupuesto,
+            )
+
+
+# Estado de lectura de réplicas de cada petición (ver replicas.py). Las
+# peticiones que no son GET/HEAD, y las de un cliente que escribió hace poco,
+# leen de la primaria; si la petición escribe, el cliente queda fijado.
+class ReplicasMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.asincrono = iscoroutinefunction(get_response)
+        if self.asincrono:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.asincrono:
+            return self.__acall__(request)
+        estado, token = replicas.iniciar_peticion(self.lee_primaria(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            replicas.terminar_peticion(token)
+        return self.terminar(request, response, estado)
+
+    async def __acall__(self, request):
+        primaria = await sync_to_async(self.lee_primaria)(request)
+        estado, token = replicas.iniciar_peticion(primaria)
+        try:
+            response = await self.get_response(request)
+        finally:
+            replicas.terminar_peticion(token)
+        if estado['escribio']:
+            await sync_to_async(replicas.fijar_cliente)(request)
+        return response
+
+    def lee_primaria(self, request):
+        if not replicas.alias_replicas():
+            return True
+        return request.method not in ('GET', 'HEAD') or replicas.cliente_fijado(request)
+
+    def terminar(self, request, response, estado):
+        if estado['escribio']:
+            replicas.fijar_cliente(request)
+        if response.streaming and not response.is_async:
+            # Las exportaciones consultan mientras se envía el contenido
+            response.streaming_content = replicas.contenido_con_estado(estado, response.streaming_content)
+        return response
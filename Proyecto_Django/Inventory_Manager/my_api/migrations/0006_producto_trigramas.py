@@ -0,0 +1,65 @@
+# Generated by Django 5.1.15 on 2026-10-18 11:06
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Copia de my_api.search.trigramas en el momento de la migración: la
+# migración no debe cambiar si el módulo cambia después
+def trigramas(texto):
+    texto = unicodedata.normalize('NFKD', texto or '').encode('ascii', 'ignore').decode('ascii')
+    resultado = set()
+    for palabra in re.findall(r'[a-z0-9]+', texto.lower()):
+        relleno = f'  {palabra} '
+        resultado.update(relleno[i:i + 3] for i in range(len(relleno) - 2))
+    return resultado
+
+
+# PostgreSQL: índices GIN de trigramas (pg_trgm) sobre los nombres
+def crear_indices_trigramas(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        schema_editor.execute('CREATE INDEX IF NOT EXISTS productos_nombre_trgm_idx ON productos USING gin (nombre gin_trgm_ops)')
+        schema_editor.execute('CREATE INDEX IF NOT EXISTS categorias_nombre_trgm_idx ON categorias USING gin (nombre gin_trgm_ops)')
+        return
+    # Otros motores: llenar la tabla de trigramas con los productos existentes
+    Producto = apps.get_model('my_api', 'Producto')
+    ProductoTrigrama = apps.get_model('my_api', 'ProductoTrigrama')
+    ProductoTrigrama.objects.bulk_create([
+        ProductoTrigrama(producto_id=producto_id, trigrama=trigrama)
+        for producto_id, nombre in Producto.objects.values_list('id', 'nombre').iterator()
+        for trigrama in trigramas(nombre)
+    ], batch_size=5000)
+
+
+def borrar_indices_trigramas(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS productos_nombre_trgm_idx')
+        schema_editor.execute('DROP INDEX IF EXISTS categorias_nombre_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('my_api', '0005_alter_producto_codigo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductoTrigrama',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigrama', models.CharField(max_length=3)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trigramas', to='my_api.producto')),
+            ],
+            options={
+                'db_table': 'productos_trigramas',
+                'indexes': [models.Index(fields=['trigrama', 'producto'], name='trigrama_producto_idx')],
+                'constraints': [models.UniqueConstraint(fields=('producto', 'trigrama'), name='producto_trigrama_unico')],
+            },
+        ),
+        migrations.RunPython(crear_indices_trigramas, borrar_indices_trigramas),
+    ]
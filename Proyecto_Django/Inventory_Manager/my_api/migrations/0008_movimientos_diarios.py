@@ -0,0 +1,57 @@
+# Generated by Django 5.1.15 on 2026-10-18 11:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
+
+
+# Calcula los resúmenes de los movimientos ya existentes
+def llenar_resumenes(apps, schema_editor):
+    Movimiento = apps.get_model('my_api', 'Movimiento')
+    MovimientoDiario = apps.get_model('my_api', 'MovimientoDiario')
+
+    def suma(tipo):
+        return Coalesce(Sum('cantidad', filter=Q(tipo=tipo)), 0, output_field=IntegerField())
+
+    filas = (
+        Movimiento.objects.order_by()
+        .annotate(dia=TruncDate('fecha'))
+        .values('producto', 'dia')
+        .annotate(entradas=suma('entrada'), salidas=suma('salida'), ajustes=suma('ajuste'), movimientos=Count('id'))
+    )
+    MovimientoDiario.objects.bulk_create([
+        MovimientoDiario(
+            producto_id=fila['producto'], dia=fila['dia'], entradas=fila['entradas'],
+            salidas=fila['salidas'], ajustes=fila['ajustes'], movimientos=fila['movimientos'],
+        )
+        for fila in filas.iterator()
+    ], batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('my_api', '0007_indices_movimientos_productos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovimientoDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('entradas', models.IntegerField(default=0)),
+                ('salidas', models.IntegerField(default=0)),
+                ('ajustes', models.IntegerField(default=0)),
+                ('movimientos', models.IntegerField(default=0)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_diarios', to='my_api.producto')),
+            ],
+            options={
+                'db_table': 'movimientos_diarios',
+                'indexes': [models.Index(fields=['dia'], name='movimiento_diario_dia_idx')],
+                'constraints': [models.UniqueConstraint(fields=('producto', 'dia'), name='movimiento_diario_unico')],
+            },
+        ),
+        migrations.RunPython(llenar_resumenes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.15 on 2026-10-18 11:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('my_api', '0008_movimientos_diarios'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='productotrigrama',
+            name='producto',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='trigramas', to='my_api.producto'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.1.15 on 2026-10-18 11:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('my_api', '0009_trigrama_sin_indice_producto'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Eliminacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo', models.CharField(choices=[('producto', 'Producto'), ('categoria', 'Categoría')], max_length=20)),
+                ('objeto_id', models.BigIntegerField()),
+                ('fecha', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'eliminaciones',
+            },
+        ),
+        migrations.AddField(
+            model_name='categoria',
+            name='fecha_actualizacion',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='fecha_actualizacion',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='categoria',
+            index=models.Index(fields=['fecha_actualizacion', 'id'], name='categoria_actualizacion_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['fecha_actualizacion', 'id'], name='producto_actualizacion_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eliminacion',
+            index=models.Index(fields=['fecha', 'id'], name='eliminacion_fecha_idx'),
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.1.15 on 2026-10-18 11:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Vista con los movimientos vigentes y los archivados (modelo MovimientoHistorico).
+# Los filtros por fecha se aplican a cada tabla con sus propios índices.
+CREAR_VISTA = '''
+CREATE VIEW movimientos_historico AS
+    SELECT id, producto_id, tipo, cantidad, fecha FROM movimientos_inventario
+    UNION ALL
+    SELECT id, producto_id, tipo, cantidad, fecha FROM movimientos_archivados
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('my_api', '0010_sincronizacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovimientoHistorico',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('tipo', models.CharField(choices=[('entrada', 'Entrada'), ('salida', 'Salida'), ('ajuste', 'Ajuste')], max_length=10)),
+                ('cantidad', models.IntegerField()),
+                ('fecha', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'movimientos_historico',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='CorteArchivo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha_corte', models.DateTimeField()),
+                ('movimientos', models.IntegerField()),
+                ('fecha', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'cortes_archivo',
+            },
+        ),
+        migrations.CreateModel(
+            name='SaldoApertura',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha_corte', models.DateTimeField()),
+                ('saldo', models.IntegerField()),
+                ('producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='saldo_apertura', to='my_api.producto')),
+            ],
+            options={
+                'db_table': 'saldos_apertura',
+            },
+        ),
+        migrations.CreateModel(
+            name='MovimientoArchivado',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('tipo', models.CharField(choices=[('entrada', 'Entrada'), ('salida', 'Salida'), ('ajuste', 'Ajuste')], max_length=10)),
+                ('cantidad', models.IntegerField()),
+                ('fecha', models.DateTimeField()),
+                ('producto', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='movimientos_archivados', to='my_api.producto')),
+            ],
+            options={
+                'db_table': 'movimientos_archivados',
+                'indexes': [models.Index(fields=['producto', 'fecha'], name='archivado_producto_fecha_idx'), models.Index(fields=['fecha', 'id'], name='archivado_fecha_idx')],
+            },
+        ),
+        migrations.RunSQL(CREAR_VISTA, 'DROP VIEW movimientos_historico'),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.15 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('my_api', '0011_archivo_movimientos'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['fecha_creacion', 'id'], name='producto_creacion_idx'),
+        ),
+    ]
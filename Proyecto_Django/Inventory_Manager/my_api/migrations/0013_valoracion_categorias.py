@@ -0,0 +1,70 @@
+# Generated by Django 5.1.15 on 2026-10-18 12:08
+
+import django.db.models.deletion
+import django.db.models.functions.comparison
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import Coalesce
+
+
+# Calcula la valoración de los productos ya existentes
+def llenar_valoracion(apps, schema_editor):
+    Producto = apps.get_model('my_api', 'Producto')
+    ResumenCategoria = apps.get_model('my_api', 'ResumenCategoria')
+    valor = ExpressionWrapper(F('stock') * F('precio'), output_field=DecimalField(max_digits=20, decimal_places=2))
+    filas = (
+        Producto.objects.order_by().values('categoria')
+        .annotate(
+            productos=Count('id'), unidades=Coalesce(Sum('stock'), 0), valor=Coalesce(Sum(valor), 0, output_field=valor.output_field),
+            bajo_reorden=Count('id', filter=Q(stock__lt=F('punto_reorden'))),
+        )
+    )
+    ResumenCategoria.objects.bulk_create([
+        ResumenCategoria(
+            categoria_id=fila['categoria'], productos=fila['productos'], unidades=fila['unidades'],
+            valor=fila['valor'], bajo_reorden=fila['bajo_reorden'],
+        )
+        for fila in filas
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('my_api', '0012_indice_creacion_productos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenCategoria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('productos', models.IntegerField(default=0)),
+                ('unidades', models.BigIntegerField(default=0)),
+                ('valor', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('bajo_reorden', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'resumenes_categoria',
+            },
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='punto_reorden',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(condition=models.Q(('stock__lt', models.F('punto_reorden'))), fields=['id'], name='producto_reorden_idx'),
+        ),
+        migrations.AddField(
+            model_name='resumencategoria',
+            name='categoria',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='resumen', to='my_api.categoria'),
+        ),
+        migrations.AddConstraint(
+            model_name='resumencategoria',
+            constraint=models.UniqueConstraint(django.db.models.functions.comparison.Coalesce('categoria', 0), name='resumen_categoria_unico'),
+        ),
+        migrations.RunPython(llenar_valoracion, migrations.RunPython.noop),
+    ]
@@ -1,13 +1,28 @@
 import uuid
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Coalesce
+
+
+# Intentos para generar un código libre antes de rendirse
+INTENTOS_CODIGO = 5
+
+
+# Código de producto aleatorio, por ejemplo P5F3D2A1B
+def generar_codigo():
+    return f'P{uuid.uuid4().hex[:8].upper()}'
 
 # Modelo para las categorías de productos
 class Categoria(models.Model):
     nombre = models.CharField(max_length=100)  # Nombre de la categoría
     descripcion = models.TextField(blank=True, null=True)  # Descripción opcional
+    fecha_actualizacion = models.DateTimeField(auto_now=True)  # Última modificación (sincronización)
 
     class Meta:
         db_table = 'categorias'  # Nombre de la tabla en la base de datos
+        indexes = [
+            models.Index(fields=['fecha_actualizacion', 'id'], name='categoria_actualizacion_idx'),
+        ]
 
     def __str__(self):
         return self.nombre # Representación en texto de la categoría
@@ -21,19 +36,37 @@ class Producto(models.Model):
     stock = models.IntegerField() # Cantidad en stock
     precio = models.DecimalField(max_digits=10, decimal_places=2) # Precio del producto
     categoria = models.ForeignKey('Categoria', on_delete=models.SET_NULL, null=True, blank=True) # Relación con categoría
+    punto_reorden = models.IntegerField(default=0)  # Por debajo de este stock hay que reponer (0: sin aviso)
     fecha_creacion = models.DateTimeField(auto_now_add=True) # Fecha de creación
+    fecha_actualizacion = models.DateTimeField(auto_now=True) # Última modificación (sincronización)
 
     class Meta:
         db_table = 'productos'  # Nombre de la tabla en la base de datos
+        indexes = [
+            models.Index(fields=['fecha_actualizacion', 'id'], name='producto_actualizacion_idx'),
+            models.Index(fields=['categoria', 'precio'], name='producto_categoria_precio_idx'),
+            models.Index(fields=['precio'], name='producto_precio_idx'),
+            models.Index(fields=['fecha_creacion', 'id'], name='producto_creacion_idx'),  # Jerarquía de fechas del admin
+            # Índice parcial: solo los productos bajo su punto de reorden
+            models.Index(fields=['id'], condition=Q(stock__lt=F('punto_reorden')), name='producto_reorden_idx'),
+        ]
     
     def __str__(self):
         return self.nombre  # Representación en texto del producto
 
     def save(self, *args, **kwargs):
-        # Generar automáticamente un código único si no se ha proporcionado
-        if not self.codigo:
-            self.codigo = f'P{uuid.uuid4().hex[:8].upper()}'  # Ejemplo: P5F3D2A1B
-        super().save(*args, **kwargs)
+        if self.codigo:
+            return super().save(*args, **kwargs)
+        # Generar automáticamente un código único si no se ha proporcionado;
+        # si choca con uno existente se genera otro
+        for intento in range(INTENTOS_CODIGO):
+            self.codigo = generar_codigo()
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                if intento == INTENTOS_CODIGO - 1:
+                    raise
 
 # Modelo para los movimientos de inventario (entrada/salida/ajuste)
 class Movimiento(models.Model):
@@ -49,6 +82,157 @@ class Movimiento(models.Model):
 
     class Meta:
         db_table = 'movimientos_inventario'
+        indexes = [
+            models.Index(fields=['producto', 'fecha'], name='movimiento_producto_fecha_idx'),
+            models.Index(fields=['tipo', 'fecha'], name='movimiento_tipo_fecha_idx'),
+            models.Index(fields=['fecha', 'id'], name='movimiento_fecha_idx'),  # Orden de la paginación
+        ]
     
     def __str__(self):
-        return f"{self.tipo} - {self.producto.nombre} ({self.cantidad})"
+        # Sin consultar el producto si no se cargó junto al movimiento (select_related)
+        producto = self.producto.nombre if Movimiento.producto.is_cached(self) else self.producto_id
+        return f"{self.tipo} - {producto} ({self.cantidad})"
+
+
+# Índice de trigramas del nombre de los productos para búsqueda aproximada
+# en motores sin pg_trgm (SQLite). Se mantiene al guardar cada producto.
+class ProductoTrigrama(models.Model):
+    # Sin índice propio: la restricción única (producto, trigrama) ya lo cubre
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='trigramas', db_index=False)
+    trigrama = models.CharField(max_length=3)
+
+    class Meta:
+        db_table = 'productos_trigramas'
+        constraints = [
+            models.UniqueConstraint(fields=['producto', 'trigrama'], name='producto_trigrama_unico'),
+        ]
+        indexes = [
+            models.Index(fields=['trigrama', 'producto'], name='trigrama_producto_idx'),
+        ]
+
+
+# Totales diarios de movimientos por producto (se mantienen al registrar
+# cada movimiento) para reportes sin recorrer movimientos_inventario
+class MovimientoDiario(models.Model):
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='resumenes_diarios')
+    dia = models.DateField()  # Día en la zona horaria local
+    entradas = models.IntegerField(default=0)  # Unidades ingresadas
+    salidas = models.IntegerField(default=0)  # Unidades retiradas
+    ajustes = models.IntegerField(default=0)  # Suma con signo de los ajustes
+    movimientos = models.IntegerField(default=0)  # Cantidad de movimientos del día
+
+    class Meta:
+        db_table = 'movimientos_diarios'
+        constraints = [
+            models.UniqueConstraint(fields=['producto', 'dia'], name='movimiento_diario_unico'),
+        ]
+        indexes = [
+            models.Index(fields=['dia'], name='movimiento_diario_dia_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.producto_id} - {self.dia}"
+
+
+
+# Registro de borrados para la sincronización incremental de los clientes
+class Eliminacion(models.Model):
+    MODELO_CHOICES = [
+        ('producto', 'Producto'),
+        ('categoria', 'Categoría'),
+    ]
+    modelo = models.CharField(max_length=20, choices=MODELO_CHOICES)  # Tipo del objeto eliminado
+    objeto_id = models.BigIntegerField()  # Id del objeto eliminado
+    fecha = models.DateTimeField(auto_now_add=True)  # Fecha del borrado
+
+    class Meta:
+        db_table = 'eliminaciones'
+        indexes = [
+            models.Index(fields=['fecha', 'id'], name='eliminacion_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.modelo} {self.objeto_id}"
+
+
+# Movimientos antiguos trasladados desde movimientos_inventario (ver archivo.py).
+# Conservan su id original; solo tienen los índices que usan las búsquedas por fecha.
+class MovimientoArchivado(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='movimientos_archivados', db_index=False)
+    tipo = models.CharField(max_length=10, choices=Movimiento.TIPO_CHOICES)
+    cantidad = models.IntegerField()
+    fecha = models.DateTimeField()
+
+    class Meta:
+        db_table = 'movimientos_archivados'
+        indexes = [
+            models.Index(fields=['producto', 'fecha'], name='archivado_producto_fecha_idx'),
+            models.Index(fields=['fecha', 'id'], name='archivado_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo} - {self.producto_id} ({self.cantidad})"
+
+
+# Movimientos vigentes y archivados juntos: vista UNION ALL de solo lectura
+# creada en la migración 0011
+class MovimientoHistorico(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    producto = models.ForeignKey(Producto, on_delete=models.DO_NOTHING, related_name='+')
+    tipo = models.CharField(max_length=10, choices=Movimiento.TIPO_CHOICES)
+    cantidad = models.IntegerField()
+    fecha = models.DateTimeField()
+
+    class Meta:
+        managed = False
+        db_table = 'movimientos_historico'
+
+
+# Cada ejecución del archivado: los movimientos anteriores a fecha_corte ya
+# no están en movimientos_inventario
+class CorteArchivo(models.Model):
+    fecha_corte = models.DateTimeField()  # Medianoche local del primer día no archivado
+    movimientos = models.IntegerField()  # Movimientos trasladados en esta ejecución
+    fecha = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'cortes_archivo'
+
+    def __str__(self):
+        return f"{self.fecha_corte} ({self.movimientos})"
+
+
+# Stock de cada producto al momento del último corte: saldo de apertura de
+# los movimientos vigentes (saldo + movimientos vigentes = stock)
+class SaldoApertura(models.Model):
+    producto = models.OneToOneField(Producto, on_delete=models.CASCADE, related_name='saldo_apertura')
+    fecha_corte = models.DateTimeField()
+    saldo = models.IntegerField()
+
+    class Meta:
+        db_table = 'saldos_apertura'
+
+    def __str__(self):
+        return f"{self.producto_id} - {self.fecha_corte}: {self.saldo}"
+
+
+# Valoración del inventario por categoría (una fila por categoría y otra para
+# los productos sin categoría). Se mantiene al guardar productos y al registrar
+# movimientos; el comando verificar_valoracion la compara con `productos`.
+class ResumenCategoria(models.Model):
+    categoria = models.OneToOneField(Categoria, on_delete=models.CASCADE, null=True, blank=True, related_name='resumen')
+    productos = models.IntegerField(default=0)  # Productos de la categoría
+    unidades = models.BigIntegerField(default=0)  # Suma del stock
+    valor = models.DecimalField(max_digits=20, decimal_places=2, default=0)  # Suma de stock * precio
+    bajo_reorden = models.IntegerField(default=0)  # Productos con stock < punto_reorden
+
+    class Meta:
+        db_table = 'resumenes_categoria'
+        constraints = [
+            # Una sola fila para los productos sin categoría
+            models.UniqueConstraint(Coalesce('categoria', 0), name='resumen_categoria_unico'),
+        ]
+
+    def __str__(self):
+        return f"{self.categoria_id}: {self.valor}"
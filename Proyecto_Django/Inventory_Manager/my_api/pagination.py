@@ -0,0 +1,175 @@
+import base64
+import json
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.urls import replace_query_param
+
+
+# Paginación por cursor (keyset): no ejecuta COUNT(*) y el costo de cada página
+# no depende del tamaño de la tabla ni de la posición dentro de ella.
+class InventarioCursorPagination(CursorPagination):
+    page_size = 50  # Tamaño de página por defecto
+    page_size_query_param = 'page_size'  # Permite al cliente pedir otro tamaño
+    max_page_size = 200  # Límite superior para proteger la base de datos
+    cursor_query_param = 'cursor'
+
+
+# Productos ordenados por id (clave única, cursor estable)
+class ProductoCursorPagination(InventarioCursorPagination):
+    ordering = ('id',)
+
+
+# Movimientos del más reciente al más antiguo; el id desempata fechas iguales
+class MovimientoCursorPagination(InventarioCursorPagination):
+    ordering = ('-fecha', '-id')
+
+
+# Paginación por claves: el cursor guarda todas las columnas del orden y cada
+# página filtra por comparación de tuplas, sin desplazamiento. Necesaria
+# cuando la primera columna del orden tiene muchos empates (CursorPagination
+# solo recuerda la primera columna más un desplazamiento limitado a
+# `offset_cutoff`). Solo se avanza (next).
+def _posicion(cursor, ordering):
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise NotFound('Cursor inválido')
+    if not isinstance(valores, list) or len(valores) != len(ordering) or not all(map(_escalar, valores)):
+        raise NotFound('Cursor inválido')
+    return valores
+
+
+# Solo números y textos; bool es subclase de int pero no es un valor válido
+def _escalar(valor):
+    return isinstance(valor, (str, int, float)) and not isinstance(valor, bool)
+
+
+# Filas del queryset posteriores al cursor. Un valor que no convierte al tipo
+# de su columna (un texto en id, una fecha mal formada) es un cursor inválido.
+def _filtrar_cursor(queryset, cursor, ordering):
+    try:
+        return queryset.filter(_despues_de(ordering, _posicion(cursor, ordering)))
+    except (ValueError, TypeError, ValidationError):
+        raise NotFound('Cursor inválido')
+
+
+# Filas posteriores a la posición: (a > x) o (a = x y b > y) ...
+def _despues_de(ordering, valores):
+    condicion = Q(pk__in=[])
+    iguales = Q()
+    for campo, valor in zip(ordering, valores):
+        nombre = campo.lstrip('-')
+        operador = 'lt' if campo.startswith('-') else 'gt'
+        condicion |= iguales & Q(**{f'{nombre}__{operador}': valor})
+        iguales &= Q(**{nombre: valor})
+    return condicion
+
+
+def _codificar(fila, ordering):
+    valores = []
+    for campo in ordering:
+        nombre = campo.lstrip('-')
+        valor = fila[nombre] if isinstance(fila, dict) else getattr(fila, nombre)
+        valores.append(valor.isoformat() if isinstance(valor, datetime) else valor)
+    return base64.urlsafe_b64encode(json.dumps(valores, cls=DjangoJSONEncoder).encode()).decode()
+
+
+# Interfaz de CursorPagination (paginate_queryset / get_paginated_response)
+# con cursor por claves
+class InventarioClavesPagination(InventarioCursorPagination):
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = _filtrar_cursor(queryset, cursor, self.ordering)
+        filas = list(queryset.order_by(*self.ordering)[:self.page_size + 1])
+        self.siguiente = None
+        if len(filas) > self.page_size:
+            filas = filas[:self.page_size]
+            self.siguiente = _codificar(filas[-1], self.ordering)
+        return filas
+
+    def get_next_link(self):
+        if self.siguiente is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.siguiente)
+
+    def get_previous_link(self):
+        return None
+
+
+# Resultados de búsqueda ordenados por relevancia (anotación `rango`); muchos
+# productos comparten el mismo rango, por eso el cursor es por claves
+class ProductoRangoCursorPagination(InventarioClavesPagination):
+    ordering = ('-rango', 'id')
+
+
+# Paginación por cursor para las vistas asíncronas (ASGI). Usa el mismo orden
+# y los mismos límites que la clase de DRF indicada, con el cursor por claves.
+class PaginacionAsincrona:
+    def __init__(self, clase):
+        self.clase = clase
+        self.ordering = clase.ordering
+
+    def tamano(self, params):
+        try:
+            return max(1, min(int(params[self.clase.page_size_query_param]), self.clase.max_page_size))
+        except (KeyError, ValueError):
+            return self.clase.page_size
+
+    # Devuelve (filas, url de la página siguiente o None). `queryset` debe ser
+    # un values() que incluya las columnas del orden.
+    async def paginar(self, queryset, request):
+        params = request.GET
+        tamano = self.tamano(params)
+        cursor = params.get(self.clase.cursor_query_param)
+        if cursor:
+            queryset = _filtrar_cursor(queryset, cursor, self.ordering)
+        filas = [fila async for fila in queryset.order_by(*self.ordering)[:tamano + 1]]
+        siguiente = None
+        if len(filas) > tamano:
+            filas = filas[:tamano]
+            siguiente = replace_query_param(request.build_absolute_uri(), self.clase.cursor_query_param, _codificar(filas[-1], self.ordering))
+        return filas, siguiente
+
+
+# Filas estimadas por el planificador de PostgreSQL para un queryset (la
+# estadística de la tabla si no tiene filtros); None en otros motores.
+def estimar_filas(queryset):
+    conexion = connections[queryset.db]
+    if conexion.vendor != 'postgresql':
+        return None
+    with conexion.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [queryset.model._meta.db_table])
+            fila = cursor.fetchone()
+            return fila[0] if fila and fila[0] >= 0 else None
+        consulta, parametros = queryset.order_by().query.sql_with_params()
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {consulta}', parametros)
+        plan = cursor.fetchone()[0]
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        return plan[0]['Plan']['Plan Rows']
+
+
+# Paginador del admin para tablas grandes: por encima del umbral usa la
+# estimación del planificador en lugar de COUNT(*), que recorre toda la tabla.
+# Las páginas siguen siendo exactas; solo el total es aproximado.
+class PaginadorEstimado(Paginator):
+    umbral = 100000
+
+    @cached_property
+    def count(self):
+        if hasattr(self.object_list, 'query'):
+            estimado = estimar_filas(self.object_list)
+            if estimado is not None and estimado > self.umbral:
+                return estimado
+        return super().count
@@ -0,0 +1,50 @@
+import decimal
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from . import metricas
+
+try:
+    import orjson
+except ImportError:  # Sin orjson se usa el JSONRenderer de DRF
+    orjson = None
+
+
+_codificador = JSONEncoder()
+
+
+# Tipos que orjson no serializa igual que DRF. Los Decimal se escriben como
+# texto (igual que DecimalField con COERCE_DECIMAL_TO_STRING) para no perder
+# precisión; las fechas pasan por el codificador de DRF, que recorta los
+# microsegundos a milisegundos y usa 'Z' para UTC.
+def _por_defecto(obj):
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    return _codificador.default(obj)
+
+
+# JSONRenderer respaldado por orjson. Con indentación (API navegable o
+# 'application/json; indent=4') o sin orjson instalado se usa el de DRF.
+class ORJSONRenderer(JSONRenderer):
+    if orjson is not None:
+        opciones = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with metricas.medir('render'):
+            return self._render(data, accepted_media_type, renderer_context)
+
+    def _render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            resultado = orjson.dumps(data, default=_por_defecto, option=self.opciones)
+        except orjson.JSONEncodeError:
+            # Enteros de más de 64 bits y otros casos que orjson no admite
+            return super().render(data, accepted_media_type, renderer_context)
+        # Igual que DRF: U+2028 y U+2029 se escapan para que el JSON sea JavaScript válido
+        if b'\xe2\x80\xa8' in resultado or b'\xe2\x80\xa9' in resultado:
+            resultado = resultado.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return resultado
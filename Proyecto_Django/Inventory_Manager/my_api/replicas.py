@@ -0,0 +1,138 @@
+import contextvars
+import hashlib
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.utils.connection import ConnectionDoesNotExist
+
+logger = logging.getLogger(__name__)
+
+
+# Configuración por defecto; puede sobrescribirse con REPLICAS en settings
+CONFIGURACION = {
+    'ALIAS': None,  # Alias de las réplicas; por defecto todos los de DATABASES salvo 'default'
+    'FIJAR_SEGUNDOS': 5,  # Tras escribir, el cliente lee de la primaria durante este tiempo
+    'SALUD_SEGUNDOS': 10,  # Vigencia de la comprobación de cada réplica en el proceso
+    'RETRASO_MAXIMO': 30,  # Segundos de retraso de replicación tolerados (PostgreSQL)
+}
+
+
+def configuracion(clave):
+    return getattr(settings, 'REPLICAS', {}).get(clave, CONFIGURACION[clave])
+
+
+def alias_replicas():
+    alias = configuracion('ALIAS')
+    if alias is None:
+        alias = [nombre for nombre in settings.DATABASES if nombre != DEFAULT_DB_ALIAS]
+    return alias
+
+
+# Estado de la petición en curso: {'primaria': bool}. Fuera de una petición
+# (comandos, tareas) no hay estado y todo se lee de la primaria.
+_peticion = contextvars.ContextVar('replicas_peticion', default=None)
+
+
+def iniciar_peticion(primaria):
+    estado = {'primaria': primaria, 'escribio': False}
+    return estado, _peticion.set(estado)
+
+
+def terminar_peticion(token):
+    _peticion.reset(token)
+
+
+# Contenido de una respuesta en streaming leído con el estado de su petición
+def contenido_con_estado(estado, contenido):
+    iterador = iter(contenido)
+    while True:
+        token = _peticion.set(estado)
+        try:
+            bloque = next(iterador)
+        except StopIteration:
+            return
+        finally:
+            _peticion.reset(token)
+        yield bloque
+
+
+# Clave de la caché que fija a un cliente (token o sesión) en la primaria
+def clave_cliente(request):
+    identidad = request.META.get('HTTP_AUTHORIZATION') or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if not identidad:
+        return None
+    return f'replicas:fijado:{hashlib.sha256(identidad.encode()).hexdigest()}'
+
+
+def cliente_fijado(request):
+    clave = clave_cliente(request)
+    return clave is not None and bool(cache.get(clave))
+
+
+def fijar_cliente(request):
+    clave = clave_cliente(request)
+    if clave is not None:
+        cache.set(clave, 1, configuracion('FIJAR_SEGUNDOS'))
+
+
+# Resultado de la última comprobación de cada réplica: alias -> (disponible, vence)
+_salud = {}
+
+# Retraso de una réplica de PostgreSQL; 0 si ya aplicó todo lo recibido
+CONSULTA_RETRASO = '''
+SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+            ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END
+'''
+
+
+def disponible(alias):
+    ahora = time.monotonic()
+    estado = _salud.get(alias)
+    if estado is not None and estado[1] > ahora:
+        return estado[0]
+    try:
+        conexion = connections[alias]
+        with conexion.cursor() as cursor:
+            if conexion.vendor == 'postgresql':
+                cursor.execute(CONSULTA_RETRASO)
+                retraso = cursor.fetchone()[0]
+                correcta = retraso <= configuracion('RETRASO_MAXIMO')
+                if not correcta:
+                    logger.warning('Réplica %s con %.0f s de retraso; se lee de la primaria', alias, retraso)
+            else:
+                cursor.execute('SELECT 1')
+                correcta = True
+    except (DatabaseError, ConnectionDoesNotExist):
+        logger.warning('Réplica %s no disponible; se lee de la primaria', alias, exc_info=True)
+        correcta = False
+    _salud[alias] = (correcta, ahora + configuracion('SALUD_SEGUNDOS'))
+    return correcta
+
+
+# Router: las lecturas de peticiones GET/HEAD van a una réplica sana; las
+# escrituras, las transacciones y todo lo que sigue a una escritura, a la primaria
+class RouterReplicas:
+    def db_for_read(self, model, **hints):
+        estado = _peticion.get()
+        if estado is None or estado['primaria'] or estado['escribio']:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        sanas = [alias for alias in alias_replicas() if disponible(alias)]
+        return random.choice(sanas) if sanas else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        estado = _peticion.get()
+        if estado is not None:
+            estado['escribio'] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # Las réplicas tienen los mismos datos que la primaria
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS  # Las réplicas se actualizan por replicación
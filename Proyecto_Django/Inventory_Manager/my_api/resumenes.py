@@ -0,0 +1,94 @@
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models import Count, IntegerField, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import MovimientoDiario, MovimientoHistorico
+
+
+# Columna del resumen diario que acumula cada tipo de movimiento
+COLUMNA_POR_TIPO = {
+    'entrada': 'entradas',
+    'salida': 'salidas',
+    'ajuste': 'ajustes',
+}
+
+COLUMNAS = ('entradas', 'salidas', 'ajustes', 'movimientos')
+
+
+# Suma (o resta, con signo=-1) los movimientos indicados a su resumen diario.
+# Debe llamarse dentro de la misma transacción que escribe los movimientos.
+def acumular(movimientos, signo=1):
+    totales = defaultdict(lambda: defaultdict(int))
+    for movimiento in movimientos:
+        clave = (movimiento.producto_id, timezone.localdate(movimiento.fecha))
+        totales[clave][COLUMNA_POR_TIPO[movimiento.tipo]] += signo * movimiento.cantidad
+        totales[clave]['movimientos'] += signo
+
+    # Siempre en el mismo orden: dos transacciones que tocan las mismas filas
+    # se esperan en lugar de bloquearse mutuamente
+    sumar_filas(MovimientoDiario, 'producto_id, dia', COLUMNAS, [
+        {'producto_id': producto_id, 'dia': dia, **{columna: valores[columna] for columna in COLUMNAS}}
+        for (producto_id, dia), valores in sorted(totales.items())
+    ])
+
+
+# Suma filas a una tabla de totales con INSERT ... ON CONFLICT DO UPDATE
+# (PostgreSQL y SQLite): inserta las que no existen e incrementa las columnas
+# `sumadas` de las existentes, sin una consulta por fila. `conflicto` es el
+# destino de la restricción única; cada fila es un dict columna -> valor y
+# todas tienen las mismas columnas. Se escriben en el orden recibido.
+def sumar_filas(modelo, conflicto, sumadas, filas):
+    if not filas:
+        return
+    nombre = connection.ops.quote_name
+    campos = {campo.column: campo for campo in modelo._meta.concrete_fields}
+    columnas = list(filas[0])
+    tabla = nombre(modelo._meta.db_table)
+    actualizar = ', '.join(f'{nombre(columna)} = {tabla}.{nombre(columna)} + EXCLUDED.{nombre(columna)}' for columna in sumadas)
+    tamano = connection.ops.bulk_batch_size([campos[columna] for columna in columnas], filas)
+    with connection.cursor() as cursor:
+        for inicio in range(0, len(filas), tamano):
+            bloque = filas[inicio:inicio + tamano]
+            valores = ', '.join(['(' + ', '.join(['%s'] * len(columnas)) + ')'] * len(bloque))
+            cursor.execute(
+                f"INSERT INTO {tabla} ({', '.join(map(nombre, columnas))}) VALUES {valores} "
+                f'ON CONFLICT ({conflicto}) DO UPDATE SET {actualizar}',
+                [campos[columna].get_db_prep_save(fila[columna], connection) for fila in bloque for columna in columnas],
+            )
+
+
+# Vuelve a calcular todos los resúmenes desde los movimientos vigentes y los
+# archivados. La agregación se inserta con un solo INSERT ... SELECT, sin pasar las filas
+# por Python.
+def reconstruir():
+    def suma(tipo):
+        return Coalesce(Sum('cantidad', filter=Q(tipo=tipo)), 0, output_field=IntegerField())
+
+    filas = (
+        MovimientoHistorico.objects.order_by()
+        .annotate(dia=TruncDate('fecha'))
+        .values('producto', 'dia')
+        .annotate(entradas=suma('entrada'), salidas=suma('salida'), ajustes=suma('ajuste'), movimientos=Count('id'))
+    )
+    consulta, parametros = filas.query.sql_with_params()
+    tabla = MovimientoDiario._meta.db_table
+    with transaction.atomic(), connection.cursor() as cursor:
+        MovimientoDiario.objects.all().delete()
+        cursor.execute(
+            f'INSERT INTO {tabla} (producto_id, dia, entradas, salidas, ajustes, movimientos) {consulta}',
+            parametros,
+        )
+    return MovimientoDiario.objects.count()
+
+
+# Variación neta de stock de un conjunto de filas del resumen
+def variacion_neta(resumenes):
+    totales = resumenes.aggregate(
+        entradas=Coalesce(Sum('entradas'), 0),
+        salidas=Coalesce(Sum('salidas'), 0),
+        ajustes=Coalesce(Sum('ajustes'), 0),
+    )
+    return totales['entradas'] - totales['salidas'] + totales['ajustes']
@@ -0,0 +1,104 @@
+import math
+import re
+import unicodedata
+
+from django.db import connection, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+
+from .models import Producto, ProductoTrigrama
+
+
+# Similitud mínima para considerar un resultado con la tabla de trigramas. En
+# PostgreSQL el filtro es el operador <% de pg_trgm, cuyo umbral es
+# pg_trgm.word_similarity_threshold.
+UMBRAL_SIMILITUD = 0.3
+
+
+# En PostgreSQL la búsqueda usa pg_trgm con un índice GIN; en el resto de
+# motores se usa la tabla de trigramas mantenida por la aplicación.
+def usa_pg_trgm():
+    return connection.vendor == 'postgresql'
+
+
+# Minúsculas y sin tildes, separado en palabras alfanuméricas
+def _palabras(texto):
+    texto = unicodedata.normalize('NFKD', texto or '').encode('ascii', 'ignore').decode('ascii')
+    return re.findall(r'[a-z0-9]+', texto.lower())
+
+
+# Trigramas al estilo de pg_trgm: cada palabra se rellena con dos espacios
+# al inicio y uno al final. Con prefijo=True la última palabra no se cierra,
+# de modo que "lech" coincide con "leche" mientras el usuario escribe.
+def trigramas(texto, prefijo=False):
+    palabras = _palabras(texto)
+    resultado = set()
+    for posicion, palabra in enumerate(palabras):
+        cierre = '' if prefijo and posicion == len(palabras) - 1 else ' '
+        relleno = f'  {palabra}{cierre}'
+        resultado.update(relleno[i:i + 3] for i in range(len(relleno) - 2))
+    return resultado
+
+
+# Reemplaza los trigramas de los productos indicados
+def indexar_productos(productos):
+    if usa_pg_trgm():
+        return
+    productos = list(productos)
+    filas = [
+        (producto.pk, trigrama)
+        for producto in productos
+        for trigrama in trigramas(producto.nombre)
+    ]
+    tabla = ProductoTrigrama._meta.db_table
+    with transaction.atomic(), connection.cursor() as cursor:
+        ProductoTrigrama.objects.filter(producto_id__in=[producto.pk for producto in productos]).delete()
+        # Inserción directa: evita crear un objeto del ORM por cada trigrama
+        cursor.executemany(f'INSERT INTO {tabla} (producto_id, trigrama) VALUES (%s, %s)', filas)
+
+
+# Reconstruye el índice completo por bloques
+def reconstruir_indice(tamano_bloque=2000):
+    if usa_pg_trgm():
+        return 0
+    ProductoTrigrama.objects.all().delete()
+    total = 0
+    bloque = []
+    for producto in Producto.objects.only('id', 'nombre').iterator(chunk_size=tamano_bloque):
+        bloque.append(producto)
+        if len(bloque) == tamano_bloque:
+            indexar_productos(bloque)
+            total += len(bloque)
+            bloque = []
+    indexar_productos(bloque)
+    return total + len(bloque)
+
+
+# Filtra y anota con `rango` los productos cuyo nombre se parece al texto.
+# El resultado se ordena por ('-rango', 'id').
+def buscar_productos(queryset, texto):
+    if usa_pg_trgm():
+        from django.contrib.postgres.lookups import TrigramWordSimilar
+        from django.contrib.postgres.search import TrigramWordSimilarity
+        # El filtro por operador (nombre__trigram_word_similar, sin requerir
+        # django.contrib.postgres instalado) usa el índice gin_trgm_ops; la
+        # similitud anotada solo sirve para ordenar
+        return queryset.filter(TrigramWordSimilar(F('nombre'), texto)).annotate(
+            rango=TrigramWordSimilarity(texto, 'nombre'),
+        )
+
+    buscados = trigramas(texto, prefijo=True)
+    if not buscados:
+        return queryset.none()
+    minimo = max(1, math.ceil(len(buscados) * UMBRAL_SIMILITUD))
+    coincidencias = (
+        ProductoTrigrama.objects.filter(trigrama__in=buscados)
+        .values('producto')
+        .annotate(total=Count('*'))
+    )
+    # Candidatos resueltos por el índice (trigrama, producto); el rango se
+    # calcula solo para ellos
+    candidatos = coincidencias.filter(total__gte=minimo).values('producto')
+    rango = coincidencias.filter(producto=OuterRef('pk')).values('total')
+    return queryset.filter(pk__in=candidatos).annotate(
+        rango=Subquery(rango, output_field=IntegerField()),
+    )
@@ -1,18 +1,116 @@
-from rest_framework import serializers
+from django.db.models import F
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
 from .models import Producto, Movimiento, Categoria
+from .services import MAX_LINEAS_LOTE, delta_stock
+from . import metricas
+
+
+# Conversión de fechas equivalente a DateTimeField.to_representation, con la
+# zona horaria resuelta una sola vez en lugar de una vez por valor
+def _convertir_fecha_hora(campo):
+    zona = campo.timezone if hasattr(campo, 'timezone') else campo.default_timezone()
+    formato = getattr(campo, 'format', api_settings.DATETIME_FORMAT)
+    if zona is None or formato is None or formato.lower() != ISO_8601:
+        return campo.to_representation
+
+    def convertir(valor):
+        texto = valor.astimezone(zona).isoformat()
+        return texto[:-6] + 'Z' if texto.endswith('+00:00') else texto
+    return convertir
+
+
+# Campos elegidos por el cliente con ?fields=a,b o ?omit=a,b (solo en lecturas).
+# Los campos de solo lectura que vienen de una relación (source='rel.campo')
+# se leen con una columna de la relación; el resto con la columna del modelo.
+class CamposDinamicosMixin:
+    def __init__(self, *args, **kwargs):
+        campos = kwargs.pop('campos', None)
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if campos is None and request is not None and request.method == 'GET':
+            # Request de DRF o HttpRequest de Django (vistas asíncronas)
+            campos = self.campos_pedidos(getattr(request, 'query_params', request.GET))
+        if campos is not None:
+            for nombre in set(self.fields) - set(campos):
+                self.fields.pop(nombre)
+
+    def campos_pedidos(self, params):
+        disponibles = list(self.fields)
+        pedidos = [campo for campo in params.get('fields', '').split(',') if campo]
+        omitidos = [campo for campo in params.get('omit', '').split(',') if campo]
+        desconocidos = sorted(set(pedidos + omitidos) - set(disponibles))
+        if desconocidos:
+            raise serializers.ValidationError({'fields': f"Campos desconocidos: {', '.join(desconocidos)}"})
+        if not pedidos and not omitidos:
+            return None
+        return [campo for campo in disponibles if (not pedidos or campo in pedidos) and campo not in omitidos]
+
+    def to_representation(self, instance):
+        with metricas.medir('serializacion'):
+            return super().to_representation(instance)
+
+    # Columna del ORM de cada campo activo: nombre -> ruta
+    def columnas(self):
+        return {nombre: campo.source.replace('.', '__') for nombre, campo in self.fields.items()}
+
+    # Camino rápido de solo lectura: lee con values() solo las columnas de los
+    # campos activos, sin crear instancias del modelo. `extra` agrega columnas
+    # que necesita el paginador.
+    def valores(self, queryset, extra=()):
+        columnas = self.columnas()
+        simples = [columna for nombre, columna in columnas.items() if nombre == columna]
+        alias = {nombre: F(columna) for nombre, columna in columnas.items() if nombre != columna}
+        return queryset.values(*simples, *[campo for campo in extra if campo not in columnas], **alias)
+
+    # Convierte filas de valores() al mismo formato que to_representation
+    def representar_filas(self, filas):
+        with metricas.medir('serializacion'):
+            return self._representar_filas(filas)
+
+    def _representar_filas(self, filas):
+        conversiones = []
+        for nombre, campo in self.fields.items():
+            convertir = None
+            if isinstance(campo, serializers.DateTimeField):
+                convertir = _convertir_fecha_hora(campo)
+            elif isinstance(campo, (serializers.DecimalField, serializers.DateField)):
+                convertir = campo.to_representation
+            # ModelSerializer omite un campo de relación cuando la relación es nula
+            conversiones.append((nombre, convertir, '.' in campo.source))
+        resultado = []
+        for fila in filas:
+            datos = {}
+            for nombre, convertir, omitir_nulo in conversiones:
+                valor = fila[nombre]
+                if valor is None:
+                    if not omitir_nulo:
+                        datos[nombre] = None
+                else:
+                    datos[nombre] = convertir(valor) if convertir else valor
+            resultado.append(datos)
+        return resultado
 
 
 # Serializador para productos
-class ProductoSerializer(serializers.ModelSerializer):
+class ProductoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     categoria_nombre = serializers.CharField(source='categoria.nombre', read_only=True)
 
     class Meta:
         model = Producto
-        fields = ['id', 'nombre', 'descripcion', 'codigo', 'stock', 'precio', 'categoria', 'categoria_nombre', 'fecha_creacion']
+        fields = ['id', 'nombre', 'descripcion', 'codigo', 'stock', 'precio', 'punto_reorden', 'categoria', 'categoria_nombre', 'fecha_creacion', 'fecha_actualizacion']
+
+    # El stock solo se fija al crear el producto; después cambia únicamente
+    # con movimientos
+    def get_extra_kwargs(self):
+        extra = super().get_extra_kwargs()
+        if self.instance is not None:
+            extra['stock'] = {**extra.get('stock', {}), 'read_only': True}
+        return extra
 
 
 # Serializador para movimientos
-class MovimientoSerializer(serializers.ModelSerializer):
+class MovimientoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     producto_nombre = serializers.CharField(source='producto.nombre', read_only=True)
 
     class Meta:
@@ -22,8 +120,48 @@ class MovimientoSerializer(serializers.ModelSerializer):
             'producto': {'required': True},  # Es obligatorio
         }
 
+    # Entradas y salidas usan cantidades positivas; los ajustes llevan signo
+    def validate(self, attrs):
+        tipo = attrs.get('tipo', getattr(self.instance, 'tipo', None))
+        cantidad = attrs.get('cantidad', getattr(self.instance, 'cantidad', None))
+        if delta_stock(tipo, cantidad) is None:
+            raise serializers.ValidationError({'cantidad': 'Cantidad no válida para el tipo de movimiento.'})
+        return attrs
+
 # Serializador para categorías
-class CategoriaSerializer(serializers.ModelSerializer):
+class CategoriaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Categoria
-        fields = ['id', 'nombre', 'descripcion']
\ No newline at end of file
+        fields = ['id', 'nombre', 'descripcion', 'fecha_actualizacion']
+
+
+# Serializador de una línea de un lote de movimientos.
+# Valida sin consultar la base de datos; la existencia de los productos
+# se comprueba para todo el lote en una sola consulta.
+class MovimientoLoteItemSerializer(serializers.Serializer):
+    producto = serializers.IntegerField(min_value=1)
+    tipo = serializers.ChoiceField(choices=Movimiento.TIPO_CHOICES)
+    cantidad = serializers.IntegerField()
+
+
+# Serializador para el lote completo
+class MovimientoLoteSerializer(serializers.Serializer):
+    movimientos = serializers.ListField(child=serializers.DictField(), allow_empty=False, max_length=MAX_LINEAS_LOTE)
+    atomico = serializers.BooleanField(default=True)  # Todo o nada; si es False se reportan errores por línea
+
+
+
+# Lista de códigos a resolver en una sola consulta
+class CodigosLoteSerializer(serializers.Serializer):
+    codigos = serializers.ListField(child=serializers.CharField(max_length=50), allow_empty=False, max_length=500)
+
+
+# Totales de movimientos de un producto en un periodo (desde el resumen diario)
+class ResumenProductoSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    nombre = serializers.CharField()
+    codigo = serializers.CharField()
+    entradas = serializers.IntegerField()
+    salidas = serializers.IntegerField()
+    ajustes = serializers.IntegerField()
+    movimientos = serializers.IntegerField()
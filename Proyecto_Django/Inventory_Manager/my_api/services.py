@@ -0,0 +1,131 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.utils import timezone
+from rest_framework.exceptions import PermissionDenied
+
+from .models import Producto, Movimiento
+from . import resumenes
+from . import valoracion
+from .cache_productos import invalidar_productos
+
+
+# Máximo de líneas aceptadas en un lote
+MAX_LINEAS_LOTE = 1000
+
+
+# Error cuando un movimiento dejaría el stock en negativo
+class StockInsuficiente(PermissionDenied):
+    default_detail = "No hay suficiente stock para realizar esta salida."
+
+
+# Variación de stock que produce un movimiento.
+# Entradas y salidas llevan cantidad positiva; un ajuste es una corrección
+# con signo (positiva o negativa) sobre el stock actual.
+def delta_stock(tipo, cantidad):
+    if tipo == 'entrada' and cantidad > 0:
+        return cantidad
+    if tipo == 'salida' and cantidad > 0:
+        return -cantidad
+    if tipo == 'ajuste' and cantidad != 0:
+        return cantidad
+    return None  # Combinación no válida
+
+
+# Aplica en un solo UPDATE condicional la variación neta de stock de varios
+# productos. La condición stock >= -delta se evalúa dentro del propio UPDATE,
+# así que dos escrituras concurrentes nunca pueden dejar el stock en negativo.
+def aplicar_deltas(deltas):
+    deltas = {producto_id: delta for producto_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    condicion = Q()
+    for producto_id, delta in deltas.items():
+        condicion |= Q(pk=producto_id, stock__gte=-delta) if delta < 0 else Q(pk=producto_id)
+    variacion = Case(
+        *[When(pk=producto_id, then=Value(delta)) for producto_id, delta in deltas.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    actualizados = Producto.objects.filter(condicion).update(stock=F('stock') + variacion, fecha_actualizacion=timezone.now())
+    if actualizados != len(deltas):
+        raise StockInsuficiente()
+    valoracion.variar_stock(deltas)
+    invalidar_productos(deltas)
+
+
+# Registra un movimiento nuevo (instancia sin guardar) y actualiza el stock
+def registrar_movimiento(movimiento):
+    with transaction.atomic():
+        aplicar_deltas({movimiento.producto_id: delta_stock(movimiento.tipo, movimiento.cantidad)})
+        movimiento.save()
+        resumenes.acumular([movimiento])
+    return movimiento
+
+
+# Guarda los cambios de un movimiento existente: revierte el efecto anterior
+# y aplica el nuevo en la misma transacción
+def actualizar_movimiento(movimiento):
+    with transaction.atomic():
+        anterior = Movimiento.objects.select_for_update().get(pk=movimiento.pk)
+        deltas = defaultdict(int)
+        deltas[anterior.producto_id] -= delta_stock(anterior.tipo, anterior.cantidad) or 0
+        deltas[movimiento.producto_id] += delta_stock(movimiento.tipo, movimiento.cantidad)
+        aplicar_deltas(deltas)
+        movimiento.save()
+        resumenes.acumular([anterior], signo=-1)
+        resumenes.acumular([movimiento])
+    return movimiento
+
+
+# Elimina un movimiento y revierte su efecto sobre el stock
+def eliminar_movimiento(movimiento):
+    with transaction.atomic():
+        aplicar_deltas({movimiento.producto_id: -(delta_stock(movimiento.tipo, movimiento.cantidad) or 0)})
+        resumenes.acumular([movimiento], signo=-1)
+        movimiento.delete()
+
+
+# Registra un lote de movimientos ya validados por el serializador.
+# Devuelve (movimientos_creados, errores); en modo atómico no se escribe nada
+# si alguna línea tiene errores.
+def registrar_lote(lineas, atomico=True):
+    errores = []
+    producto_ids = {linea['producto'] for linea in lineas}
+
+    with transaction.atomic():
+        # Una sola consulta para validar existencia y bloquear los productos,
+        # siempre en orden de id para que dos lotes no se bloqueen mutuamente
+        productos = Producto.objects.select_for_update().only('id', 'nombre', 'stock').order_by('pk').in_bulk(sorted(producto_ids))
+        stock = {producto_id: producto.stock for producto_id, producto in productos.items()}
+
+        aceptadas = []
+        deltas = defaultdict(int)
+        for numero, linea in enumerate(lineas):
+            producto = productos.get(linea['producto'])
+            if producto is None:
+                errores.append({'linea': numero, 'errores': {'producto': ['Producto no encontrado.']}})
+                continue
+            delta = delta_stock(linea['tipo'], linea['cantidad'])
+            if delta is None:
+                errores.append({'linea': numero, 'errores': {'cantidad': ['Cantidad no válida para el tipo de movimiento.']}})
+                continue
+            # Las líneas se simulan en orden, igual que si llegaran una por una
+            if stock[producto.id] + delta < 0:
+                errores.append({'linea': numero, 'errores': {'cantidad': [StockInsuficiente.default_detail]}})
+                continue
+            stock[producto.id] += delta
+            deltas[producto.id] += delta
+            aceptadas.append(Movimiento(producto=producto, tipo=linea['tipo'], cantidad=linea['cantidad']))
+
+        if errores and atomico:
+            return [], errores
+
+        # El UPDATE condicional es la garantía final aunque otra escritura
+        # haya cambiado el stock después de la lectura anterior
+        aplicar_deltas(deltas)
+        movimientos = Movimiento.objects.bulk_create(aceptadas)
+        resumenes.acumular(movimientos)
+
+    return movimientos, errores
@@ -0,0 +1,87 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache_productos import invalidar_categoria, invalidar_productos
+from .models import Categoria, Eliminacion, Producto, ResumenCategoria
+from .search import indexar_productos
+from .metricas import contar_consulta
+from . import valoracion
+
+
+# Mantiene actualizado el índice de búsqueda al guardar un producto
+@receiver(post_save, sender=Producto)
+def indexar_producto(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and 'nombre' not in update_fields):
+        return
+    indexar_productos([instance])
+
+
+# Valoración por categoría: se resta el aporte guardado del producto y se
+# suma el nuevo. El anterior se lee de la base, no de la instancia, que puede
+# tener un stock desactualizado por movimientos posteriores.
+@receiver(pre_save, sender=Producto)
+def leer_aporte_anterior(sender, instance, update_fields=None, **kwargs):
+    instance._aporte_anterior = None
+    if update_fields is not None and not valoracion.CAMPOS_PRODUCTO & set(update_fields):
+        instance._omitir_valoracion = True
+        return
+    instance._omitir_valoracion = False
+    if not instance._state.adding:
+        anterior = Producto.objects.filter(pk=instance.pk).values_list('categoria_id', 'stock', 'precio', 'punto_reorden').first()
+        if anterior is not None:
+            instance._aporte_anterior = valoracion.aporte(*anterior, signo=-1)
+
+
+@receiver(post_save, sender=Producto)
+def actualizar_valoracion(sender, instance, **kwargs):
+    if getattr(instance, '_omitir_valoracion', False):
+        return
+    anterior = getattr(instance, '_aporte_anterior', None)
+    valoracion.acumular([anterior, valoracion.aporte_de(instance)] if anterior else [valoracion.aporte_de(instance)])
+
+
+@receiver(post_delete, sender=Producto)
+def restar_valoracion(sender, instance, **kwargs):
+    valoracion.acumular([valoracion.aporte_de(instance, signo=-1)])
+
+
+# Invalida la caché de lecturas por código e id
+@receiver(post_save, sender=Producto)
+@receiver(post_delete, sender=Producto)
+def invalidar_cache_producto(sender, instance, **kwargs):
+    invalidar_productos([instance.pk], [instance.codigo])
+
+
+@receiver(post_save, sender=Categoria)
+@receiver(post_delete, sender=Categoria)
+def invalidar_cache_categoria(sender, instance, **kwargs):
+    invalidar_categoria(instance.pk)
+
+
+# Al borrar una categoría sus productos quedan sin categoría (SET_NULL) sin
+# pasar por save(): se invalidan y se marcan como modificados para la sincronización
+@receiver(pre_delete, sender=Categoria)
+def invalidar_productos_de_categoria(sender, instance, **kwargs):
+    productos = Producto.objects.filter(categoria=instance)
+    invalidar_productos(list(productos.values_list('id', flat=True)))
+    productos.update(fecha_actualizacion=timezone.now())
+    # Su valoración pasa a la fila de los productos sin categoría
+    resumen = ResumenCategoria.objects.filter(categoria=instance).values(*valoracion.COLUMNAS).first()
+    if resumen:
+        valoracion.acumular([(None, resumen)])
+
+
+# Registra los borrados para que los clientes sincronizados los reciban
+@receiver(post_delete, sender=Producto)
+@receiver(post_delete, sender=Categoria)
+def registrar_eliminacion(sender, instance, **kwargs):
+    Eliminacion.objects.create(modelo=sender._meta.model_name, objeto_id=instance.pk)
+
+
+# Cuenta las consultas de cada petición para las métricas por vista
+@receiver(connection_created)
+def instalar_contador_consultas(sender, connection, **kwargs):
+    if contar_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(contar_consulta)
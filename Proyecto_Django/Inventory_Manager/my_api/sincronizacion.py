@@ -0,0 +1,107 @@
+import base64
+import json
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Categoria, Eliminacion, Producto
+
+
+# Configuración por defecto; puede sobrescribirse con SINCRONIZACION en settings
+CONFIGURACION = {
+    'LIMITE': 500,  # Filas por colección en cada respuesta
+    'LIMITE_MAXIMO': 1000,
+    # Los cambios más recientes que este margen se entregan en la siguiente
+    # llamada: una transacción que aún no confirmó puede tener marcas anteriores
+    'MARGEN_SEGUNDOS': 5,
+    'RETENCION_DIAS': 90,  # Antigüedad máxima de los registros de borrado
+}
+
+
+def configuracion(clave):
+    return getattr(settings, 'SINCRONIZACION', {}).get(clave, CONFIGURACION[clave])
+
+
+# Colecciones sincronizadas: nombre -> (queryset, campo de fecha)
+def colecciones():
+    return {
+        'categorias': (Categoria.objects.all(), 'fecha_actualizacion'),
+        'productos': (Producto.objects.select_related('categoria'), 'fecha_actualizacion'),
+        'eliminados': (Eliminacion.objects.all(), 'fecha'),
+    }
+
+
+class CursorInvalido(Exception):
+    pass
+
+
+class CursorExpirado(Exception):
+    pass
+
+
+# El cursor es opaco para el cliente: posición (fecha, id) en cada colección
+def codificar_cursor(posiciones):
+    datos = {nombre: [fecha.isoformat(), pk] for nombre, (fecha, pk) in posiciones.items()}
+    return base64.urlsafe_b64encode(json.dumps(datos, separators=(',', ':')).encode()).decode()
+
+
+# Posiciones del cursor; CursorInvalido si no es exactamente lo que genera
+# codificar_cursor: una posición por colección, con fecha con zona horaria e id
+def decodificar_cursor(cursor):
+    if not cursor:
+        return {}
+    try:
+        datos = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(datos, dict) or datos.keys() != colecciones().keys():
+            raise CursorInvalido()
+        posiciones = {}
+        for nombre, (fecha, pk) in datos.items():
+            fecha = datetime.fromisoformat(fecha)
+            if timezone.is_naive(fecha) or type(pk) is not int:
+                raise CursorInvalido()
+            posiciones[nombre] = (fecha, pk)
+        return posiciones
+    except (ValueError, TypeError):
+        raise CursorInvalido()
+
+
+# Filas de una colección posteriores a `posicion` y anteriores a `tope`
+def _cambios(queryset, campo, posicion, tope, limite):
+    if posicion:
+        fecha, pk = posicion
+        queryset = queryset.filter(Q(**{f'{campo}__gt': fecha}) | Q(**{campo: fecha, 'id__gt': pk}))
+    filas = list(queryset.filter(**{f'{campo}__lt': tope}).order_by(campo, 'id')[:limite + 1])
+    return filas[:limite], len(filas) > limite
+
+
+# Cambios desde el cursor. Devuelve (filas por colección, nuevo cursor, hay_mas)
+def cambios_desde(cursor, limite):
+    posiciones = decodificar_cursor(cursor)
+    ahora = timezone.now()
+    eliminados = posiciones.get('eliminados')
+    if posiciones and (eliminados is None or eliminados[0] < ahora - timedelta(days=configuracion('RETENCION_DIAS'))):
+        # Los borrados anteriores ya se purgaron: el cliente debe empezar de cero
+        raise CursorExpirado()
+
+    tope = ahora - timedelta(seconds=configuracion('MARGEN_SEGUNDOS'))
+    resultado, hay_mas = {}, False
+    for nombre, (queryset, campo) in colecciones().items():
+        filas, mas = _cambios(queryset, campo, posiciones.get(nombre), tope, limite)
+        resultado[nombre] = filas
+        hay_mas = hay_mas or mas
+        if filas:
+            posiciones[nombre] = (getattr(filas[-1], campo), filas[-1].pk)
+        else:
+            # Sin filas: se avanza hasta el tope, así un cursor sin borrados
+            # recientes no llega a parecer expirado
+            posiciones[nombre] = (tope, 0)
+    return resultado, codificar_cursor(posiciones), hay_mas
+
+
+# Borra los registros de eliminación más antiguos que la retención
+def purgar_eliminaciones(dias=None):
+    limite = timezone.now() - timedelta(days=dias or configuracion('RETENCION_DIAS'))
+    borrados, _ = Eliminacion.objects.filter(fecha__lt=limite).delete()
+    return borrados
@@ -1,7 +1,63 @@
-from django.test import TestCase
-from rest_framework.test import APIClient
+import base64
+import gzip
+import io
+import json
+import logging
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, connections, OperationalError
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db.models import F
+from django.http import QueryDict
+from django.utils import timezone
+from django.utils.http import http_date
+from asgiref.sync import sync_to_async
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
 from rest_framework import status
-from .models import Producto, Movimiento
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.tokens import AccessToken
+from usuarios.models import Usuario
+from .models import Categoria, Producto, Movimiento, MovimientoDiario, Eliminacion, MovimientoArchivado, SaldoApertura, ResumenCategoria, CorteArchivo
+from .serializers import ProductoSerializer, MovimientoSerializer
+from .services import StockInsuficiente, registrar_movimiento
+from .importacion import importar_productos
+from .search import indexar_productos
+from .filtros import filtros_movimientos, filtros_productos
+from . import resumenes
+from . import cache_productos
+from . import sincronizacion
+from . import middleware
+from . import metricas
+from . import facetas
+from . import archivo
+from . import valoracion
+from . import limites
+from . import replicas
+from .pagination import MovimientoCursorPagination, PaginadorEstimado
+from .parsers import ORJSONParser
+from .renderers import ORJSONRenderer
+
+logger = logging.getLogger(__name__)
+
+# Cliente de la API autenticado como administrador (self.client, self.usuario)
+class AdminAPITestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.usuario = Usuario.objects.create_user(email='admin@test.com', password='clave123', nombre='Admin', apellido='Test', is_staff=True)
+        self.client.force_authenticate(user=self.usuario)
+
 
 class ProductoTests(TestCase):
     def setUp(self):
@@ -27,4 +83,1326 @@ class ProductoTests(TestCase):
     def test_eliminar_producto(self):
         producto = Producto.objects.get()
         response = self.client.delete(f'/api/productos/{producto.id}/', format='json')
-        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+class PaginacionTests(AdminAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.productos = [
+            Producto.objects.create(nombre=f'Producto {i}', descripcion='Desc', precio=1, stock=10)
+            for i in range(5)
+        ]
+        for producto in self.productos:
+            Movimiento.objects.create(producto=producto, tipo='entrada', cantidad=1)
+
+    def test_lista_productos_paginada_por_cursor(self):
+        response = self.client.get('/api/productos/', {'page_size': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', response.data)
+        self.assertEqual([p['id'] for p in response.data['results']], [p.id for p in self.productos[:2]])
+
+        vistos = []
+        url = '/api/productos/?page_size=2'
+        while url:
+            response = self.client.get(url)
+            vistos += [p['id'] for p in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(vistos, [p.id for p in self.productos])
+
+    def test_lista_movimientos_mas_recientes_primero(self):
+        response = self.client.get('/api/movimientos/', {'page_size': 3})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertIsNotNone(response.data['next'])
+        ids = [m['id'] for m in response.data['results']]
+        self.assertEqual(ids, sorted(ids, reverse=True))
+
+    def test_busquedas_paginadas(self):
+        response = self.client.get('/api/productos/busqueda/', {'nombre': 'Producto', 'page_size': 2})
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNotNone(response.data['next'])
+
+        response = self.client.get('/api/movimientos/busqueda/', {'tipo': 'entrada', 'page_size': 500})
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNone(response.data['next'])
+
+
+class MovimientoLoteTests(AdminAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.producto_a = Producto.objects.create(nombre='A', descripcion='Desc', precio=1, stock=10)
+        self.producto_b = Producto.objects.create(nombre='B', descripcion='Desc', precio=1, stock=0)
+
+    def test_lote_actualiza_stock_neto(self):
+        lineas = [
+            {'producto': self.producto_a.id, 'tipo': 'salida', 'cantidad': 4},
+            {'producto': self.producto_a.id, 'tipo': 'entrada', 'cantidad': 2},
+            {'producto': self.producto_b.id, 'tipo': 'entrada', 'cantidad': 7},
+        ]
+        response = self.client.post('/api/movimientos/lote/', {'movimientos': lineas}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['creados'], 3)
+        self.producto_a.refresh_from_db()
+        self.producto_b.refresh_from_db()
+        self.assertEqual(self.producto_a.stock, 8)
+        self.assertEqual(self.producto_b.stock, 7)
+        self.assertEqual(Movimiento.objects.count(), 3)
+
+    def test_lote_atomico_no_escribe_si_hay_errores(self):
+        lineas = [
+            {'producto': self.producto_a.id, 'tipo': 'entrada', 'cantidad': 5},
+            {'producto': self.producto_b.id, 'tipo': 'salida', 'cantidad': 1},
+        ]
+        response = self.client.post('/api/movimientos/lote/', {'movimientos': lineas}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([error['linea'] for error in response.data['errores']], [1])
+        self.producto_a.refresh_from_db()
+        self.assertEqual(self.producto_a.stock, 10)
+        self.assertFalse(Movimiento.objects.exists())
+
+    def test_lote_parcial_reporta_errores_por_linea(self):
+        lineas = [
+            {'producto': self.producto_b.id, 'tipo': 'salida', 'cantidad': 1},
+            {'producto': self.producto_a.id, 'tipo': 'salida', 'cantidad': 3},
+            {'producto': 999999, 'tipo': 'entrada', 'cantidad': 1},
+            {'producto': self.producto_a.id, 'tipo': 'entrada', 'cantidad': -2},
+        ]
+        response = self.client.post('/api/movimientos/lote/', {'movimientos': lineas, 'atomico': False}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['creados'], 1)
+        self.assertEqual([error['linea'] for error in response.data['errores']], [0, 2, 3])
+        self.producto_a.refresh_from_db()
+        self.assertEqual(self.producto_a.stock, 7)
+
+    def test_lote_sin_consultas_por_producto(self):
+        productos = Producto.objects.bulk_create([
+            Producto(nombre=f'P{numero}', descripcion='Desc', precio=1, stock=0, codigo=f'LOTE{numero}') for numero in range(50)
+        ])
+        lineas = [{'producto': productos[numero % 50].id, 'tipo': 'entrada', 'cantidad': 1} for numero in range(100)]
+        # Bloqueo, stock, valoración (lectura y suma), inserción y resumen diario
+        with self.assertNumQueries(8):
+            response = self.client.post('/api/movimientos/lote/', {'movimientos': lineas}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(set(MovimientoDiario.objects.values_list('entradas', flat=True)), {2})
+
+    def test_lote_bloquea_productos_en_orden_de_id(self):
+        lineas = [{'producto': producto.id, 'tipo': 'entrada', 'cantidad': 1} for producto in (self.producto_b, self.producto_a)]
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.post('/api/movimientos/lote/', {'movimientos': lineas}, format='json')
+        bloqueo = next(consulta['sql'] for consulta in consultas if '"productos"."stock"' in consulta['sql'] and 'SELECT' in consulta['sql'])
+        self.assertIn('ORDER BY "productos"."id" ASC', bloqueo)
+
+
+
+class StockServicioTests(AdminAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.producto = Producto.objects.create(nombre='A', descripcion='Desc', precio=1, stock=5)
+
+    def test_salida_sin_stock_no_guarda_movimiento(self):
+        response = self.client.post('/api/movimientos/', {'producto': self.producto.id, 'tipo': 'salida', 'cantidad': 6}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(Movimiento.objects.exists())
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock, 5)
+
+    def test_ajuste_con_signo(self):
+        response = self.client.post('/api/movimientos/', {'producto': self.producto.id, 'tipo': 'ajuste', 'cantidad': -2}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock, 3)
+
+        response = self.client.post('/api/movimientos/', {'producto': self.producto.id, 'tipo': 'ajuste', 'cantidad': -4}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_editar_y_eliminar_movimiento_revierte_stock(self):
+        response = self.client.post('/api/movimientos/', {'producto': self.producto.id, 'tipo': 'entrada', 'cantidad': 10}, format='json')
+        movimiento_id = response.data['id']
+        response = self.client.patch(f'/api/movimientos/{movimiento_id}/', {'cantidad': 4}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock, 9)
+
+        response = self.client.delete(f'/api/movimientos/{movimiento_id}/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock, 5)
+
+    def test_stock_no_se_escribe_al_editar_el_producto(self):
+        for metodo, datos in (('put', {'nombre': 'B', 'descripcion': 'Desc', 'precio': 2, 'stock': 50}), ('patch', {'stock': 50})):
+            response = getattr(self.client, metodo)(f'/api/productos/{self.producto.id}/', datos, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data['stock'], 5)
+        self.producto.refresh_from_db()
+        self.assertEqual((self.producto.nombre, self.producto.stock), ('B', 5))
+
+
+class StockConcurrenciaTests(TransactionTestCase):
+    HILOS = 8
+    SALIDAS_POR_HILO = 25
+    STOCK_INICIAL = 100
+
+    def test_salidas_concurrentes_no_sobrevenden(self):
+        producto = Producto.objects.create(nombre='Concurrente', descripcion='Desc', precio=1, stock=self.STOCK_INICIAL)
+        resultados = {'aceptadas': 0, 'rechazadas': 0}
+        candado = threading.Lock()
+
+        def escaner():
+            try:
+                for _ in range(self.SALIDAS_POR_HILO):
+                    while True:
+                        try:
+                            registrar_movimiento(Movimiento(producto_id=producto.id, tipo='salida', cantidad=1))
+                            clave = 'aceptadas'
+                        except StockInsuficiente:
+                            clave = 'rechazadas'
+                        except OperationalError:
+                            continue  # SQLite bloquea la tabla completa; se reintenta
+                        break
+                    with candado:
+                        resultados[clave] += 1
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=escaner) for _ in range(self.HILOS)]
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        segundos = time.perf_counter() - inicio
+        total = self.HILOS * self.SALIDAS_POR_HILO
+        logger.info('%d movimientos concurrentes en %.2f s (%.0f movimientos/s)', total, segundos, total / segundos)
+
+        producto.refresh_from_db()
+        self.assertEqual(producto.stock, 0)
+        self.assertEqual(resultados['aceptadas'], self.STOCK_INICIAL)
+        self.assertEqual(resultados['rechazadas'], self.HILOS * self.SALIDAS_POR_HILO - self.STOCK_INICIAL)
+        self.assertEqual(Movimiento.objects.filter(producto=producto).count(), self.STOCK_INICIAL)
+
+
+class BusquedaProductosTests(AdminAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.leche = Producto.objects.create(nombre='Leche Entera', descripcion='Desc', precio=5, stock=10)
+        self.lechuga = Producto.objects.create(nombre='Lechuga', descripcion='Desc', precio=2, stock=10)
+        self.arroz = Producto.objects.create(nombre='Arroz Integral', descripcion='Desc', precio=4, stock=10)
+
+    def buscar(self, texto):
+        response = self.client.get('/api/productos/busqueda/', {'nombre': texto})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [producto['id'] for producto in response.data['results']]
+
+    def test_prefijo_mientras_se_escribe(self):
+        self.assertEqual(set(self.buscar('lech')), {self.leche.id, self.lechuga.id})
+
+    def test_tolera_errores_y_ordena_por_relevancia(self):
+        resultados = self.buscar('arros integarl')
+        self.assertEqual(resultados[0], self.arroz.id)
+
+    def test_indice_se_actualiza_al_guardar(self):
+        self.arroz.nombre = 'Quinua'
+        self.arroz.save()
+        self.assertNotIn(self.arroz.id, self.buscar('arroz'))
+        self.assertIn(self.arroz.id, self.buscar('quinua'))
+
+    def test_cursor_con_mas_de_mil_empates(self):
+        # Todos con el mismo rango: el cursor no puede depender de un desplazamiento
+        yogures = Producto.objects.bulk_create([
+            Producto(nombre='Yogur Natural', descripcion='Desc', precio=3, stock=1) for _ in range(1300)
+        ])
+        indexar_productos(yogures)
+        vistos = []
+        url = '/api/productos/busqueda/?nombre=yogur&page_size=200'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            vistos.extend(producto['id'] for producto in response.data['results'])
+            url = response.data['next']
+            self.assertLessEqual(len(vistos), 1300)
+        self.assertEqual(sorted(vistos), sorted(producto.id for producto in yogures))
+
+    def test_cursor_con_valores_no_validos(self):
+        for valores in ([5, 'x'], [{'a': 1}, {'b': 2}], [[1], [2]], [True, 1], [None, 1], [5]):
+            cursor = base64.urlsafe_b64encode(json.dumps(valores).encode()).decode()
+            response = self.client.get('/api/productos/busqueda/', {'nombre': 'leche', 'cursor': cursor})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, valores)
+
+
+
+# Crea movimientos con fechas explícitas (fecha usa auto_now_add)
+def crear_movimientos_con_fecha(movimientos):
+    with mock.patch.object(Movimiento._meta.get_field('fecha'), 'auto_now_add', False):
+        return Movimiento.objects.bulk_create(movimientos, batch_size=1000)
+
+
+class MovimientoFechasTests(AdminAPITestCase):
+    def setUp(self):
+        super().setUp()
+        producto = Producto.objects.create(nombre='A', descripcion='Desc', precio=1, stock=10)
+        inicio = timezone.make_aware(timezone.datetime(2024, 3, 10))
+        # Último y primer instante del día 10 y medianoche del 11 (hora local)
+        crear_movimientos_con_fecha([
+            Movimiento(producto=producto, tipo='entrada', cantidad=1, fecha=inicio),
+            Movimiento(producto=producto, tipo='entrada', cantidad=2, fecha=inicio + timedelta(hours=23, minutes=59)),
+            Movimiento(producto=producto, tipo='salida', cantidad=3, fecha=inicio + timedelta(days=1)),
+            Movimiento(producto=producto, tipo='salida', cantidad=4, fecha=inicio + timedelta(days=5)),
+        ])
+
+    def cantidades(self, **params):
+        response = self.client.get('/api/movimientos/busqueda/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return sorted(movimiento['cantidad'] for movimiento in response.data['results'])
+
+    def test_fecha_exacta_es_el_dia_local(self):
+        self.assertEqual(self.cantidades(fecha='2024-03-10'), [1, 2])
+
+    def test_rango_de_fechas_inclusivo(self):
+        self.assertEqual(self.cantidades(fecha_desde='2024-03-11'), [3, 4])
+        self.assertEqual(self.cantidades(fecha_desde='2024-03-10', fecha_hasta='2024-03-11'), [1, 2, 3])
+        self.assertEqual(self.cantidades(fecha_hasta='2024-03-10', tipo='entrada'), [1, 2])
+
+    def test_fecha_invalida(self):
+        response = self.client.get('/api/movimientos/busqueda/', {'fecha': '10/03/2024'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class MovimientoIndicesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        productos = Producto.objects.bulk_create([
+            Producto(nombre=f'Producto {i}', descripcion='', precio=i, stock=0, codigo=f'IDX{i:05d}')
+            for i in range(50)
+        ])
+        inicio = timezone.make_aware(timezone.datetime(2023, 1, 1))
+        tipos = ['entrada', 'salida', 'ajuste']
+        crear_movimientos_con_fecha([
+            Movimiento(producto=productos[i % 50], tipo=tipos[i % 3], cantidad=1, fecha=inicio + timedelta(hours=i))
+            for i in range(5000)
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def setUp(self):
+        cache.clear()  # Sin corte de archivo en caché
+
+    # Plan de la misma consulta que ejecuta MovimientoBusquedaView: modelo
+    # elegido por archivo.movimientos, values() del camino rápido y la página
+    # del paginador por cursor
+    def plan(self, consulta):
+        request = Request(APIRequestFactory().get(f'/api/movimientos/busqueda/?{consulta}'))
+        paginador = MovimientoCursorPagination()
+        movimientos = archivo.movimientos(request.query_params).filter(filtros_movimientos(request.query_params))
+        filas = MovimientoSerializer(context={'request': request}).valores(
+            movimientos, extra=[campo.lstrip('-') for campo in paginador.ordering],
+        )
+        return filas.order_by(*paginador.ordering)[:paginador.page_size + 1].explain()
+
+    def assertUsaIndice(self, plan):
+        if connection.vendor == 'sqlite':
+            # SEARCH indica acceso por índice; SCAN recorre toda la tabla o índice
+            self.assertIn('SEARCH movimientos_inventario USING', plan)
+        else:
+            self.assertRegex(plan, r'Index (Only )?Scan|Bitmap Index Scan')
+
+    def test_busqueda_por_fecha_usa_indice(self):
+        self.assertUsaIndice(self.plan('fecha=2023-03-01'))
+
+    def test_busqueda_por_rango_y_tipo_usa_indice(self):
+        self.assertUsaIndice(self.plan('tipo=salida&fecha_desde=2023-02-01&fecha_hasta=2023-02-10'))
+
+
+
+class ResumenDiarioTests(AdminAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.producto = Producto.objects.create(nombre='A', descripcion='Desc', precio=1, stock=0)
+
+    def registrar(self, tipo, cantidad):
+        return registrar_movimiento(Movimiento(producto=self.producto, tipo=tipo, cantidad=cantidad))
+
+    def test_resumen_incremental_coincide_con_reconstruccion(self):
+        self.registrar('entrada', 10)
+        self.registrar('salida', 3)
+        ajuste = self.registrar('ajuste', -2)
+        self.client.delete(f'/api/movimientos/{ajuste.id}/')
+        self.client.post('/api/movimientos/lote/', {'movimientos': [
+            {'producto': self.producto.id, 'tipo': 'entrada', 'cantidad': 5},
+        ]}, format='json')
+
+        incremental = list(MovimientoDiario.objects.values('producto', 'dia', 'entradas', 'salidas', 'ajustes', 'movimientos'))
+        self.assertEqual(incremental[0]['entradas'], 15)
+        self.assertEqual(incremental[0]['salidas'], 3)
+        self.assertEqual(incremental[0]['ajustes'], 0)
+        self.assertEqual(incremental[0]['movimientos'], 3)
+        resumenes.reconstruir()
+        reconstruido = list(MovimientoDiario.objects.values('producto', 'dia', 'entradas', 'salidas', 'ajustes', 'movimientos'))
+        self.assertEqual(incremental, reconstruido)
+
+    def test_resumen_con_categoria_invalida(self):
+        response = self.client.get('/api/reportes/resumen/', {'categoria': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_kardex_calcula_saldos_por_dia(self):
+        hoy = timezone.localdate()
+        MovimientoDiario.objects.create(producto=self.producto, dia=hoy - timedelta(days=2), entradas=10, movimientos=1)
+        MovimientoDiario.objects.create(producto=self.producto, dia=hoy - timedelta(days=1), salidas=4, movimientos=1)
+        MovimientoDiario.objects.create(producto=self.producto, dia=hoy, entradas=1, movimientos=1)
+        Producto.objects.filter(pk=self.producto.pk).update(stock=7)
+
+        hasta = (hoy - timedelta(days=1)).isoformat()
+        response = self.client.get(f'/api/reportes/kardex/{self.producto.id}/', {'fecha_hasta': hasta})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['saldo_inicial'], 0)
+        self.assertEqual(response.data['saldo_final'], 6)
+        self.assertEqual([fila['saldo'] for fila in response.data['periodos']], [10, 6])
+
+        response = self.client.get('/api/reportes/resumen/', {'fecha_hasta': hasta})
+        self.assertEqual(response.data['results'][0]['entradas'], 10)
+        self.assertEqual(response.data['results'][0]['salidas'], 4)
+
+
+
+class ExportacionTests(AdminAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.producto = Producto.objects.create(nombre='Café, molido', descripcion='Desc', precio='12.50', stock=10)
+        for cantidad in (1, 2, 3):
+            registrar_movimiento(Movimiento(producto=self.producto, tipo='salida', cantidad=cantidad))
+
+    def test_exportar_movimientos_csv(self):
+        response = self.client.get('/api/exportar/movimientos/', {'tipo': 'salida'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        lineas = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lineas[0], 'id,producto,producto__nombre,producto__codigo,tipo,cantidad,fecha')
+        self.assertEqual(len(lineas), 4)
+        self.assertIn('"Café, molido"', lineas[1])
+
+    def test_exportar_productos_ndjson(self):
+        response = self.client.get('/api/exportar/productos/', {'formato': 'ndjson'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        filas = [json.loads(linea) for linea in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(filas[0]['precio'], '12.50')
+        self.assertEqual(filas[0]['stock'], 4)
+
+    def test_exportar_requiere_admin(self):
+        self.usuario.is_staff = False
+        self.usuario.save()
+        response = self.client.get('/api/exportar/productos/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+
+class ImportacionProductosTests(AdminAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.bebidas = Categoria.objects.create(nombre='Bebidas')
+        self.existente = Producto.objects.create(nombre='Viejo', descripcion='', precio=1, stock=7, codigo='SUP-1')
+
+    def test_importar_csv_con_upsert_y_categorias(self):
+        contenido = (
+            'nombre,descripcion,codigo,stock,precio,categoria\n'
+            'Agua,Sin gas,SUP-1,50,2.50,Bebidas\n'
+            'Jugo,,,10,3.10,Bebidas\n'
+            'Pan,,,5,0.5,Panadería\n'
+            ',,,1,1,\n'
+        )
+        archivo = SimpleUploadedFile('catalogo.csv', contenido.encode(), content_type='text/csv')
+        response = self.client.post('/api/productos/importar/', {'archivo': archivo}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['creados'], 2)
+        self.assertEqual(response.data['actualizados'], 1)
+        self.assertEqual([error['fila'] for error in response.data['errores']], [4])
+
+        self.existente.refresh_from_db()
+        self.assertEqual(self.existente.nombre, 'Agua')
+        self.assertEqual(self.existente.stock, 7)  # El stock existente solo cambia con movimientos
+        self.assertEqual(self.existente.categoria, self.bebidas)
+        pan = Producto.objects.get(nombre='Pan')
+        self.assertTrue(pan.codigo.startswith('P'))
+        self.assertEqual(pan.categoria.nombre, 'Panadería')
+        self.assertEqual(Categoria.objects.filter(nombre='Bebidas').count(), 1)
+
+    def test_importar_json_con_codigos_repetidos(self):
+        filas = [
+            {'nombre': 'Primera', 'codigo': 'DUP', 'stock': 1, 'precio': '1.00'},
+            {'nombre': 'Segunda', 'codigo': 'DUP', 'stock': 1, 'precio': '1.00'},
+        ]
+        response = self.client.post('/api/productos/importar/', filas, format='json')
+        self.assertEqual(response.data['creados'], 1)
+        self.assertEqual(response.data['actualizados'], 1)
+        self.assertEqual(Producto.objects.get(codigo='DUP').nombre, 'Segunda')
+
+    def test_archivos_malformados_responden_400(self):
+        casos = [
+            ('catalogo.json', b'[{"nombre": '),
+            ('catalogo.json', b'{"nombre": "Agua"}'),
+            ('catalogo.csv', 'nombre,precio\nCafé,1\n'.encode('latin-1')),
+        ]
+        for nombre, contenido in casos:
+            archivo = SimpleUploadedFile(nombre, contenido)
+            response = self.client.post('/api/productos/importar/', {'archivo': archivo}, format='multipart')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, nombre)
+            self.assertIn('error', response.data)
+        self.assertEqual(Producto.objects.count(), 1)
+
+    def test_filas_que_no_son_objetos_se_informan_por_fila(self):
+        response = self.client.post('/api/productos/importar/', [1, {'nombre': 'Agua', 'precio': '1.00'}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['creados'], 1)
+        self.assertEqual([error['fila'] for error in response.data['errores']], [1])
+
+        archivo = SimpleUploadedFile('catalogo.ndjson', b'[1]\n{"nombre": \n{"nombre": "Pan", "precio": "0.50"}\n')
+        response = self.client.post('/api/productos/importar/', {'archivo': archivo}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['creados'], 1)
+        self.assertEqual([(error['fila'], list(error['errores'])) for error in response.data['errores']], [(1, ['fila']), (2, ['fila'])])
+
+
+
+class CacheProductosTests(AdminAPITestCase):
+    def setUp(self):
+        cache.clear()
+        cache_productos.local.clear()
+        cache_productos.reiniciar_estadisticas()
+        super().setUp()
+        self.categoria = Categoria.objects.create(nombre='Lácteos')
+        self.producto = Producto.objects.create(nombre='Leche', descripcion='Desc', precio=5, stock=10, codigo='775001', categoria=self.categoria)
+
+    def test_lecturas_repetidas_no_consultan_la_base(self):
+        response = self.client.get('/api/productos/codigo/775001/')
+        self.assertEqual(response.data['categoria_nombre'], 'Lácteos')
+        with self.assertNumQueries(0):
+            # force_authenticate evita la consulta del usuario
+            response = self.client.get('/api/productos/codigo/775001/')
+            self.client.get(f'/api/productos/{self.producto.id}/')
+        self.assertEqual(response.data, dict(ProductoSerializer(self.producto).data))
+        estadisticas = cache_productos.estadisticas()
+        self.assertEqual(estadisticas['fallos'], 1)
+        self.assertEqual(estadisticas['local'], 2)
+
+    def test_invalidacion_por_movimientos_y_categorias(self):
+        self.client.get('/api/productos/codigo/775001/')
+        self.client.post('/api/movimientos/', {'producto': self.producto.id, 'tipo': 'salida', 'cantidad': 3}, format='json')
+        self.categoria.nombre = 'Lácteos y derivados'
+        self.categoria.save()
+        response = self.client.get('/api/productos/codigo/775001/')
+        self.assertEqual(response.data['stock'], 7)
+        self.assertEqual(response.data['categoria_nombre'], 'Lácteos y derivados')
+
+    def test_cambio_de_codigo(self):
+        self.client.get('/api/productos/codigo/775001/')
+        self.producto.codigo = '775002'
+        self.producto.save()
+        otro = Producto.objects.create(nombre='Yogur', descripcion='Desc', precio=3, stock=1, codigo='775001')
+        self.assertEqual(self.client.get('/api/productos/codigo/775001/').data['id'], otro.id)
+        self.assertEqual(self.client.get('/api/productos/codigo/775002/').data['id'], self.producto.id)
+        self.producto.delete()
+        self.assertEqual(self.client.get('/api/productos/codigo/775002/').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_llenado_tardio_no_deja_el_valor_anterior(self):
+        cargar = cache_productos._cargar_producto
+
+        # Otro proceso escribe e invalida mientras esta lectura consulta la base
+        def cargar_e_invalidar(**filtro):
+            datos = cargar(**filtro)
+            Producto.objects.filter(pk=self.producto.pk).update(stock=3)
+            cache_productos.invalidar_productos([self.producto.pk])
+            return datos
+
+        with mock.patch('my_api.cache_productos._cargar_producto', side_effect=cargar_e_invalidar):
+            self.assertEqual(cache_productos.producto_por_id(self.producto.pk)['stock'], 10)
+        cache_productos.local.clear()
+        self.assertEqual(cache_productos.producto_por_id(self.producto.pk)['stock'], 3)
+
+
+
+class ProductosPorCodigosTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.usuario = Usuario.objects.create_user(email='admin@test.com', password='clave123', nombre='Admin', apellido='Test')
+        self.client.force_authenticate(user=self.usuario)
+        categoria = Categoria.objects.create(nombre='Bebidas')
+        self.agua = Producto.objects.create(nombre='Agua', descripcion='Desc', precio=1, stock=5, codigo='111', categoria=categoria)
+        self.jugo = Producto.objects.create(nombre='Jugo', descripcion='Desc', precio=2, stock=5, codigo='222', categoria=categoria)
+
+    def test_resuelve_codigos_en_una_consulta(self):
+        with self.assertNumQueries(1):
+            response = self.client.post('/api/productos/codigos/', {'codigos': ['111', '999', '222', '111']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['productos']['111'], ProductoSerializer(self.agua).data)
+        self.assertEqual(response.data['productos']['222']['categoria_nombre'], 'Bebidas')
+        self.assertEqual(response.data['no_encontrados'], ['999'])
+
+    def test_limite_de_codigos(self):
+        response = self.client.post('/api/productos/codigos/', {'codigos': [str(i) for i in range(501)]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+
+class GetCondicionalTests(AdminAPITestCase):
+    def setUp(self):
+        cache.clear()
+        cache_productos.local.clear()
+        super().setUp()
+        self.categoria = Categoria.objects.create(nombre='Bebidas')
+        self.producto = Producto.objects.create(nombre='Agua', descripcion='Desc', precio=1, stock=5, codigo='111', categoria=self.categoria)
+
+    def test_lista_de_productos_responde_304_sin_consultas(self):
+        response = self.client.get('/api/productos/')
+        etag = response['ETag']
+        self.assertNotIn('Last-Modified', response)
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/productos/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+        # Un movimiento cambia el stock y por lo tanto la versión del catálogo
+        self.client.post('/api/movimientos/', {'producto': self.producto.id, 'tipo': 'entrada', 'cantidad': 1}, format='json')
+        response = self.client.get('/api/productos/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_if_modified_since_no_da_304(self):
+        # Solo el ETag valida: una escritura en el mismo segundo no puede quedar oculta
+        fecha = http_date(time.time() + 60)
+        self.assertEqual(self.client.get('/api/productos/', HTTP_IF_MODIFIED_SINCE=fecha).status_code, status.HTTP_200_OK)
+
+    def test_categorias_cambian_de_version_al_renombrar(self):
+        etag = self.client.get('/api/categorias/')['ETag']
+        self.assertEqual(self.client.get('/api/categorias/', HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+        self.categoria.nombre = 'Refrescos'
+        self.categoria.save()
+        self.assertEqual(self.client.get('/api/categorias/', HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    def test_detalle_y_codigo_con_etag(self):
+        for url in (f'/api/productos/{self.producto.id}/', '/api/productos/codigo/111/'):
+            etag = self.client.get(url)['ETag']
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+        self.producto.precio = 2
+        self.producto.save()
+        self.assertEqual(self.client.get('/api/productos/codigo/111/', HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+
+@override_settings(SINCRONIZACION={'MARGEN_SEGUNDOS': 0})
+class SincronizacionTests(AdminAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.categoria = Categoria.objects.create(nombre='Bebidas')
+        self.productos = [
+            Producto.objects.create(nombre=f'Producto {i}', descripcion='Desc', precio=1, stock=5, codigo=f'C{i}', categoria=self.categoria)
+            for i in range(3)
+        ]
+
+    def sincronizar(self, cursor=None, **params):
+        if cursor:
+            params['cursor'] = cursor
+        response = self.client.get('/api/sync/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_sin_cursor_recorre_el_catalogo_por_lotes(self):
+        primera = self.sincronizar(limite=2)
+        self.assertEqual([p['codigo'] for p in primera['productos']], ['C0', 'C1'])
+        self.assertTrue(primera['mas'])
+        segunda = self.sincronizar(primera['cursor'], limite=2)
+        self.assertEqual([p['codigo'] for p in segunda['productos']], ['C2'])
+        self.assertFalse(segunda['mas'])
+        vacia = self.sincronizar(segunda['cursor'])
+        self.assertEqual((vacia['productos'], vacia['categorias'], vacia['eliminados']), ([], [], []))
+
+    def test_devuelve_solo_cambios_y_eliminaciones(self):
+        cursor = self.sincronizar()['cursor']
+        registrar_movimiento(Movimiento(producto=self.productos[0], tipo='entrada', cantidad=2))
+        eliminado = self.productos[1].pk
+        self.productos[1].delete()
+
+        datos = self.sincronizar(cursor)
+        self.assertEqual([(p['codigo'], p['stock']) for p in datos['productos']], [('C0', 7)])
+        self.assertEqual(datos['eliminados'], [{'modelo': 'producto', 'id': eliminado}])
+        self.assertEqual(datos['categorias'], [])
+
+    def test_eliminar_categoria_marca_sus_productos(self):
+        cursor = self.sincronizar()['cursor']
+        self.categoria.delete()
+        datos = self.sincronizar(cursor)
+        self.assertEqual(len(datos['productos']), 3)
+        self.assertTrue(all(p['categoria'] is None for p in datos['productos']))
+        self.assertEqual(datos['eliminados'][0]['modelo'], 'categoria')
+
+    def test_margen_retiene_cambios_recientes(self):
+        with override_settings(SINCRONIZACION={'MARGEN_SEGUNDOS': 60}):
+            datos = self.sincronizar()
+        self.assertEqual(datos['productos'], [])
+        self.assertEqual(len(self.sincronizar(datos['cursor'])['productos']), 3)
+
+    def test_cursor_invalido_o_expirado(self):
+        self.assertEqual(self.client.get('/api/sync/', {'cursor': 'xyz'}).status_code, status.HTTP_400_BAD_REQUEST)
+        # Base64 y JSON válidos, pero no un cursor
+        invalidos = [[], {'productos': [1, 2]}, {nombre: ['2024-01-01T00:00:00', 0] for nombre in sincronizacion.colecciones()}]
+        for datos in invalidos:
+            cursor = base64.urlsafe_b64encode(json.dumps(datos).encode()).decode()
+            self.assertEqual(self.client.get('/api/sync/', {'cursor': cursor}).status_code, status.HTTP_400_BAD_REQUEST, datos)
+        antiguo = timezone.now() - timedelta(days=365)
+        cursor = sincronizacion.codificar_cursor({nombre: (antiguo, 0) for nombre in sincronizacion.colecciones()})
+        self.assertEqual(self.client.get('/api/sync/', {'cursor': cursor}).status_code, status.HTTP_410_GONE)
+
+    def test_purgar_eliminaciones(self):
+        self.productos[0].delete()
+        Eliminacion.objects.update(fecha=timezone.now() - timedelta(days=100))
+        self.productos[1].delete()
+        self.assertEqual(sincronizacion.purgar_eliminaciones(), 1)
+        self.assertEqual(Eliminacion.objects.count(), 1)
+
+
+class CamposDinamicosTests(AdminAPITestCase):
+    def setUp(self):
+        cache.clear()
+        super().setUp()
+        categoria = Categoria.objects.create(nombre='Bebidas')
+        self.con_categoria = Producto.objects.create(nombre='Agua', descripcion='Desc', precio='1.50', stock=5, codigo='111', categoria=categoria)
+        self.sin_categoria = Producto.objects.create(nombre='Jugo', descripcion='Desc', precio=2, stock=5, codigo='222')
+        registrar_movimiento(Movimiento(producto=self.con_categoria, tipo='entrada', cantidad=3))
+
+    def test_camino_rapido_igual_al_serializador(self):
+        response = self.client.get('/api/productos/')
+        productos = Producto.objects.select_related('categoria').order_by('id')
+        self.assertEqual(response.data['results'], ProductoSerializer(productos, many=True).data)
+        self.assertNotIn('categoria_nombre', response.data['results'][1])
+
+        response = self.client.get('/api/movimientos/')
+        self.assertEqual(response.data['results'], MovimientoSerializer(Movimiento.objects.all(), many=True).data)
+
+    def test_fields_y_omit(self):
+        response = self.client.get('/api/productos/', {'fields': 'id,nombre,codigo,stock'})
+        self.assertEqual(response.data['results'][0], {'id': self.con_categoria.id, 'nombre': 'Agua', 'codigo': '111', 'stock': 8})
+
+        response = self.client.get('/api/categorias/', {'omit': 'descripcion,fecha_actualizacion'})
+        self.assertEqual(response.data, [{'id': self.con_categoria.categoria_id, 'nombre': 'Bebidas'}])
+
+        response = self.client.get('/api/movimientos/busqueda/', {'fields': 'id,cantidad'})
+        self.assertEqual(list(response.data['results'][0]), ['id', 'cantidad'])
+
+        response = self.client.get('/api/productos/', {'fields': 'id,precio_costo'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_solo_se_leen_las_columnas_pedidas(self):
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.get('/api/productos/', {'fields': 'id,nombre'})
+        sql = consultas[-1]['sql']
+        self.assertIn('"nombre"', sql)
+        self.assertNotIn('"descripcion"', sql)
+        self.assertNotIn('JOIN', sql)
+
+    def test_escrituras_ignoran_fields(self):
+        response = self.client.post('/api/productos/?fields=id', {'nombre': 'Te', 'descripcion': 'D', 'precio': 3, 'stock': 1, 'codigo': '333'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['nombre'], 'Te')
+
+
+class JSONRapidoTests(TestCase):
+    def test_renderer_igual_a_drf(self):
+        datos = {
+            'precio': Decimal('10.50'),
+            'fecha': timezone.now(),
+            'texto': 'línea\u2028separada',
+            'lista': [1, 2.5, None, True],
+            3: 'clave numérica',
+        }
+        esperado = JSONRenderer().render({**datos, 'precio': '10.50'})
+        self.assertEqual(ORJSONRenderer().render(datos), esperado)
+
+    def test_parser(self):
+        datos = ORJSONParser().parse(io.BytesIO('{"nombre": "Café", "precio": 1.5}'.encode()))
+        self.assertEqual(datos, {'nombre': 'Café', 'precio': 1.5})
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(io.BytesIO(b'{nombre'))
+
+
+class CompresionTests(AdminAPITestCase):
+    def setUp(self):
+        cache.clear()
+        super().setUp()
+        Producto.objects.bulk_create([
+            Producto(nombre=f'Producto {i}', descripcion='Desc', precio=1, stock=5, codigo=f'C{i}') for i in range(30)
+        ])
+
+    def test_gzip_sobre_el_umbral(self):
+        response = self.client.get('/api/productos/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))['results']), 30)
+
+        # El ETag queda débil y sigue sirviendo para el GET condicional
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('W/'))
+        response = self.client.get('/api/productos/', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_sin_compresion_bajo_el_umbral_o_sin_soporte(self):
+        response = self.client.get('/api/productos/', {'fields': 'id', 'page_size': 2}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        response = self.client.get('/api/productos/', HTTP_ACCEPT_ENCODING='gzip;q=0, identity')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    @skipUnless(middleware.brotli, 'brotli no está instalado')
+    def test_brotli_preferido(self):
+        response = self.client.get('/api/productos/', HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(len(json.loads(middleware.brotli.decompress(response.content))['results']), 30)
+
+
+class VistasAsincronasTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        cache_productos.local.clear()
+        self.usuario = Usuario.objects.create_user(email='admin@test.com', password='clave123', nombre='Admin', apellido='Test', is_staff=True)
+        self.cliente_sync = APIClient()
+        self.cliente_sync.force_authenticate(user=self.usuario)
+        self.cliente = AsyncClient()
+        self.credenciales = {'Authorization': f'Bearer {AccessToken.for_user(self.usuario)}'}
+        self.categoria = Categoria.objects.create(nombre='Lácteos')
+        for i in range(5):
+            producto = Producto.objects.create(nombre=f'Leche {i}', descripcion='Desc', precio=i + 1, stock=10, codigo=f'L{i}', categoria=self.categoria)
+            registrar_movimiento(Movimiento(producto=producto, tipo='salida', cantidad=1))
+        Producto.objects.create(nombre='Pan', descripcion='Desc', precio=1, stock=5, codigo='P1')
+
+    async def recorrer(self, url, params):
+        resultados, pagina = [], await self.cliente.get(url, params, headers=self.credenciales)
+        while True:
+            self.assertEqual(pagina.status_code, status.HTTP_200_OK)
+            datos = json.loads(pagina.content)
+            self.assertIsNone(datos['previous'])
+            resultados += datos['results']
+            if not datos['next']:
+                return resultados
+            pagina = await self.cliente.get(datos['next'], headers=self.credenciales)
+
+    async def test_busquedas_iguales_a_las_vistas_sincronas(self):
+        casos = [
+            ('productos/busqueda/', {'categoria': 'lác', 'precio_min': 2}),
+            ('productos/busqueda/', {'nombre': 'leche', 'fields': 'id,nombre'}),
+            ('movimientos/busqueda/', {'tipo': 'salida'}),
+        ]
+        for ruta, params in casos:
+            resultados = await self.recorrer(f'/api/async/{ruta}', {**params, 'page_size': 2})
+            esperado = await sync_to_async(self.cliente_sync.get)(f'/api/{ruta}', {**params, 'page_size': 100})
+            self.assertEqual(resultados, json.loads(esperado.content)['results'])
+            self.assertTrue(resultados)
+
+    async def test_codigo_y_categorias_con_etag(self):
+        response = await self.cliente.get('/api/async/productos/codigo/L1/', headers=self.credenciales)
+        self.assertEqual(json.loads(response.content)['categoria_nombre'], 'Lácteos')
+        response = await self.cliente.get('/api/async/productos/codigo/L1/', headers={**self.credenciales, 'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = await self.cliente.get('/api/async/productos/codigo/NOEXISTE/', headers=self.credenciales)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        response = await self.cliente.get('/api/async/categorias/', headers=self.credenciales)
+        self.assertEqual(json.loads(response.content)[0]['nombre'], 'Lácteos')
+        response = await self.cliente.get('/api/async/categorias/', headers={**self.credenciales, 'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    async def test_errores(self):
+        response = await AsyncClient().get('/api/async/categorias/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn('Bearer', response['WWW-Authenticate'])
+        response = await self.cliente.get('/api/async/movimientos/busqueda/', {'fecha': '2024-13-40'}, headers=self.credenciales)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = await self.cliente.get('/api/async/movimientos/busqueda/', {'cursor': 'basura'}, headers=self.credenciales)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(METRICAS={'TOKEN': 'secreto', 'PRESUPUESTO_CONSULTAS': 30})
+class MetricasTests(AdminAPITestCase):
+    def setUp(self):
+        metricas.reiniciar()
+        super().setUp()
+        Producto.objects.create(nombre='Agua', descripcion='Desc', precio=1, stock=5, codigo='111')
+
+    def metricas(self):
+        response = self.client.get('/api/metrics', HTTP_AUTHORIZATION='Bearer secreto')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.content.decode()
+
+    def test_metricas_por_vista(self):
+        self.client.get('/api/productos/')
+        self.client.get('/api/productos/')
+        texto = self.metricas()
+        etiquetas = 'vista="producto_list_create",metodo="GET"'
+        self.assertIn(f'inventario_peticion_segundos_count{{{etiquetas}}} 2', texto)
+        self.assertIn(f'inventario_peticiones_total{{{etiquetas},estado="200"}} 2', texto)
+        self.assertIn(f'inventario_peticion_segundos_bucket{{{etiquetas},le="+Inf"}} 2', texto)
+        self.assertIn(f'inventario_respuesta_bytes_count{{{etiquetas}}} 2', texto)
+        self.assertIn('inventario_cache_productos_total{nivel="local"}', texto)
+        consultas = [linea for linea in texto.splitlines() if linea.startswith(f'inventario_peticion_consultas_sum{{{etiquetas}}}')]
+        self.assertGreater(float(consultas[0].split()[-1]), 0)
+        serializacion = [linea for linea in texto.splitlines() if linea.startswith(f'inventario_serializacion_segundos_total{{{etiquetas}}}')]
+        self.assertGreater(float(serializacion[0].split()[-1]), 0)
+
+    def test_token_requerido(self):
+        self.assertEqual(self.client.get('/api/metrics').status_code, status.HTTP_401_UNAUTHORIZED)
+        with override_settings(METRICAS={}, DEBUG=False):
+            self.assertEqual(self.client.get('/api/metrics').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_advertencia_por_presupuesto_de_consultas(self):
+        with override_settings(METRICAS={'TOKEN': 'secreto', 'PRESUPUESTO_CONSULTAS': 0}):
+            with self.assertLogs('my_api.middleware', level='WARNING') as registro:
+                self.client.get('/api/productos/')
+        self.assertIn('producto_list_create', registro.output[0])
+        self.assertIn('inventario_presupuesto_excedido_total{vista="producto_list_create"} 1', self.metricas())
+
+    async def test_cuenta_consultas_de_vistas_asincronas(self):
+        credenciales = {'Authorization': f'Bearer {AccessToken.for_user(self.usuario)}'}
+        await AsyncClient().get('/api/async/productos/busqueda/', headers=credenciales)
+        texto = metricas.exportar()
+        linea = next(linea for linea in texto.splitlines()
+                     if linea.startswith('inventario_peticion_consultas_sum{vista="async_producto_busqueda"'))
+        self.assertGreater(float(linea.split()[-1]), 0)
+
+
+class GeneracionDatosTests(TestCase):
+    def setUp(self):
+        call_command('generar_datos', categorias=3, productos=20, movimientos=300, dias=10, bloque=50, stdout=io.StringIO())
+
+    def test_stock_coincide_con_movimientos(self):
+        self.assertEqual(Producto.objects.filter(codigo__startswith='GEN').count(), 20)
+        self.assertEqual(Movimiento.objects.count(), 300)
+        for producto in Producto.objects.all():
+            saldo = sum(
+                -m.cantidad if m.tipo == 'salida' else m.cantidad
+                for m in Movimiento.objects.filter(producto=producto)
+            )
+            self.assertEqual(producto.stock, saldo)
+            self.assertGreaterEqual(producto.stock, 0)
+        self.assertEqual(
+            sum(MovimientoDiario.objects.values_list('movimientos', flat=True)), 300,
+        )
+
+    def test_misma_semilla_mismos_datos(self):
+        antes = list(Movimiento.objects.order_by('id').values_list('producto__codigo', 'tipo', 'cantidad'))
+        call_command('generar_datos', categorias=3, productos=20, movimientos=300, dias=10, bloque=50, limpiar=True, stdout=io.StringIO())
+        despues = list(Movimiento.objects.order_by('id').values_list('producto__codigo', 'tipo', 'cantidad'))
+        self.assertEqual(antes, despues)
+
+    @override_settings(METRICAS={'TOKEN': 'secreto'}, TAREAS={'DIRECTORIO': tempfile.gettempdir()})
+    def test_benchmark_detecta_regresiones(self):
+        salida = io.StringIO()
+        call_command('benchmark_api', iteraciones=1, calentamiento=0, stdout=salida, stderr=io.StringIO())
+        resultados = json.loads(salida.getvalue())
+        self.assertEqual(resultados['sin_escenario'], [])
+        self.assertEqual({n: e['estados'] for n, e in resultados['escenarios'].items() if e['estados'][-1] >= 400}, {})
+        self.assertFalse(Usuario.objects.filter(email='benchmark-api@local').exists())
+
+        # Una línea base con menos consultas hace fallar la comparación
+        resultados['escenarios']['GET api/categorias/']['consultas'] = 0
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as archivo:
+            json.dump(resultados, archivo)
+        with self.assertRaisesMessage(CommandError, 'GET api/categorias/: consultas 0'):
+            call_command('benchmark_api', iteraciones=1, calentamiento=0, linea_base=archivo.name,
+                         stdout=io.StringIO(), stderr=io.StringIO())
+
+
+class ArchivoMovimientosTests(AdminAPITestCase):
+    def setUp(self):
+        cache.clear()
+        super().setUp()
+        self.producto = Producto.objects.create(nombre='Harina', descripcion='Desc', precio=1, stock=5)
+        self.hoy = timezone.localdate()
+        # Dos movimientos de hace 400 días y uno de hoy
+        for tipo, cantidad, dias in (('entrada', 10, 400), ('salida', 4, 400), ('entrada', 3, 0)):
+            movimiento = registrar_movimiento(Movimiento(producto=self.producto, tipo=tipo, cantidad=cantidad))
+            Movimiento.objects.filter(pk=movimiento.pk).update(fecha=movimiento.fecha - timedelta(days=dias))
+        resumenes.reconstruir()
+        self.producto.refresh_from_db()  # 5 + 10 - 4 + 3
+
+    def buscar(self, **params):
+        response = self.client.get('/api/movimientos/busqueda/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [fila['cantidad'] for fila in response.data['results']]
+
+    def test_archiva_y_registra_saldo_de_apertura(self):
+        antes = self.client.get(f'/api/reportes/kardex/{self.producto.id}/').data
+        call_command('archivar_movimientos', dias=30, stdout=io.StringIO())
+
+        self.assertEqual(Movimiento.objects.count(), 1)
+        self.assertEqual(sorted(MovimientoArchivado.objects.values_list('cantidad', flat=True)), [4, 10])
+        saldo = SaldoApertura.objects.get(producto=self.producto)
+        self.assertEqual(saldo.saldo, 11)
+        self.assertEqual(saldo.saldo + 3, self.producto.stock)
+        # El resumen reconstruido incluye los archivados: el kardex no cambia
+        resumenes.reconstruir()
+        self.assertEqual(self.client.get(f'/api/reportes/kardex/{self.producto.id}/').data, antes)
+
+    def test_busqueda_y_exportacion_incluyen_archivo_segun_el_rango(self):
+        call_command('archivar_movimientos', dias=30, stdout=io.StringIO())
+        hace_un_anio = (self.hoy - timedelta(days=500)).isoformat()
+
+        self.assertEqual(self.buscar(), [3])
+        self.assertEqual(self.buscar(fecha_desde=hace_un_anio), [3, 4, 10])
+        self.assertEqual(self.buscar(historico='true', tipo='salida'), [4])
+        response = self.client.get('/api/exportar/movimientos/', {'fecha_desde': hace_un_anio})
+        self.assertEqual(len(b''.join(response.streaming_content).decode().splitlines()), 4)
+
+        # Sin inicio, el rango llega hasta lo archivado aunque termine después del corte
+        self.assertEqual(self.buscar(fecha_hasta=self.hoy.isoformat()), [3, 4, 10])
+        response = self.client.get('/api/exportar/movimientos/', {'fecha_hasta': self.hoy.isoformat()})
+        self.assertEqual(len(b''.join(response.streaming_content).decode().splitlines()), 4)
+
+    def test_interrupcion_no_oculta_lo_archivado(self):
+        dia = archivo.dia_de_corte(30)
+        with mock.patch('my_api.archivo.registrar_saldos', side_effect=RuntimeError('caída')), self.assertRaises(RuntimeError):
+            archivo.archivar(dia, bloque=1)
+        self.assertEqual(MovimientoArchivado.objects.count(), 2)
+        self.assertEqual(self.buscar(historico='true'), [3, 4, 10])
+
+        # Volver a ejecutar termina el mismo corte
+        self.assertEqual(archivo.archivar(dia), 0)
+        self.assertEqual(list(CorteArchivo.objects.values_list('movimientos', flat=True)), [2])
+        self.assertEqual(SaldoApertura.objects.get(producto=self.producto).saldo, 11)
+
+    def test_corte_no_retrocede(self):
+        call_command('archivar_movimientos', dias=30, stdout=io.StringIO())
+        with self.assertRaises(CommandError):
+            call_command('archivar_movimientos', dias=60, stdout=io.StringIO())
+
+
+@override_settings(REPLICAS={'ALIAS': ['replica_prueba'], 'FIJAR_SEGUNDOS': 5, 'SALUD_SEGUNDOS': 10})
+class ReplicasTests(TransactionTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Réplica simulada: otra conexión a la misma base de pruebas
+        connections.settings['replica_prueba'] = dict(connections['default'].settings_dict)
+        cls.databases = {'default', 'replica_prueba'}
+
+    @classmethod
+    def tearDownClass(cls):
+        connections['replica_prueba'].close()
+        del connections['replica_prueba']
+        del connections.settings['replica_prueba']
+        del cls.databases
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        replicas._salud.clear()
+        self.usuario = Usuario.objects.create_user(email='admin@test.com', password='clave123', nombre='Admin', apellido='Test', is_staff=True)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.usuario)}')
+
+    def consultas_en_replica(self, metodo, url, datos=None):
+        with CaptureQueriesContext(connections['replica_prueba']) as consultas:
+            response = getattr(self.client, metodo)(url, datos, format='json')
+        self.assertLess(response.status_code, 400)
+        return len(consultas)
+
+    def test_lecturas_en_replica_y_primaria_tras_escribir(self):
+        self.assertGreater(self.consultas_en_replica('get', '/api/productos/'), 0)
+        nuevo = {'nombre': 'Agua', 'descripcion': 'Desc', 'precio': '1.00', 'stock': 1}
+        self.assertEqual(self.consultas_en_replica('post', '/api/productos/', nuevo), 0)
+        # El mismo cliente lee sus escrituras desde la primaria
+        self.assertEqual(self.consultas_en_replica('get', '/api/productos/'), 0)
+        cache.clear()
+        self.assertGreater(self.consultas_en_replica('get', '/api/productos/'), 0)
+
+    def test_replica_caida_usa_la_primaria(self):
+        caida = mock.patch.object(connections['replica_prueba'], 'cursor', side_effect=OperationalError('sin conexión'))
+        with caida, self.assertLogs('my_api.replicas', level='WARNING'):
+            response = self.client.get('/api/productos/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIs(replicas._salud['replica_prueba'][0], False)
+
+    def test_fuera_de_peticiones_se_lee_la_primaria(self):
+        self.assertEqual(replicas.RouterReplicas().db_for_read(Producto), 'default')
+
+    def test_lo_que_llena_la_cache_compartida_se_lee_de_la_primaria(self):
+        Producto.objects.create(nombre='Agua', descripcion='Desc', precio=1, stock=1, codigo='780001')
+        # Usuario, producto y categoría cacheados: nada sale de la réplica
+        self.assertEqual(self.consultas_en_replica('get', '/api/productos/codigo/780001/'), 0)
+        self.consultas_en_replica('get', '/api/productos/')  # Comprueba la salud de la réplica
+        sin_facetas = self.consultas_en_replica('get', '/api/productos/busqueda/', {'categoria': 1})
+        con_facetas = self.consultas_en_replica('get', '/api/productos/busqueda/', {'categoria': 1, 'facetas': 'true'})
+        self.assertEqual(con_facetas, sin_facetas)
+
+
+class AdminTests(TestCase):
+    def setUp(self):
+        self.usuario = Usuario.objects.create_superuser(email='admin@test.com', password='clave123', nombre='Admin', apellido='Test')
+        self.client.force_login(self.usuario)
+
+    def sembrar(self, cantidad):
+        categoria = Categoria.objects.create(nombre=f'Categoría {Categoria.objects.count()}')
+        inicio = Producto.objects.count()
+        productos = Producto.objects.bulk_create([
+            Producto(nombre=f'Producto {inicio + i}', descripcion='Desc', precio=1, stock=100, categoria=categoria)
+            for i in range(cantidad)
+        ])
+        Movimiento.objects.bulk_create([Movimiento(producto=producto, tipo='entrada', cantidad=1) for producto in productos])
+
+    def consultas(self, url):
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(consultas)
+
+    def test_listados_sin_consultas_por_fila(self):
+        for url in ('/admin/my_api/movimiento/', '/admin/my_api/producto/', '/admin/usuarios/usuario/'):
+            self.sembrar(5)
+            pocas = self.consultas(url)
+            self.sembrar(40)
+            self.assertEqual(self.consultas(url), pocas, url)
+
+        ahora = timezone.localtime()
+        url = f'/admin/my_api/movimiento/?fecha__year={ahora.year}&fecha__month={ahora.month}'
+        self.assertLessEqual(self.consultas(url), pocas + 1)
+
+    def test_formulario_no_carga_todos_los_productos(self):
+        self.sembrar(20)
+        response = self.client.get('/admin/my_api/movimiento/add/')
+        self.assertContains(response, 'admin-autocomplete')
+        self.assertNotContains(response, 'Producto 7')
+
+    def test_texto_del_movimiento_sin_consultar_el_producto(self):
+        self.sembrar(1)
+        movimiento = Movimiento.objects.get()
+        with self.assertNumQueries(0):
+            self.assertEqual(str(movimiento), f'entrada - {movimiento.producto_id} (1)')
+        self.assertEqual(str(Movimiento.objects.select_related('producto').get()), 'entrada - Producto 0 (1)')
+
+    def test_paginador_estimado(self):
+        self.sembrar(3)
+        # SQLite no tiene estimaciones: cuenta exacta
+        self.assertEqual(PaginadorEstimado(Movimiento.objects.order_by('id'), 2).count, 3)
+        with mock.patch('my_api.pagination.estimar_filas', return_value=5_000_000):
+            paginador = PaginadorEstimado(Movimiento.objects.order_by('id'), 100)
+            self.assertEqual(paginador.count, 5_000_000)
+            self.assertEqual(paginador.num_pages, 50_000)
+        with mock.patch('my_api.pagination.estimar_filas', return_value=10):
+            self.assertEqual(PaginadorEstimado(Movimiento.objects.order_by('id'), 2).count, 3)
+
+    def test_stock_solo_editable_al_crear(self):
+        self.sembrar(1)
+        producto = Producto.objects.get()
+        response = self.client.get(f'/admin/my_api/producto/{producto.id}/change/')
+        self.assertNotContains(response, 'name="stock"')
+        self.assertContains(self.client.get('/admin/my_api/producto/add/'), 'name="stock"')
+
+
+class FacetasTests(AdminAPITestCase):
+    def setUp(self):
+        cache.clear()
+        super().setUp()
+        bebidas = Categoria.objects.create(nombre='Bebidas')
+        lacteos = Categoria.objects.create(nombre='Lácteos')
+        for nombre, precio, stock, categoria in [
+            ('Agua mineral', 5, 0, bebidas), ('Agua con gas', 20, 50, bebidas), ('Jugo de naranja', 60, 8, bebidas),
+            ('Leche entera', 15, 30, lacteos), ('Sal', 700, 3, None),
+        ]:
+            Producto.objects.create(nombre=nombre, descripcion='Desc', precio=precio, stock=stock, categoria=categoria)
+
+    def test_facetas_de_todos_los_resultados(self):
+        response = self.client.get('/api/productos/busqueda/', {'facetas': 'true', 'page_size': 2})
+        self.assertEqual(len(response.data['results']), 2)
+        facetas = response.data['facetas']
+        self.assertEqual(
+            [(c['nombre'], c['total']) for c in facetas['categorias']],
+            [('Bebidas', 3), ('Lácteos', 1), (None, 1)],
+        )
+        self.assertEqual([tramo['total'] for tramo in facetas['precios']], [1, 2, 1, 0, 1])
+        self.assertEqual(facetas['precios'][0], {'desde': None, 'hasta': 10, 'total': 1})
+        self.assertEqual(facetas['stock'], {'agotado': 1, 'bajo': 2, 'disponible': 2})
+        self.assertNotIn('facetas', self.client.get('/api/productos/busqueda/').data)
+
+    def test_facetas_con_filtros_y_busqueda_por_nombre(self):
+        response = self.client.get('/api/productos/busqueda/', {'facetas': 'true', 'nombre': 'agua', 'precio_min': 10})
+        self.assertEqual([p['nombre'] for p in response.data['results']], ['Agua con gas'])
+        self.assertEqual(response.data['facetas']['categorias'], [{'id': response.data['results'][0]['categoria'], 'nombre': 'Bebidas', 'total': 1}])
+        self.assertEqual(response.data['facetas']['stock'], {'agotado': 0, 'bajo': 0, 'disponible': 1})
+
+    def test_una_consulta_y_cache_por_version_del_catalogo(self):
+        productos = Producto.objects.all()
+        with self.assertNumQueries(1):
+            facetas.calcular(productos)
+
+        params = QueryDict('facetas=true&categoria=bebidas')
+        primera = facetas.facetas(Producto.objects.filter(filtros_productos(params)), params)
+        with self.assertNumQueries(0):
+            self.assertEqual(facetas.facetas(productos.none(), params), primera)
+
+        # Un movimiento cambia el stock y la versión de productos
+        registrar_movimiento(Movimiento(producto=Producto.objects.get(nombre='Agua mineral'), tipo='entrada', cantidad=20))
+        actualizadas = facetas.facetas(Producto.objects.filter(filtros_productos(params)), params)
+        self.assertEqual(actualizadas['stock'], {'agotado': 0, 'bajo': 1, 'disponible': 2})
+
+    async def test_facetas_asincronas(self):
+        credenciales = {'Authorization': f'Bearer {AccessToken.for_user(self.usuario)}'}
+        response = await AsyncClient().get('/api/async/productos/busqueda/', {'facetas': 'true', 'precio_min': 10}, headers=credenciales)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(response.content)['facetas']['stock'], {'agotado': 0, 'bajo': 2, 'disponible': 2})
+
+
+@override_settings(LIMITES={'ALCANCES': {'lectura': (3, 1), 'escritura': (30, 5), 'codigo': (2, 0.5), 'token': (2, 0.1)}})
+class LimitesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.usuario = Usuario.objects.create_user(email='cliente@test.com', password='clave123', nombre='Cliente', apellido='Test')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.usuario)
+        Producto.objects.create(nombre='Agua', descripcion='Desc', precio=1, stock=5, codigo='111')
+
+    def test_cubeta_por_usuario_y_alcance(self):
+        with mock.patch('my_api.limites.time.time', return_value=1000.0) as reloj:
+            for _ in range(3):
+                self.assertEqual(self.client.get('/api/categorias/').status_code, status.HTTP_200_OK)
+            response = self.client.get('/api/categorias/')
+            self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+            self.assertEqual(response['Retry-After'], '1')
+
+            # Otro alcance tiene su propia cubeta
+            self.assertEqual(self.client.get('/api/productos/codigo/111/').status_code, status.HTTP_200_OK)
+
+            # Una ficha por segundo
+            reloj.return_value = 1001.0
+            self.assertEqual(self.client.get('/api/categorias/').status_code, status.HTTP_200_OK)
+            self.assertEqual(self.client.get('/api/categorias/').status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        # Otro usuario no comparte la cubeta; el staff no tiene límite
+        otro = Usuario.objects.create_user(email='otro@test.com', password='clave123', nombre='Otro', apellido='Test', is_staff=True)
+        self.client.force_authenticate(user=otro)
+        for _ in range(5):
+            self.assertEqual(self.client.get('/api/categorias/').status_code, status.HTTP_200_OK)
+
+    def test_tokens_limitados_por_ip(self):
+        cliente = APIClient()
+        response = cliente.post('/api/token/refresh/', {'refresh': 'invalido'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        # Obtener y renovar comparten el alcance 'token'
+        response = cliente.post('/api/token/', {'email': 'cliente@test.com', 'password': 'clave123'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = cliente.post('/api/token/refresh/', {'refresh': response.data['refresh']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '10')
+        self.assertIn(
+            'inventario_limite_excedido_total{alcance="token"}', metricas.exportar(),
+        )
+
+    def test_peticiones_simultaneas_no_superan_la_capacidad(self):
+        # Cada operación de la caché tarda un poco, así las peticiones se solapan
+        class CacheLenta:
+            def __getattr__(self, nombre):
+                metodo = getattr(cache, nombre)
+
+                def lento(*args, **kwargs):
+                    time.sleep(0.002)
+                    return metodo(*args, **kwargs)
+                return lento
+
+        barrera = threading.Barrier(20)
+        permitidas = []
+
+        def peticion():
+            barrera.wait()
+            if not limites.consumir('lectura', 'u1'):
+                permitidas.append(1)
+
+        with mock.patch('my_api.limites.time.time', return_value=1000.0) as reloj, mock.patch('my_api.limites.cache', CacheLenta()):
+            hilos = [threading.Thread(target=peticion) for _ in range(20)]
+            for hilo in hilos:
+                hilo.start()
+            for hilo in hilos:
+                hilo.join()
+            self.assertEqual(len(permitidas), 3)
+            # Las rechazadas no consumieron fichas: al segundo siguiente pasa una
+            reloj.return_value = 1001.0
+            self.assertEqual(limites.consumir('lectura', 'u1'), 0)
+            self.assertGreater(limites.consumir('lectura', 'u1'), 0)
+
+    @override_settings(LIMITES={'ALCANCES': {'lectura': (120, 20)}})
+    def test_trafico_constante_no_acumula_fichas(self):
+        # 10 peticiones por segundo durante 10 minutos, por debajo de la tasa
+        with mock.patch('my_api.limites.time.time') as reloj:
+            for paso in range(6000):
+                reloj.return_value = 1000.0 + paso / 10
+                self.assertEqual(limites.consumir('lectura', 'u1'), 0)
+            # La ráfaga posterior no supera la capacidad
+            reloj.return_value = 1600.0
+            permitidas = sum(1 for _ in range(500) if not limites.consumir('lectura', 'u1'))
+        self.assertEqual(permitidas, 120)
+
+    async def test_vistas_asincronas_limitadas(self):
+        credenciales = {'Authorization': f'Bearer {AccessToken.for_user(self.usuario)}'}
+        cliente = AsyncClient()
+        for _ in range(2):
+            response = await cliente.get('/api/async/productos/codigo/111/', headers=credenciales)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = await cliente.get('/api/async/productos/codigo/111/', headers=credenciales)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+
+
+class ValoracionTests(AdminAPITestCase):
+    def setUp(self):
+        cache.clear()
+        super().setUp()
+        self.bebidas = Categoria.objects.create(nombre='Bebidas')
+        self.lacteos = Categoria.objects.create(nombre='Lácteos')
+        self.agua = Producto.objects.create(nombre='Agua', descripcion='Desc', precio='1.50', stock=10, punto_reorden=5, codigo='A1', categoria=self.bebidas)
+        self.leche = Producto.objects.create(nombre='Leche', descripcion='Desc', precio='2.00', stock=3, punto_reorden=4, codigo='L1', categoria=self.lacteos)
+
+    def assertConsistente(self):
+        self.assertEqual(valoracion.diferencias(), [])
+
+    def test_se_mantiene_con_productos_y_movimientos(self):
+        resumen = ResumenCategoria.objects.get(categoria=self.bebidas)
+        self.assertEqual((resumen.productos, resumen.unidades, resumen.valor, resumen.bajo_reorden), (1, 10, Decimal('15.00'), 0))
+
+        registrar_movimiento(Movimiento(producto=self.agua, tipo='salida', cantidad=6))
+        self.assertEqual(ResumenCategoria.objects.get(categoria=self.bebidas).bajo_reorden, 1)
+        self.assertConsistente()
+        lote = {'movimientos': [{'producto': self.agua.id, 'tipo': 'entrada', 'cantidad': 4}, {'producto': self.leche.id, 'tipo': 'ajuste', 'cantidad': 2}]}
+        self.assertEqual(self.client.post('/api/movimientos/lote/', lote, format='json').status_code, status.HTTP_201_CREATED)
+        self.assertConsistente()
+
+        # Cambio de categoría, precio y punto de reorden
+        response = self.client.patch(f'/api/productos/{self.agua.id}/', {'categoria': self.lacteos.id, 'precio': '3.00', 'punto_reorden': 20}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertConsistente()
+        self.assertEqual(ResumenCategoria.objects.get(categoria=self.bebidas).productos, 0)
+
+        importar_productos([
+            {'codigo': 'L1', 'nombre': 'Leche', 'precio': '2.50', 'stock': 99, 'categoria': 'Bebidas'},
+            {'codigo': 'N1', 'nombre': 'Nuevo', 'precio': '1.00', 'stock': 7},
+        ])
+        self.assertConsistente()
+
+        self.leche.refresh_from_db()
+        self.leche.delete()
+        self.lacteos.delete()
+        self.assertConsistente()
+        self.assertEqual(ResumenCategoria.objects.get(categoria=None).productos, 2)
+
+    def test_tablero_y_reorden(self):
+        Producto.objects.create(nombre='Queso', descripcion='Desc', precio='5.00', stock=1, categoria=self.lacteos)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/reportes/tablero/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['totales'], {'productos': 3, 'unidades': 14, 'valor': Decimal('26.00'), 'bajo_reorden': 1})
+        self.assertEqual([fila['categoria_nombre'] for fila in response.data['categorias']], ['Bebidas', 'Lácteos'])
+
+        response = self.client.get('/api/productos/reorden/')
+        self.assertEqual([producto['codigo'] for producto in response.data['results']], ['L1'])
+        self.assertEqual(response.data['results'][0]['punto_reorden'], 4)
+
+        plan = Producto.objects.filter(stock__lt=F('punto_reorden')).order_by('id')[:51].explain()
+        if connection.vendor == 'sqlite':
+            self.assertIn('producto_reorden_idx', plan)
+
+    def test_comando_de_verificacion(self):
+        call_command('verificar_valoracion', stdout=io.StringIO())
+        ResumenCategoria.objects.filter(categoria=self.bebidas).update(valor=0)
+        with self.assertRaises(CommandError):
+            call_command('verificar_valoracion', stdout=io.StringIO())
+        call_command('verificar_valoracion', reparar=True, stdout=io.StringIO())
+        self.assertConsistente()
@@ -0,0 +1,70 @@
+import os
+
+from django.http import QueryDict
+
+from tareas.registro import almacenamiento, tarea
+from . import exportacion, resumenes, valoracion
+from .archivo import archivar, dia_de_corte
+from .importacion import importar_productos, leer_filas
+from .search import reconstruir_indice, usa_pg_trgm
+from .views import ExportarMovimientosView, ExportarProductosView
+
+
+# Tareas en segundo plano de la aplicación (se registran al iniciar, ver tareas/apps.py)
+
+# Sin reintentos: los bloques ya confirmados quedan guardados y las filas sin
+# código recibirían códigos nuevos, así que repetir la importación las duplicaría.
+# El detalle de la tarea indica hasta qué fila se llegó.
+@tarea('importar_productos', max_intentos=1)
+def importar(contexto, archivo=None, formato=None, filas=None):
+    almacen = almacenamiento()
+    total = len(filas) if filas is not None else None
+
+    def progreso(resumen):
+        porcentaje = resumen['procesadas'] * 100 // total if total else None
+        contexto.progreso(porcentaje, procesadas=resumen['procesadas'], creados=resumen['creados'],
+                          actualizados=resumen['actualizados'], errores=len(resumen['errores']))
+
+    if filas is not None:
+        return importar_productos(filas, progreso=progreso)
+    with almacen.open(archivo, 'rb') as entrada:
+        resumen = importar_productos(leer_filas(entrada, formato), progreso=progreso)
+    almacen.delete(archivo)  # Solo al terminar bien: si falla queda para revisarlo
+    return resumen
+
+
+@tarea('exportar')
+def exportar(contexto, nombre, formato, consulta=''):
+    vista = {'movimientos': ExportarMovimientosView, 'productos': ExportarProductosView}[nombre]()
+    filas = exportacion.generar(formato, vista.get_queryset(QueryDict(consulta)), vista.columnas)
+    destino = f'exportaciones/{nombre}-{contexto.tarea.pk}.{formato}'
+    ruta = almacenamiento().path(destino)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    escritos = 0
+    with open(ruta, 'w', encoding='utf-8', newline='') as salida:
+        for bloque in filas:
+            salida.write(bloque)
+            escritos += len(bloque)
+            contexto.progreso(bytes=escritos)
+    return {'archivo': destino, 'bytes': os.path.getsize(ruta)}
+
+
+@tarea('reconstruir_resumen', publica=True)
+def reconstruir_resumen(contexto):
+    return {'filas': resumenes.reconstruir()}
+
+
+@tarea('reconstruir_valoracion', publica=True)
+def reconstruir_valoracion(contexto):
+    return {'categorias': valoracion.reconstruir()}
+
+
+@tarea('reconstruir_indice_busqueda', publica=True)
+def reconstruir_indice_busqueda(contexto):
+    return {'productos': 0 if usa_pg_trgm() else reconstruir_indice()}
+
+
+@tarea('archivar_movimientos', publica=True)
+def archivar_movimientos(contexto, dias=None):
+    dia = dia_de_corte(dias)
+    return {'corte': dia.isoformat(), 'movimientos': archivar(dia)}
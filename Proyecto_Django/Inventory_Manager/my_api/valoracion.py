@@ -0,0 +1,101 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import Coalesce
+
+from .models import Producto, ResumenCategoria
+from .resumenes import sumar_filas
+
+
+COLUMNAS = ('productos', 'unidades', 'valor', 'bajo_reorden')
+
+# Campos de Producto que cambian su aporte a la valoración
+CAMPOS_PRODUCTO = {'categoria', 'stock', 'precio', 'punto_reorden'}
+
+
+# Aporte de un producto a la fila de su categoría (signo=-1 para restarlo)
+def aporte(categoria_id, stock, precio, punto_reorden, signo=1):
+    return categoria_id, {
+        'productos': signo,
+        'unidades': signo * stock,
+        'valor': signo * stock * Decimal(str(precio)),
+        'bajo_reorden': signo * int(stock < punto_reorden),
+    }
+
+
+def aporte_de(producto, signo=1):
+    return aporte(producto.categoria_id, producto.stock, producto.precio, producto.punto_reorden, signo)
+
+
+def orden_categoria(categoria_id):
+    return categoria_id is not None, categoria_id or 0
+
+
+# Suma los aportes a sus filas. Debe llamarse dentro de la misma transacción
+# que escribe los productos.
+def acumular(aportes):
+    totales = defaultdict(lambda: defaultdict(int))
+    for categoria_id, valores in aportes:
+        for columna, valor in valores.items():
+            totales[categoria_id][columna] += valor
+
+    # Siempre en orden de categoría (sin categoría primero): dos transacciones
+    # que tocan las mismas filas se esperan en lugar de bloquearse mutuamente
+    sumar_filas(ResumenCategoria, 'COALESCE(categoria_id, 0)', COLUMNAS, [
+        {'categoria_id': categoria_id, **{columna: totales[categoria_id][columna] for columna in COLUMNAS}}
+        for categoria_id in sorted(totales, key=orden_categoria)
+        if any(totales[categoria_id].values())
+    ])
+
+
+# Aplica variaciones de stock ya escritas (producto -> delta). Lee el estado
+# posterior de los productos, así el aporte anterior es exacto aunque el
+# UPDATE haya usado F('stock').
+def variar_stock(deltas):
+    aportes = []
+    filas = Producto.objects.filter(pk__in=deltas).values_list('id', 'categoria_id', 'stock', 'precio', 'punto_reorden')
+    for pk, categoria_id, stock, precio, punto_reorden in filas:
+        aportes.append(aporte(categoria_id, stock - deltas[pk], precio, punto_reorden, signo=-1))
+        aportes.append(aporte(categoria_id, stock, precio, punto_reorden))
+    acumular(aportes)
+
+
+# Valoración calculada desde `productos` (recorre la tabla completa)
+def calcular():
+    valor = ExpressionWrapper(F('stock') * F('precio'), output_field=DecimalField(max_digits=20, decimal_places=2))
+    filas = (
+        Producto.objects.order_by().values('categoria')
+        .annotate(
+            productos=Count('id'), unidades=Coalesce(Sum('stock'), 0),
+            valor=Coalesce(Sum(valor), 0, output_field=valor.output_field),
+            bajo_reorden=Count('id', filter=Q(stock__lt=F('punto_reorden'))),
+        )
+    )
+    return {fila.pop('categoria'): fila for fila in filas}
+
+
+def reconstruir():
+    calculada = calcular()
+    with transaction.atomic():
+        ResumenCategoria.objects.all().delete()
+        ResumenCategoria.objects.bulk_create([
+            ResumenCategoria(categoria_id=categoria_id, **valores) for categoria_id, valores in calculada.items()
+        ])
+    return len(calculada)
+
+
+# Diferencias entre la tabla mantenida y el cálculo completo:
+# lista de (categoria_id, columna, guardado, calculado)
+def diferencias():
+    calculada = calcular()
+    guardada = {fila.pop('categoria'): fila for fila in ResumenCategoria.objects.values('categoria', *COLUMNAS)}
+    cero = dict.fromkeys(COLUMNAS, 0)
+    resultado = []
+    for categoria_id in sorted(calculada.keys() | guardada.keys(), key=orden_categoria):
+        esperado, actual = calculada.get(categoria_id, cero), guardada.get(categoria_id, cero)
+        for columna in COLUMNAS:
+            if actual[columna] != esperado[columna]:
+                resultado.append((categoria_id, columna, actual[columna], esperado[columna]))
+    return resultado
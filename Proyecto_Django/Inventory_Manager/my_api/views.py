@@ -1,23 +1,77 @@
 from rest_framework import generics
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
-from rest_framework.exceptions import PermissionDenied
-from .models import Producto, Movimiento, Categoria
-from .serializers import ProductoSerializer, MovimientoSerializer, CategoriaSerializer
+from rest_framework.exceptions import NotFound, PermissionDenied
+from .models import Producto, Movimiento, Categoria, MovimientoDiario, ResumenCategoria
+from .serializers import ProductoSerializer, MovimientoSerializer, CategoriaSerializer, MovimientoLoteSerializer, MovimientoLoteItemSerializer, ResumenProductoSerializer, CodigosLoteSerializer
+from .services import registrar_lote, registrar_movimiento, actualizar_movimiento, eliminar_movimiento
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework_simplejwt.views import TokenRefreshView
+from rest_framework import status
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 import logging
-from django.db.models import Q
+from django.db.models import F, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.shortcuts import get_object_or_404
+from django.http import HttpResponse, StreamingHttpResponse
+from django.conf import settings
+from django.views import View
 from rest_framework.generics import ListCreateAPIView, ListAPIView
+from .pagination import ProductoCursorPagination, ProductoRangoCursorPagination, MovimientoCursorPagination
+from .search import buscar_productos
+from .filtros import filtros_movimientos, filtros_productos, rango_fechas
+from .resumenes import variacion_neta
+from . import archivo
+from . import facetas
+from . import exportacion
+from . import cache_productos
+from .condicional import respuesta_condicional, etag_contenido, con_validadores
+from django.utils.cache import get_conditional_response
+from .importacion import ArchivoInvalido, importar_productos, leer_filas
+from . import sincronizacion
+from . import metricas
+from tareas.registro import almacenamiento, encolar
+from tareas.views import respuesta_tarea
 
 # Logger para registrar información en la consola
 logger = logging.getLogger(__name__)
 
+# Las operaciones largas aceptan ?asincrono=true: responden 202 con una tarea
+def es_asincrono(request):
+    return request.query_params.get('asincrono') in ('1', 'true')
+
+# Respuesta de un producto ya serializado (desde la caché) con ETag por contenido
+def respuesta_por_contenido(request, datos):
+    etag = etag_contenido(datos)
+    response = get_conditional_response(request, etag=etag) or Response(datos)
+    return con_validadores(response, etag)
+
+# Página serializada por el camino rápido (values() + representar_filas):
+# mismo formato que el serializador, sin instancias del modelo
+def pagina_rapida(serializer, queryset, paginador, request, view=None):
+    orden = [campo.lstrip('-') for campo in paginador.ordering]
+    pagina = paginador.paginate_queryset(serializer.valores(queryset, extra=orden), request, view=view)
+    return paginador.get_paginated_response(serializer.representar_filas(pagina))
+
+# Listados de solo lectura por el camino rápido; admiten ?fields= y ?omit=
+class ListaRapidaMixin:
+    def list(self, request, *args, **kwargs):
+        serializer = self.get_serializer()
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.paginator is None:
+            return Response(serializer.representar_filas(serializer.valores(queryset)))
+        return pagina_rapida(serializer, queryset, self.paginator, request, view=self)
+
 # Listar y crear productos
-class ProductoListCreateView(generics.ListCreateAPIView):
+class ProductoListCreateView(ListaRapidaMixin, generics.ListCreateAPIView):
     queryset = Producto.objects.all().select_related('categoria') # Consulta optimizada
     serializer_class = ProductoSerializer # Define el serializador a usar
     permission_classes = [IsAuthenticated] # Requiere autenticación
+    pagination_class = ProductoCursorPagination # Paginación por cursor
+
+    # GET condicional: 304 si el catálogo no cambió desde la última descarga
+    @respuesta_condicional('productos')
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
 
     # Método para crear un producto solo si el usuario es administrador
     def perform_create(self, serializer):
@@ -32,24 +86,29 @@ class ProductoDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = ProductoSerializer
     permission_classes = [IsAuthenticated]
 
-# Vista para listar y crear movimientos
-class MovimientoListCreateView(ListCreateAPIView):
-    queryset = Movimiento.objects.all()
-    serializer_class = MovimientoSerializer
-    permission_classes = [IsAuthenticated]
+    # Las lecturas se sirven desde la caché de productos
+    def retrieve(self, request, *args, **kwargs):
+        datos = cache_productos.producto_por_id(kwargs['pk'])
+        if datos is None:
+            raise NotFound()
+        return respuesta_por_contenido(request, datos)
 
-    # Validación para crear movimientos solo si es administrador
-    def perform_create(self, serializer):
-        if self.request.user.is_staff:
-            serializer.save()
-        else:
-            raise PermissionDenied("No tienes permiso para realizar esta acción.")
 # Vista para detalle y actualización de movimientos
 class MovimientoDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Movimiento.objects.all()
     serializer_class = MovimientoSerializer
     permission_classes = [IsAuthenticated, IsAdminUser] # Solo admins pueden modificar
 
+    # Los cambios pasan por el servicio de stock para mantenerlo consistente
+    def perform_update(self, serializer):
+        movimiento = serializer.instance
+        for campo, valor in serializer.validated_data.items():
+            setattr(movimiento, campo, valor)
+        serializer.instance = actualizar_movimiento(movimiento)
+
+    def perform_destroy(self, instance):
+        eliminar_movimiento(instance)
+
 # Vista protegida de prueba
 class ProtectedView(APIView):
     permission_classes = [IsAuthenticated]
@@ -57,10 +116,17 @@ class ProtectedView(APIView):
     def get(self, request):
         return Response({"message": "Esto está protegido"})
     
+# Vista para obtener el token, con su propio límite por IP
+class CustomTokenObtainPairView(TokenObtainPairView):
+    throttle_scope = 'token'
+
 # Vista personalizada para refrescar el token
 class CustomTokenRefreshView(TokenRefreshView):
+    throttle_scope = 'token'
+
     def post(self, request, *args, **kwargs):
-        logger.info(f"Datos recibidos: {request.data}")
+        # No se registra el cuerpo: contiene el token de refresco
+        logger.info("Renovación de token solicitada")
         return super().post(request, *args, **kwargs)
     
 # Vista para búsqueda avanzada de productos
@@ -69,95 +135,342 @@ class ProductoBusquedaAvanzadaView(APIView):
 
     def get(self, request):
         nombre = request.query_params.get('nombre', None)
-        categoria = request.query_params.get('categoria', None)
-        precio_min = request.query_params.get('precio_min', None)
-        precio_max = request.query_params.get('precio_max', None)
-
-        filtros = Q()
+        productos = Producto.objects.filter(filtros_productos(request.query_params))
         if nombre:
-            filtros &= Q(nombre__icontains=nombre)
-        if categoria:
-            filtros &= Q(categoria__nombre__icontains=categoria)
-        if precio_min:
-            filtros &= Q(precio__gte=precio_min)
-        if precio_max:
-            filtros &= Q(precio__lte=precio_max)
-
-        productos = Producto.objects.filter(filtros)
-        serializer = ProductoSerializer(productos, many=True)
-        return Response(serializer.data)
-
-# Vista para búsqueda de movimientos
-class MovimientoListCreateView(ListCreateAPIView):
-    queryset = Movimiento.objects.all()
+            # Búsqueda indexada por trigramas, ordenada por relevancia
+            productos = buscar_productos(productos, nombre)
+            paginador = ProductoRangoCursorPagination()
+        else:
+            paginador = ProductoCursorPagination()
+        response = pagina_rapida(ProductoSerializer(context={'request': request}), productos, paginador, request, view=self)
+        if facetas.pedidas(request.query_params):
+            # ?facetas=true: conteos de todos los resultados, no solo de la página
+            response.data['facetas'] = facetas.facetas(productos, request.query_params)
+        return response
+
+# Vista para listar y crear movimientos
+class MovimientoListCreateView(ListaRapidaMixin, ListCreateAPIView):
+    queryset = Movimiento.objects.all().select_related('producto')
     serializer_class = MovimientoSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = MovimientoCursorPagination
 
     def perform_create(self, serializer):
         if self.request.user.is_staff:
-            movimiento = serializer.save()
-            producto = movimiento.producto
-
-            # Actualiza el stock del producto según el tipo de movimiento
-            if movimiento.tipo == 'entrada':
-                producto.stock += movimiento.cantidad
-            elif movimiento.tipo == 'salida':
-                if producto.stock < movimiento.cantidad:
-                    raise PermissionDenied("No hay suficiente stock para realizar esta salida.")
-                producto.stock -= movimiento.cantidad
-            else:
-                raise PermissionDenied("Tipo de movimiento no válido.")
-
-            producto.save()
+            # Comprobación de stock y actualización en un único UPDATE condicional
+            serializer.instance = registrar_movimiento(Movimiento(**serializer.validated_data))
         else:
             raise PermissionDenied("No tienes permiso para realizar esta acción.")
 
-# Vista para obtener productos por código
-class MovimientoBusquedaView(APIView):
+# Vista para registrar varios movimientos en una sola petición
+class MovimientoLoteView(APIView):
     permission_classes = [IsAuthenticated]
 
-    def get(self, request):
-        producto_nombre = request.query_params.get('producto_nombre', None)
-        tipos = request.query_params.getlist('tipo', None)  # Permite seleccionar múltiples tipos
-        cantidad = request.query_params.get('cantidad', None)  # Cantidad exacta
-        fecha = request.query_params.get('fecha', None)  # Fecha exacta
+    def post(self, request):
+        if not request.user.is_staff:
+            raise PermissionDenied("No tienes permiso para realizar esta acción.")
 
-        filtros = Q()
+        lote = MovimientoLoteSerializer(data=request.data)
+        lote.is_valid(raise_exception=True)
+        atomico = lote.validated_data['atomico']
 
-        # 🔎 Filtro por nombre de producto
-        if producto_nombre:
-            filtros &= Q(producto__nombre__icontains=producto_nombre)
+        # Validación de formato de cada línea (sin consultas)
+        lineas, errores = [], []
+        for numero, datos in enumerate(lote.validated_data['movimientos']):
+            item = MovimientoLoteItemSerializer(data=datos)
+            if item.is_valid():
+                lineas.append((numero, item.validated_data))
+            else:
+                errores.append({'linea': numero, 'errores': item.errors})
+
+        if errores and atomico:
+            return Response({'creados': 0, 'errores': errores}, status=status.HTTP_400_BAD_REQUEST)
 
-        # 🔎 Filtro por tipo (entrada, salida)
-        if tipos:
-            filtros &= Q(tipo__in=tipos)
+        movimientos, errores_stock = registrar_lote([linea for _, linea in lineas], atomico=atomico)
+        # Traduce la posición dentro de las líneas válidas a la posición original
+        for error in errores_stock:
+            error['linea'] = lineas[error['linea']][0]
+        errores = sorted(errores + errores_stock, key=lambda error: error['linea'])
 
-        # 🔎 Filtro por cantidad exacta
-        if cantidad:
-            filtros &= Q(cantidad=cantidad)
+        codigo = status.HTTP_201_CREATED if movimientos else status.HTTP_400_BAD_REQUEST
+        return Response({
+            'creados': len(movimientos),
+            'movimientos': MovimientoSerializer(movimientos, many=True).data,
+            'errores': errores,
+        }, status=codigo)
 
-        # 🔎 Filtro por fecha exacta
-        if fecha:
-            filtros &= Q(fecha__date=fecha)
+# Vista para obtener productos por código
+class MovimientoBusquedaView(APIView):
+    permission_classes = [IsAuthenticated]
 
-        # Consulta a la base de datos
-        movimientos = Movimiento.objects.filter(filtros)
-        serializer = MovimientoSerializer(movimientos, many=True)
-        return Response(serializer.data)
+    def get(self, request):
+        filtros = filtros_movimientos(request.query_params)
+
+        # Consulta a la base de datos (con los archivados si el rango llega antes del corte)
+        movimientos = archivo.movimientos(request.query_params).filter(filtros)
+        serializer = MovimientoSerializer(context={'request': request})
+        return pagina_rapida(serializer, movimientos, MovimientoCursorPagination(), request, view=self)
 
 # Búsqueda de productos por código
 class ProductoPorCodigoView(APIView):
     permission_classes = [IsAuthenticated]
+    throttle_scope = 'codigo'
 
     def get(self, request, codigo):
-        try:
-            producto = Producto.objects.get(codigo=codigo)
-            serializer = ProductoSerializer(producto)
-            return Response(serializer.data)
-        except Producto.DoesNotExist:
+        # Lectura a través de la caché (proceso + compartida)
+        datos = cache_productos.producto_por_codigo(codigo)
+        if datos is None:
             return Response({'error': 'Producto no encontrado'}, status=404)
+        return respuesta_por_contenido(request, datos)
+
+
+# Resolución de varios códigos de barras en una sola consulta
+class ProductosPorCodigosView(APIView):
+    permission_classes = [IsAuthenticated]
+    throttle_scope = 'codigo'
+
+    def post(self, request):
+        lote = CodigosLoteSerializer(data=request.data)
+        lote.is_valid(raise_exception=True)
+        codigos = list(dict.fromkeys(lote.validated_data['codigos']))  # Sin repetidos, en orden
 
+        productos = Producto.objects.filter(codigo__in=codigos).select_related('categoria')
+        encontrados = {dato['codigo']: dato for dato in ProductoSerializer(productos, many=True).data}
+        return Response({
+            'productos': encontrados,
+            'no_encontrados': [codigo for codigo in codigos if codigo not in encontrados],
+        })
 
-class CategoriaListView(ListAPIView):
+
+class CategoriaListView(ListaRapidaMixin, ListAPIView):
     queryset = Categoria.objects.all()
-    serializer_class = CategoriaSerializer
\ No newline at end of file
+    serializer_class = CategoriaSerializer
+
+    @respuesta_condicional('categorias')
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+
+# Kardex de un producto a partir del resumen diario: un registro por día
+# (o por mes) con el saldo al cierre de cada periodo
+class KardexView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, producto_id):
+        producto = get_object_or_404(Producto.objects.only('id', 'nombre', 'stock'), pk=producto_id)
+        agrupacion = request.query_params.get('agrupacion', 'dia')
+        if agrupacion not in ('dia', 'mes'):
+            return Response({'error': 'agrupacion debe ser dia o mes'}, status=status.HTTP_400_BAD_REQUEST)
+        desde, hasta = rango_fechas(request.query_params)
+
+        resumenes = MovimientoDiario.objects.filter(producto=producto)
+        # El saldo al final del rango es el stock actual menos lo ocurrido después
+        saldo_final = producto.stock
+        if hasta:
+            saldo_final -= variacion_neta(resumenes.filter(dia__gte=hasta.date()))
+        if desde:
+            resumenes = resumenes.filter(dia__gte=desde.date())
+        if hasta:
+            resumenes = resumenes.filter(dia__lt=hasta.date())
+
+        periodo = TruncMonth('dia') if agrupacion == 'mes' else F('dia')
+        periodos = list(
+            resumenes.annotate(periodo=periodo).values('periodo')
+            .annotate(entradas=Sum('entradas'), salidas=Sum('salidas'), ajustes=Sum('ajustes'), movimientos=Sum('movimientos'))
+            .order_by('periodo')
+        )
+        saldo = saldo_final
+        for fila in reversed(periodos):
+            fila['saldo'] = saldo
+            saldo -= fila['entradas'] - fila['salidas'] + fila['ajustes']
+
+        return Response({
+            'producto': producto.id,
+            'nombre': producto.nombre,
+            'agrupacion': agrupacion,
+            'saldo_inicial': saldo,
+            'saldo_final': saldo_final,
+            'periodos': periodos,
+        })
+
+
+# Tablero: valoración del inventario por categoría desde la tabla mantenida
+# (una fila por categoría, sin recorrer los productos)
+class TableroView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @respuesta_condicional('productos', 'categorias')
+    def get(self, request):
+        filas = list(
+            ResumenCategoria.objects.filter(productos__gt=0).order_by('-valor', 'categoria_id')
+            .values('categoria', 'categoria__nombre', 'productos', 'unidades', 'valor', 'bajo_reorden')
+        )
+        totales = {columna: sum(fila[columna] for fila in filas) for columna in ('productos', 'unidades', 'valor', 'bajo_reorden')}
+        for fila in filas:
+            fila['categoria_nombre'] = fila.pop('categoria__nombre')
+        return Response({'totales': totales, 'categorias': filas})
+
+# Productos con stock por debajo de su punto de reorden (índice parcial producto_reorden_idx)
+class ProductoReordenView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @respuesta_condicional('productos', 'categorias')
+    def get(self, request):
+        productos = Producto.objects.filter(stock__lt=F('punto_reorden')).filter(filtros_productos(request.query_params))
+        serializer = ProductoSerializer(context={'request': request})
+        return pagina_rapida(serializer, productos, ProductoCursorPagination(), request, view=self)
+
+# Totales por producto en un periodo, calculados sobre el resumen diario
+class ResumenMovimientosView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        desde, hasta = rango_fechas(request.query_params)
+        categoria = request.query_params.get('categoria', None)
+        if categoria and not categoria.isdigit():
+            return Response({'error': 'categoria debe ser un número entero'}, status=status.HTTP_400_BAD_REQUEST)
+
+        filtros = Q()
+        if desde:
+            filtros &= Q(resumenes_diarios__dia__gte=desde.date())
+        if hasta:
+            filtros &= Q(resumenes_diarios__dia__lt=hasta.date())
+        if categoria:
+            filtros &= Q(categoria=categoria)
+
+        productos = Producto.objects.filter(filtros).annotate(
+            entradas=Sum('resumenes_diarios__entradas'),
+            salidas=Sum('resumenes_diarios__salidas'),
+            ajustes=Sum('resumenes_diarios__ajustes'),
+            movimientos=Sum('resumenes_diarios__movimientos'),
+        ).filter(movimientos__gt=0)
+        paginador = ProductoCursorPagination()
+        pagina = paginador.paginate_queryset(productos, request, view=self)
+        serializer = ResumenProductoSerializer(pagina, many=True)
+        return paginador.get_paginated_response(serializer.data)
+
+
+
+# Exportación en streaming (CSV o NDJSON); la respuesta se genera por bloques.
+# Con ?asincrono=true el archivo se genera en segundo plano (ver my_api/trabajos.py).
+class ExportacionView(APIView):
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    nombre_archivo = None
+    columnas = None
+    consulta = None  # Cada exportación define la función (params) -> queryset
+
+    def get_queryset(self, params):
+        return self.consulta(params)
+
+    def get(self, request):
+        formato = request.query_params.get('formato', 'csv')
+        if formato not in exportacion.FORMATOS:
+            return Response({'error': 'formato debe ser csv o ndjson'}, status=status.HTTP_400_BAD_REQUEST)
+        if es_asincrono(request):
+            tarea = encolar('exportar', {
+                'nombre': self.nombre_archivo, 'formato': formato, 'consulta': request.query_params.urlencode(),
+            }, usuario=request.user)
+            return respuesta_tarea(tarea)
+        filas = exportacion.generar(formato, self.get_queryset(request.query_params), self.columnas)
+        response = StreamingHttpResponse(filas, content_type=exportacion.FORMATOS[formato])
+        response['Content-Disposition'] = f'attachment; filename="{self.nombre_archivo}.{formato}"'
+        return response
+
+
+# Exporta movimientos con los mismos filtros que MovimientoBusquedaView
+class ExportarMovimientosView(ExportacionView):
+    nombre_archivo = 'movimientos'
+    columnas = exportacion.COLUMNAS_MOVIMIENTOS
+    consulta = staticmethod(lambda params: archivo.movimientos(params).filter(filtros_movimientos(params)))
+
+
+# Exporta el catálogo completo de productos
+class ExportarProductosView(ExportacionView):
+    nombre_archivo = 'productos'
+    columnas = exportacion.COLUMNAS_PRODUCTOS
+    consulta = staticmethod(lambda params: Producto.objects.all())
+
+
+
+# Importación masiva del catálogo (CSV, JSON o NDJSON)
+class ProductoImportacionView(APIView):
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    formatos = ('csv', 'json', 'ndjson')
+
+    def post(self, request):
+        archivo = request.FILES.get('archivo')
+        if archivo is not None:
+            formato = request.data.get('formato') or archivo.name.rsplit('.', 1)[-1].lower()
+            if formato not in self.formatos:
+                return Response({'error': 'formato debe ser csv, json o ndjson'}, status=status.HTTP_400_BAD_REQUEST)
+            if es_asincrono(request):
+                # El trabajador lee el archivo desde el almacenamiento de tareas
+                nombre = almacenamiento().save(f'importaciones/productos.{formato}', archivo)
+                return respuesta_tarea(encolar('importar_productos', {'archivo': nombre, 'formato': formato}, usuario=request.user))
+            try:
+                filas = leer_filas(archivo.file, formato)
+            except ArchivoInvalido as error:
+                return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        elif isinstance(request.data, list):
+            if es_asincrono(request):
+                return respuesta_tarea(encolar('importar_productos', {'filas': request.data}, usuario=request.user))
+            filas = request.data
+        else:
+            return Response({'error': 'Envíe un archivo o una lista de productos'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            resumen = importar_productos(filas)
+        except ArchivoInvalido as error:
+            # CSV malformado a mitad del archivo
+            return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(resumen, status=status.HTTP_200_OK)
+
+
+# Sincronización incremental para clientes sin conexión: devuelve las
+# categorías y productos creados o modificados, y los eliminados, desde el
+# cursor recibido. Sin cursor se entrega el catálogo completo por lotes.
+class SincronizacionView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            limite = int(request.query_params.get('limite', sincronizacion.configuracion('LIMITE')))
+        except ValueError:
+            return Response({'error': 'limite debe ser un número entero'}, status=status.HTTP_400_BAD_REQUEST)
+        limite = max(1, min(limite, sincronizacion.configuracion('LIMITE_MAXIMO')))
+
+        try:
+            cambios, cursor, hay_mas = sincronizacion.cambios_desde(request.query_params.get('cursor'), limite)
+        except sincronizacion.CursorInvalido:
+            return Response({'error': 'Cursor inválido'}, status=status.HTTP_400_BAD_REQUEST)
+        except sincronizacion.CursorExpirado:
+            # Los registros de borrado ya se purgaron: el cliente debe sincronizar desde cero
+            return Response({'error': 'Cursor expirado, sincronice sin cursor'}, status=status.HTTP_410_GONE)
+
+        return Response({
+            'categorias': CategoriaSerializer(cambios['categorias'], many=True).data,
+            'productos': ProductoSerializer(cambios['productos'], many=True).data,
+            'eliminados': [{'modelo': fila.modelo, 'id': fila.objeto_id} for fila in cambios['eliminados']],
+            'cursor': cursor,
+            'mas': hay_mas,
+        })
+
+
+# Métricas del proceso en formato Prometheus. Se protege con un token propio
+# (METRICAS['TOKEN']) para que el recolector no necesite un JWT; sin token
+# configurado solo se expone en modo DEBUG.
+class MetricasView(View):
+    def get(self, request):
+        token = metricas.configuracion('TOKEN')
+        if token is None:
+            if not settings.DEBUG:
+                return HttpResponse(status=status.HTTP_404_NOT_FOUND)
+        elif request.META.get('HTTP_AUTHORIZATION') != f'Bearer {token}':
+            return HttpResponse(status=status.HTTP_401_UNAUTHORIZED)
+
+        cache = cache_productos.estadisticas()
+        extra = [
+            ('inventario_cache_productos_total', {'nivel': nivel}, cache[nivel])
+            for nivel in ('local', 'compartida', 'fallos')
+        ]
+        return HttpResponse(metricas.exportar(extra), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,112 @@
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.views import View
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotAuthenticated, Throttled
+
+from usuarios.authentication import CachedJWTAuthentication
+from . import archivo
+from . import facetas
+from . import limites
+from .cache_productos import aproducto_por_codigo
+from .condicional import con_validadores, etag_contenido, validadores
+from .filtros import filtros_movimientos, filtros_productos
+from .models import Categoria, Producto
+from .pagination import (
+    MovimientoCursorPagination, PaginacionAsincrona, ProductoCursorPagination, ProductoRangoCursorPagination,
+)
+from .renderers import ORJSONRenderer
+from .search import buscar_productos
+from .serializers import CategoriaSerializer, MovimientoSerializer, ProductoSerializer
+
+
+# Variantes asíncronas (ASGI) de los endpoints de lectura más usados. Devuelven
+# el mismo JSON que las vistas de DRF; las consultas usan el ORM asíncrono, así
+# una consulta lenta no ocupa un hilo del servidor mientras espera.
+def respuesta_json(datos, status=status.HTTP_200_OK):
+    return HttpResponse(ORJSONRenderer().render(datos), status=status, content_type='application/json')
+
+
+# Vista asíncrona autenticada con JWT; los errores de DRF (validación,
+# autenticación, cursor inválido) se devuelven con su código y detalle
+class VistaAsincrona(View):
+    http_method_names = ['get', 'head', 'options']
+    autenticacion = CachedJWTAuthentication
+
+    async def dispatch(self, request, *args, **kwargs):
+        autenticador = self.autenticacion()
+        try:
+            resultado = await autenticador.aauthenticate(request)
+            if resultado is None:
+                raise NotAuthenticated()
+            request.user, request.auth = resultado
+            await limites.acomprobar(request, self)
+            return await super().dispatch(request, *args, **kwargs)
+        except APIException as exc:
+            response = respuesta_json(
+                exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail},
+                status=exc.status_code,
+            )
+            if exc.status_code == status.HTTP_401_UNAUTHORIZED:
+                response['WWW-Authenticate'] = autenticador.authenticate_header(request)
+            if isinstance(exc, Throttled) and exc.wait is not None:
+                response['Retry-After'] = str(exc.wait)
+            return response
+
+
+# Página de resultados por el camino rápido (values() + representar_filas), con
+# las mismas claves que las páginas por cursor de las vistas síncronas
+async def pagina_asincrona(serializer, queryset, paginacion, request, extra=None):
+    paginador = PaginacionAsincrona(paginacion)
+    filas, siguiente = await paginador.paginar(
+        serializer.valores(queryset, extra=[campo.lstrip('-') for campo in paginador.ordering]), request,
+    )
+    return respuesta_json({'next': siguiente, 'previous': None, 'results': serializer.representar_filas(filas), **(extra or {})})
+
+
+class ProductoBusquedaAsincronaView(VistaAsincrona):
+    async def get(self, request):
+        nombre = request.GET.get('nombre', None)
+        productos = Producto.objects.filter(filtros_productos(request.GET))
+        paginacion = ProductoCursorPagination
+        if nombre:
+            productos = buscar_productos(productos, nombre)
+            paginacion = ProductoRangoCursorPagination
+        extra = None
+        if facetas.pedidas(request.GET):
+            extra = {'facetas': await sync_to_async(facetas.facetas)(productos, request.GET)}
+        serializer = ProductoSerializer(context={'request': request})
+        return await pagina_asincrona(serializer, productos, paginacion, request, extra)
+
+
+class MovimientoBusquedaAsincronaView(VistaAsincrona):
+    async def get(self, request):
+        # Decidir si se incluye el archivo puede consultar el último corte
+        modelo = await sync_to_async(archivo.movimientos)(request.GET)
+        movimientos = modelo.filter(filtros_movimientos(request.GET))
+        serializer = MovimientoSerializer(context={'request': request})
+        return await pagina_asincrona(serializer, movimientos, MovimientoCursorPagination, request)
+
+
+class ProductoPorCodigoAsincronaView(VistaAsincrona):
+    throttle_scope = 'codigo'
+
+    async def get(self, request, codigo):
+        datos = await aproducto_por_codigo(codigo)
+        if datos is None:
+            return respuesta_json({'error': 'Producto no encontrado'}, status=status.HTTP_404_NOT_FOUND)
+        etag = etag_contenido(datos)
+        response = get_conditional_response(request, etag=etag) or respuesta_json(datos)
+        return con_validadores(response, etag)
+
+
+class CategoriaListAsincronaView(VistaAsincrona):
+    async def get(self, request):
+        etag = validadores(('categorias',), request.get_full_path())
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            serializer = CategoriaSerializer(context={'request': request})
+            filas = [fila async for fila in serializer.valores(Categoria.objects.order_by('id'))]
+            response = respuesta_json(serializer.representar_filas(filas))
+        return con_validadores(response, etag)
@@ -0,0 +1,9 @@
+from django.contrib import admin
+from .models import Tarea
+
+
+@admin.register(Tarea)
+class TareaAdmin(admin.ModelAdmin):
+    list_display = ('id', 'tipo', 'estado', 'progreso', 'intentos', 'usuario', 'fecha_creacion', 'fecha_fin')
+    list_filter = ('estado', 'tipo')
+    readonly_fields = ('resultado', 'error', 'detalle', 'trabajador', 'latido', 'fecha_inicio', 'fecha_fin')
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from tareas.trabajador import purgar
+
+
+class Command(BaseCommand):
+    help = 'Borra las tareas terminadas más antiguas que la retención y sus archivos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=None, help='Días a conservar (por defecto TAREAS["RETENCION_DIAS"])')
+
+    def handle(self, *args, **options):
+        total = purgar(options['dias'])
+        self.stdout.write(self.style.SUCCESS(f'{total} tareas borradas'))
@@ -0,0 +1,67 @@
+import multiprocessing
+import signal
+import time
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from tareas import trabajador
+from tareas.registro import configuracion
+
+
+# Cuerpo de cada proceso hijo: consulta la cola hasta que el proceso principal
+# pida detener (o termine). La tarea en curso termina antes de salir.
+def _proceso(detener, intervalo):
+    django.setup()  # Necesario con el método 'spawn' (sin fork)
+    # Las señales las atiende el proceso principal
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    principal = multiprocessing.parent_process()
+    nombre = trabajador.nombre_trabajador()
+    while not detener.is_set() and principal.is_alive():
+        close_old_connections()
+        if not trabajador.ejecutar_pendientes(nombre, detener):
+            detener.wait(intervalo)
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta las tareas en segundo plano con un grupo de procesos locales'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--procesos', type=int, default=None, help='Por defecto TAREAS["PROCESOS"]')
+        parser.add_argument('--intervalo', type=float, default=None, help='Segundos entre consultas con la cola vacía')
+        parser.add_argument('--una-vez', action='store_true', help='Ejecuta las tareas pendientes en este proceso y termina')
+
+    def handle(self, *args, **options):
+        if options['una_vez']:
+            total = trabajador.ejecutar_pendientes()
+            self.stdout.write(self.style.SUCCESS(f'{total} tareas ejecutadas'))
+            return
+
+        procesos = options['procesos'] or configuracion('PROCESOS')
+        intervalo = options['intervalo'] or configuracion('INTERVALO')
+        detener = multiprocessing.Event()
+        # El manejador solo marca la parada: Event.set() dentro de una señal
+        # se bloquea si el hilo principal está esperando el mismo evento
+        self.parar = False
+        for senal in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(senal, lambda *args: setattr(self, 'parar', True))
+
+        # Los hijos no deben heredar las conexiones abiertas del proceso principal
+        connections.close_all()
+        grupo = [None] * procesos
+        self.stdout.write(f'Trabajador iniciado con {procesos} procesos')
+        while not self.parar:
+            # Reinicia los procesos que terminaron de forma inesperada
+            for indice, proceso in enumerate(grupo):
+                if proceso is None or not proceso.is_alive():
+                    if proceso is not None:
+                        self.stderr.write(f'El proceso {proceso.pid} terminó con código {proceso.exitcode}; se reinicia')
+                    grupo[indice] = multiprocessing.Process(target=_proceso, args=(detener, intervalo), daemon=False)
+                    grupo[indice].start()
+            time.sleep(1)
+        detener.set()
+        for proceso in grupo:
+            proceso.join()
+        self.stdout.write('Trabajador detenido')
@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.db import models
+
+
+# Operación larga ejecutada por el trabajador (comando trabajador_tareas)
+class Tarea(models.Model):
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('en_curso', 'En curso'),
+        ('completada', 'Completada'),
+        ('fallida', 'Fallida'),
+        ('cancelada', 'Cancelada'),
+    ]
+    FINALES = ('completada', 'fallida', 'cancelada')
+
+    tipo = models.CharField(max_length=50)  # Nombre registrado con @tarea
+    parametros = models.JSONField(default=dict)
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendiente')
+    progreso = models.PositiveSmallIntegerField(null=True, blank=True)  # Porcentaje, si se conoce
+    detalle = models.JSONField(default=dict, blank=True)  # Avance informado por la tarea
+    resultado = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    intentos = models.PositiveSmallIntegerField(default=0)
+    max_intentos = models.PositiveSmallIntegerField(default=3)
+    cancelacion_solicitada = models.BooleanField(default=False)
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    trabajador = models.CharField(max_length=100, blank=True)  # Proceso que la ejecuta
+    ejecutar_desde = models.DateTimeField()  # Los reintentos esperan hasta esta fecha
+    latido = models.DateTimeField(null=True, blank=True)  # Última señal del trabajador
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_inicio = models.DateTimeField(null=True, blank=True)
+    fecha_fin = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'tareas'
+        indexes = [
+            models.Index(fields=['estado', 'ejecutar_desde', 'id'], name='tarea_cola_idx'),
+            models.Index(fields=['usuario', 'id'], name='tarea_usuario_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo} #{self.pk} ({self.estado})"
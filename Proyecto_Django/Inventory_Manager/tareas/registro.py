@@ -0,0 +1,86 @@
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.utils import timezone
+
+from .models import Tarea
+
+
+# Configuración por defecto; puede sobrescribirse con TAREAS en settings
+CONFIGURACION = {
+    'PROCESOS': 2,  # Procesos del trabajador
+    'INTERVALO': 1.0,  # Segundos entre consultas a la cola cuando está vacía
+    'MAX_INTENTOS': 3,
+    'REINTENTO_SEGUNDOS': 30,  # Espera antes del primer reintento; se duplica en cada uno
+    'LATIDO_SEGUNDOS': 30,  # Frecuencia con que el trabajador marca sus tareas en curso
+    'ABANDONO_SEGUNDOS': 300,  # Una tarea en curso sin latido por este tiempo se reintenta
+    'DIRECTORIO': settings.BASE_DIR / 'tareas_archivos',  # Archivos recibidos y generados
+    'RETENCION_DIAS': 7,  # Antigüedad de las tareas terminadas que se borran
+}
+
+
+def configuracion(clave):
+    return getattr(settings, 'TAREAS', {}).get(clave, CONFIGURACION[clave])
+
+
+# Archivos de entrada y salida de las tareas (compartidos con el trabajador)
+def almacenamiento():
+    return FileSystemStorage(location=configuracion('DIRECTORIO'))
+
+
+# Tareas registradas: tipo -> función(contexto, **parametros). Las públicas
+# pueden encolarse directamente con POST /api/tareas/ (solo administradores).
+# `max_intentos` fija los intentos de un tipo que no puede repetirse sin
+# efectos (por ejemplo, si un reintento duplicaría lo ya escrito).
+TAREAS = {}
+PUBLICAS = set()
+INTENTOS = {}
+
+
+def tarea(tipo, publica=False, max_intentos=None):
+    def registrar(funcion):
+        TAREAS[tipo] = funcion
+        if publica:
+            PUBLICAS.add(tipo)
+        if max_intentos:
+            INTENTOS[tipo] = max_intentos
+        return funcion
+    return registrar
+
+
+class TareaCancelada(Exception):
+    pass
+
+
+# Pone una tarea en la cola y la devuelve; el trabajador la toma en su próxima consulta
+def encolar(tipo, parametros=None, usuario=None, max_intentos=None):
+    if tipo not in TAREAS:
+        raise ValueError(f'Tarea desconocida: {tipo}')
+    return Tarea.objects.create(
+        tipo=tipo,
+        parametros=parametros or {},
+        usuario=usuario,
+        max_intentos=max_intentos or INTENTOS.get(tipo) or configuracion('MAX_INTENTOS'),
+        ejecutar_desde=timezone.now(),
+    )
+
+
+# Cancela una tarea pendiente de inmediato; una en curso se detiene en su
+# siguiente llamada a contexto.progreso(). Devuelve False si ya terminó.
+def cancelar(tarea):
+    ahora = timezone.now()
+    if Tarea.objects.filter(pk=tarea.pk, estado='pendiente').update(estado='cancelada', fecha_fin=ahora):
+        return True
+    return bool(Tarea.objects.filter(pk=tarea.pk, estado='en_curso').update(cancelacion_solicitada=True))
+
+
+# Lo que recibe la función de una tarea para informar su avance
+class Contexto:
+    def __init__(self, tarea):
+        self.tarea = tarea
+
+    # Guarda el avance y detiene la tarea si se pidió su cancelación
+    def progreso(self, porcentaje=None, **detalle):
+        ahora = timezone.now()
+        Tarea.objects.filter(pk=self.tarea.pk).update(progreso=porcentaje, detalle=detalle, latido=ahora)
+        if Tarea.objects.filter(pk=self.tarea.pk, cancelacion_solicitada=True).exists():
+            raise TareaCancelada()
@@ -0,0 +1,25 @@
+from rest_framework import serializers
+
+from .models import Tarea
+from .registro import PUBLICAS
+
+
+class TareaSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Tarea
+        fields = [
+            'id', 'tipo', 'estado', 'progreso', 'detalle', 'resultado', 'error', 'intentos', 'max_intentos',
+            'cancelacion_solicitada', 'fecha_creacion', 'fecha_inicio', 'fecha_fin',
+        ]
+        read_only_fields = fields
+
+
+# Tarea encolada directamente por un administrador
+class NuevaTareaSerializer(serializers.Serializer):
+    tipo = serializers.CharField(max_length=50)
+    parametros = serializers.DictField(required=False, default=dict)
+
+    def validate_tipo(self, valor):
+        if valor not in PUBLICAS:
+            raise serializers.ValidationError(f"Tipos disponibles: {', '.join(sorted(PUBLICAS))}")
+        return valor
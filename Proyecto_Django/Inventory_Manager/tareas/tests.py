@@ -0,0 +1,126 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from my_api.models import Producto
+from usuarios.models import Usuario
+from . import trabajador
+from .models import Tarea
+from .registro import encolar, tarea
+
+
+# Tareas usadas solo por las pruebas
+@tarea('prueba_falla')
+def prueba_falla(contexto):
+    raise RuntimeError('error de prueba')
+
+
+@tarea('prueba_cancelable')
+def prueba_cancelable(contexto):
+    Tarea.objects.filter(pk=contexto.tarea.pk).update(cancelacion_solicitada=True)
+    contexto.progreso(50)
+    return 'no debería terminar'
+
+
+class TareasTests(TestCase):
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio)
+        ajustes = override_settings(TAREAS={'DIRECTORIO': self.directorio, 'REINTENTO_SEGUNDOS': 0})
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.client = APIClient()
+        self.usuario = Usuario.objects.create_user(email='admin@test.com', password='clave123', nombre='Admin', apellido='Test', is_staff=True)
+        self.client.force_authenticate(user=self.usuario)
+
+    def test_importacion_asincrona(self):
+        archivo = SimpleUploadedFile('productos.csv', 'codigo,nombre,precio,stock\nA1,Leche,3.50,4\n'.encode())
+        response = self.client.post('/api/productos/importar/?asincrono=true', {'archivo': archivo}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['estado'], 'pendiente')
+        self.assertFalse(Producto.objects.exists())
+
+        self.assertEqual(trabajador.ejecutar_pendientes(), 1)
+        response = self.client.get(response['Location'])
+        self.assertEqual(response.data['estado'], 'completada')
+        self.assertEqual(response.data['progreso'], 100)
+        self.assertEqual(response.data['resultado']['creados'], 1)
+        self.assertEqual(Producto.objects.get(codigo='A1').stock, 4)
+
+    def test_exportacion_asincrona_y_descarga(self):
+        Producto.objects.create(nombre='Agua', descripcion='Desc', precio=1, stock=5, codigo='111')
+        response = self.client.get('/api/exportar/productos/', {'asincrono': 'true'})
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        call_command('trabajador_tareas', una_vez=True, stdout=StringIO())
+
+        response = self.client.get(f"/api/tareas/{response.data['id']}/descarga/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lineas = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lineas), 2)
+        self.assertIn('Agua', lineas[1])
+
+    def test_reintentos_y_fallo(self):
+        pendiente = encolar('prueba_falla', max_intentos=2)
+        with self.assertLogs('tareas.trabajador', level='ERROR'):
+            trabajador.ejecutar_pendientes()
+        pendiente.refresh_from_db()
+        self.assertEqual(pendiente.estado, 'fallida')
+        self.assertEqual(pendiente.intentos, 2)
+        self.assertIn('error de prueba', pendiente.error)
+
+    def test_importacion_fallida_no_se_reintenta(self):
+        filas = [{'nombre': 'Leche', 'precio': '3.50'}]
+        pendiente = self.client.post('/api/productos/importar/?asincrono=true', filas, format='json').data
+        self.assertEqual(Tarea.objects.get(pk=pendiente['id']).max_intentos, 1)
+        with mock.patch('my_api.trabajos.importar_productos', side_effect=RuntimeError('caída')), \
+                self.assertLogs('tareas.trabajador', level='ERROR'):
+            trabajador.ejecutar_pendientes()
+        fallida = Tarea.objects.get(pk=pendiente['id'])
+        self.assertEqual((fallida.estado, fallida.intentos), ('fallida', 1))
+
+    def test_cancelacion(self):
+        pendiente = encolar('reconstruir_resumen', usuario=self.usuario)
+        response = self.client.post(f'/api/tareas/{pendiente.id}/cancelar/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['estado'], 'cancelada')
+        self.assertEqual(trabajador.ejecutar_pendientes(), 0)
+        self.assertEqual(self.client.post(f'/api/tareas/{pendiente.id}/cancelar/').status_code, status.HTTP_409_CONFLICT)
+
+        # Una tarea en curso se detiene en su siguiente informe de progreso
+        en_curso = encolar('prueba_cancelable')
+        trabajador.ejecutar_pendientes()
+        en_curso.refresh_from_db()
+        self.assertEqual(en_curso.estado, 'cancelada')
+        self.assertIsNone(en_curso.resultado)
+
+    def test_recupera_tareas_abandonadas(self):
+        abandonada = encolar('reconstruir_resumen')
+        Tarea.objects.filter(pk=abandonada.pk).update(
+            estado='en_curso', intentos=1, trabajador='otro:1', latido=timezone.now() - timedelta(hours=1),
+        )
+        with self.assertLogs('tareas.trabajador', level='WARNING'):
+            self.assertEqual(trabajador.ejecutar_pendientes(), 1)
+        abandonada.refresh_from_db()
+        self.assertEqual(abandonada.estado, 'completada')
+        self.assertEqual(abandonada.intentos, 2)
+
+    def test_encolar_desde_la_api(self):
+        response = self.client.post('/api/tareas/', {'tipo': 'prueba_falla'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post('/api/tareas/', {'tipo': 'reconstruir_resumen'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+        otro = Usuario.objects.create_user(email='otro@test.com', password='clave123', nombre='Otro', apellido='Test')
+        self.client.force_authenticate(user=otro)
+        self.assertEqual(self.client.get(f"/api/tareas/{response.data['id']}/").status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get('/api/tareas/').data['results'], [])
+        self.assertEqual(self.client.post('/api/tareas/', {'tipo': 'reconstruir_resumen'}, format='json').status_code, status.HTTP_403_FORBIDDEN)
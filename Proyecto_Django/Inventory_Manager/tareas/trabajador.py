@@ -0,0 +1,116 @@
+import logging
+import os
+import socket
+import threading
+import traceback
+from datetime import timedelta
+
+from django.db import connection
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Tarea
+from .registro import TAREAS, Contexto, TareaCancelada, almacenamiento, configuracion
+
+logger = logging.getLogger(__name__)
+
+
+def nombre_trabajador():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+# Toma la primera tarea disponible. La actualización condicionada por estado
+# garantiza que dos procesos no tomen la misma (sin SELECT ... FOR UPDATE).
+def tomar(nombre):
+    ahora = timezone.now()
+    candidatas = list(
+        Tarea.objects.filter(estado='pendiente', ejecutar_desde__lte=ahora)
+        .order_by('id').values_list('id', flat=True)[:10]
+    )
+    for pk in candidatas:
+        tomada = Tarea.objects.filter(pk=pk, estado='pendiente').update(
+            estado='en_curso', trabajador=nombre, intentos=F('intentos') + 1,
+            fecha_inicio=ahora, latido=ahora, progreso=None, cancelacion_solicitada=False,
+        )
+        if tomada:
+            return Tarea.objects.get(pk=pk)
+    return None
+
+
+# Termina la tarea solo si sigue en curso en este trabajador (no fue recuperada por otro)
+def _terminar(tarea, **campos):
+    return Tarea.objects.filter(pk=tarea.pk, estado='en_curso', trabajador=tarea.trabajador).update(**campos)
+
+
+# Vuelve a la cola con espera exponencial, o queda fallida al agotar los intentos
+def _fallo(tarea, error):
+    ahora = timezone.now()
+    if tarea.intentos < tarea.max_intentos:
+        espera = configuracion('REINTENTO_SEGUNDOS') * 2 ** (tarea.intentos - 1)
+        return _terminar(tarea, estado='pendiente', error=error, ejecutar_desde=ahora + timedelta(seconds=espera))
+    return _terminar(tarea, estado='fallida', error=error, fecha_fin=ahora)
+
+
+# Marca periódicamente la tarea mientras se ejecuta, en un hilo con su propia conexión
+def _latir(pk, detener):
+    try:
+        while not detener.wait(configuracion('LATIDO_SEGUNDOS')):
+            Tarea.objects.filter(pk=pk, estado='en_curso').update(latido=timezone.now())
+    finally:
+        connection.close()
+
+
+def ejecutar(tarea):
+    detener = threading.Event()
+    latido = threading.Thread(target=_latir, args=(tarea.pk, detener), daemon=True)
+    latido.start()
+    try:
+        funcion = TAREAS.get(tarea.tipo)
+        if funcion is None:
+            raise LookupError(f'Tarea desconocida: {tarea.tipo}')
+        resultado = funcion(Contexto(tarea), **tarea.parametros)
+    except TareaCancelada:
+        _terminar(tarea, estado='cancelada', fecha_fin=timezone.now())
+    except Exception:
+        logger.exception('La tarea %s #%s falló (intento %s de %s)', tarea.tipo, tarea.pk, tarea.intentos, tarea.max_intentos)
+        _fallo(tarea, traceback.format_exc())
+    else:
+        _terminar(tarea, estado='completada', resultado=resultado, progreso=100, error='', fecha_fin=timezone.now())
+    finally:
+        detener.set()
+        latido.join()
+
+
+# Tareas en curso de un proceso que dejó de responder: cuentan como un intento fallido
+def recuperar_abandonadas():
+    limite = timezone.now() - timedelta(seconds=configuracion('ABANDONO_SEGUNDOS'))
+    for tarea in Tarea.objects.filter(estado='en_curso', latido__lt=limite):
+        logger.warning('Tarea %s #%s abandonada por %s', tarea.tipo, tarea.pk, tarea.trabajador)
+        _fallo(tarea, f'El trabajador {tarea.trabajador} dejó de responder')
+
+
+# Ejecuta tareas hasta vaciar la cola (o hasta que se pida detener). Devuelve cuántas ejecutó.
+def ejecutar_pendientes(nombre=None, detener=None):
+    nombre = nombre or nombre_trabajador()
+    recuperar_abandonadas()
+    total = 0
+    while detener is None or not detener.is_set():
+        tarea = tomar(nombre)
+        if tarea is None:
+            break
+        ejecutar(tarea)
+        total += 1
+    return total
+
+
+# Borra las tareas terminadas más antiguas que la retención y sus archivos
+def purgar(dias=None):
+    limite = timezone.now() - timedelta(days=dias or configuracion('RETENCION_DIAS'))
+    antiguas = Tarea.objects.filter(estado__in=Tarea.FINALES, fecha_fin__lt=limite)
+    archivos = almacenamiento()
+    for parametros, resultado in antiguas.values_list('parametros', 'resultado').iterator():
+        for datos in (parametros, resultado):
+            if isinstance(datos, dict) and datos.get('archivo') and archivos.exists(datos['archivo']):
+                archivos.delete(datos['archivo'])
+    borradas, _ = antiguas.delete()
+    return borradas
@@ -0,0 +1,87 @@
+from django.http import FileResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.generics import ListAPIView
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from my_api.pagination import InventarioCursorPagination
+from .models import Tarea
+from .registro import almacenamiento, cancelar, encolar
+from .serializers import NuevaTareaSerializer, TareaSerializer
+
+
+# Respuesta de una operación aceptada: 202 con la tarea y su URL de estado
+def respuesta_tarea(tarea):
+    return Response(
+        TareaSerializer(tarea).data,
+        status=status.HTTP_202_ACCEPTED,
+        headers={'Location': reverse('tarea_detalle', args=[tarea.pk])},
+    )
+
+
+# Cada usuario ve sus tareas; los administradores, todas
+def tareas_visibles(usuario):
+    tareas = Tarea.objects.all()
+    return tareas if usuario.is_staff else tareas.filter(usuario=usuario)
+
+
+class TareaCursorPagination(InventarioCursorPagination):
+    ordering = ('-id',)
+
+
+# Listar tareas y encolar tareas de mantenimiento
+class TareaListCreateView(ListAPIView):
+    serializer_class = TareaSerializer
+    pagination_class = TareaCursorPagination
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        tareas = tareas_visibles(self.request.user)
+        estado = self.request.query_params.get('estado')
+        return tareas.filter(estado=estado) if estado else tareas
+
+    def post(self, request):
+        if not request.user.is_staff:
+            return Response({'error': 'Solo los administradores pueden encolar tareas'}, status=status.HTTP_403_FORBIDDEN)
+        datos = NuevaTareaSerializer(data=request.data)
+        datos.is_valid(raise_exception=True)
+        tarea = encolar(datos.validated_data['tipo'], datos.validated_data['parametros'], usuario=request.user)
+        return respuesta_tarea(tarea)
+
+
+# Estado y progreso de una tarea
+class TareaDetailView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        tarea = get_object_or_404(tareas_visibles(request.user), pk=pk)
+        return Response(TareaSerializer(tarea).data)
+
+
+# Cancela una tarea pendiente, o pide detener una en curso
+class TareaCancelarView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        tarea = get_object_or_404(tareas_visibles(request.user), pk=pk)
+        if not cancelar(tarea):
+            return Response({'error': 'La tarea ya terminó'}, status=status.HTTP_409_CONFLICT)
+        tarea.refresh_from_db()
+        codigo = status.HTTP_200_OK if tarea.estado == 'cancelada' else status.HTTP_202_ACCEPTED
+        return Response(TareaSerializer(tarea).data, status=codigo)
+
+
+# Descarga del archivo generado por una tarea completada (exportaciones)
+class TareaDescargaView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        tarea = get_object_or_404(tareas_visibles(request.user), pk=pk)
+        nombre = (tarea.resultado or {}).get('archivo') if tarea.estado == 'completada' else None
+        archivos = almacenamiento()
+        if not nombre or not archivos.exists(nombre):
+            return Response({'error': 'La tarea no tiene un archivo disponible'}, status=status.HTTP_404_NOT_FOUND)
+        return FileResponse(archivos.open(nombre, 'rb'), as_attachment=True, filename=nombre.rsplit('/', 1)[-1])
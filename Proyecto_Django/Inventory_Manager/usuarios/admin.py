@@ -1,5 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from my_api.pagination import PaginadorEstimado
 from .models import Usuario
 
 class UsuarioAdmin(UserAdmin):
@@ -10,7 +11,7 @@ class UsuarioAdmin(UserAdmin):
         (None, {'fields': ('email', 'password')}),
         ('Información personal', {'fields': ('nombre', 'apellido')}),
         ('Permisos', {'fields': ('is_staff', 'is_active', 'is_superuser', 'groups', 'user_permissions')}),
-        ('Fechas importantes', {'fields': ('last_login', 'date_joined')}),
+        ('Fechas importantes', {'fields': ('last_login',)}),
     )
     add_fieldsets = (
         (None, {
@@ -20,5 +21,7 @@ class UsuarioAdmin(UserAdmin):
     )
     search_fields = ('email',)
     ordering = ('email',)
+    paginator = PaginadorEstimado
+    show_full_result_count = False
 
 admin.site.register(Usuario, UsuarioAdmin)
\ No newline at end of file
@@ -0,0 +1,115 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+# Segundos que un usuario permanece en la caché; acota el retraso de cambios
+# hechos sin pasar por save() (por ejemplo queryset.update())
+TTL_POR_DEFECTO = 60
+
+
+def ttl():
+    return getattr(settings, 'CACHE_USUARIOS', {}).get('TTL', TTL_POR_DEFECTO)
+
+
+def clave_usuario(pk):
+    return f'usuario:{pk}'
+
+
+# Campos del usuario que se guardan en la caché compartida. Nunca el hash de
+# la contraseña: para detectar tokens revocados basta su md5, el mismo valor
+# que ya lleva el token.
+CAMPOS = ('email', 'is_active', 'is_staff', 'is_superuser')
+
+
+def _datos(user):
+    datos = {'pk': user.pk, **{campo: getattr(user, campo) for campo in CAMPOS}}
+    if api_settings.CHECK_REVOKE_TOKEN:
+        datos['revocacion'] = get_md5_hash_password(user.password)
+    return datos
+
+
+# Usuario sin consultar la base a partir de los campos guardados
+def _usuario(datos):
+    datos = dict(datos)
+    datos.pop('revocacion', None)
+    user = get_user_model()(**datos)
+    user._state.adding = False
+    user._state.db = DEFAULT_DB_ALIAS
+    return user
+
+
+# Invalida el usuario en la caché. Se repite al confirmar la transacción para
+# que una petición concurrente no vuelva a guardar la versión anterior.
+def invalidar_usuario(pk):
+    cache.delete(clave_usuario(pk))
+    transaction.on_commit(lambda: cache.delete(clave_usuario(pk)))
+
+
+# JWTAuthentication que resuelve el usuario desde la caché compartida en lugar
+# de consultar la tabla de usuarios en cada petición. Las comprobaciones
+# (usuario activo, token revocado por cambio de contraseña) son las mismas.
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_('Token contained no recognizable user identification')) from e
+
+        clave = clave_usuario(user_id)
+        datos = cache.get(clave)
+        if datos is None:
+            try:
+                user = get_user_model().objects.using(DEFAULT_DB_ALIAS).get(**{api_settings.USER_ID_FIELD: user_id})
+            except get_user_model().DoesNotExist as e:
+                raise AuthenticationFailed(_('User not found'), code='user_not_found') from e
+            datos = _datos(user)
+            cache.set(clave, datos, ttl())
+        return self.comprobar_usuario(datos, validated_token)
+
+    # Variante asíncrona para las vistas ASGI. Devuelve (usuario, token) o
+    # None si la petición no trae credenciales, igual que authenticate().
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_('Token contained no recognizable user identification')) from e
+
+        clave = clave_usuario(user_id)
+        datos = await cache.aget(clave)
+        if datos is None:
+            try:
+                user = await get_user_model().objects.using(DEFAULT_DB_ALIAS).aget(**{api_settings.USER_ID_FIELD: user_id})
+            except get_user_model().DoesNotExist as e:
+                raise AuthenticationFailed(_('User not found'), code='user_not_found') from e
+            datos = _datos(user)
+            await cache.aset(clave, datos, ttl())
+        return self.comprobar_usuario(datos, validated_token)
+
+    # Mismas comprobaciones que JWTAuthentication.get_user, sobre los campos
+    # guardados; devuelve el usuario
+    def comprobar_usuario(self, datos, validated_token):
+        if api_settings.CHECK_USER_IS_ACTIVE and not datos['is_active']:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != datos.get('revocacion'):
+                raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+
+        return _usuario(datos)
@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+
+class Command(BaseCommand):
+    help = 'Borra por bloques los tokens de refresco vencidos y sus entradas en la lista negra'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bloque', type=int, default=5000, help='Tokens borrados por transacción')
+        parser.add_argument('--dias', type=int, default=0, help='Conserva los tokens vencidos hace menos de estos días')
+
+    def handle(self, *args, **options):
+        limite = timezone.now() - timedelta(days=options['dias'])
+        vencidos = OutstandingToken.objects.filter(expires_at__lte=limite).order_by('id')
+        total = 0
+        while True:
+            ids = list(vencidos.values_list('id', flat=True)[:options['bloque']])
+            if not ids:
+                break
+            # Primero la lista negra: así el borrado de los tokens no tiene que
+            # recorrer relaciones en cascada
+            with transaction.atomic():
+                BlacklistedToken.objects.filter(token_id__in=ids).delete()
+                OutstandingToken.objects.filter(id__in=ids).delete()
+            total += len(ids)
+        self.stdout.write(self.style.SUCCESS(f'{total} tokens vencidos borrados'))
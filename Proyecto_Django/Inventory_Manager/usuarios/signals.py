@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import invalidar_usuario
+from .models import Usuario
+
+
+# Cambios de is_active, is_staff, contraseña, etc. se reflejan en la siguiente petición
+@receiver(post_save, sender=Usuario)
+@receiver(post_delete, sender=Usuario)
+def invalidar_cache_usuario(sender, instance, **kwargs):
+    invalidar_usuario(instance.pk)
@@ -1,3 +1,80 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from .models import Usuario
+
+
+class AutenticacionCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.usuario = Usuario.objects.create_user(email='admin@test.com', password='clave123', nombre='Admin', apellido='Test', is_staff=True)
+        self.client = APIClient()
+        response = self.client.post('/api/token/', {'email': 'admin@test.com', 'password': 'clave123'}, format='json')
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+
+    def test_usuario_se_resuelve_desde_la_cache(self):
+        self.assertEqual(self.client.get('/api/categorias/').status_code, status.HTTP_200_OK)
+        # Solo la consulta de categorías: el usuario ya está en caché
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/categorias/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_desactivar_usuario_invalida_la_cache(self):
+        self.client.get('/api/categorias/')
+        self.usuario.is_active = False
+        self.usuario.save()
+        self.assertEqual(self.client.get('/api/categorias/').status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_quitar_is_staff_se_aplica_de_inmediato(self):
+        datos = {'producto': 1, 'tipo': 'entrada', 'cantidad': 1}
+        self.client.get('/api/categorias/')
+        self.usuario.is_staff = False
+        self.usuario.save()
+        response = self.client.post('/api/movimientos/lote/', {'movimientos': [datos]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_la_cache_no_guarda_la_contrasena(self):
+        self.client.get('/api/categorias/')
+        datos = cache.get(f'usuario:{self.usuario.pk}')
+        self.assertEqual(datos['email'], 'admin@test.com')
+        self.assertNotIn(self.usuario.password, repr(datos))
+        self.assertNotIn('password', datos)
+
+    def test_usuario_borrado(self):
+        self.client.get('/api/categorias/')
+        self.usuario.delete()
+        self.assertEqual(self.client.get('/api/categorias/').status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class LimpiarTokensTests(TestCase):
+    def test_borra_solo_tokens_vencidos(self):
+        usuario = Usuario.objects.create_user(email='admin@test.com', password='clave123', nombre='Admin', apellido='Test')
+        ahora = timezone.now()
+        vencidos = [
+            OutstandingToken.objects.create(user=usuario, jti=f'vencido{i}', token='t', expires_at=ahora - timedelta(days=1))
+            for i in range(3)
+        ]
+        vigente = OutstandingToken.objects.create(user=usuario, jti='vigente', token='t', expires_at=ahora + timedelta(days=1))
+        BlacklistedToken.objects.create(token=vencidos[0])
+        BlacklistedToken.objects.create(token=vigente)
+
+        call_command('limpiar_tokens', bloque=2, stdout=StringIO())
+        self.assertEqual(list(OutstandingToken.objects.values_list('jti', flat=True)), ['vigente'])
+        self.assertEqual(BlacklistedToken.objects.get().token, vigente)
+
 
-# Create your tests here.
+class UsuarioAdminTests(TestCase):
+    def test_formulario_de_edicion(self):
+        usuario = Usuario.objects.create_superuser(email='admin@test.com', password='clave123', nombre='Admin', apellido='Test')
+        self.client.force_login(usuario)
+        response = self.client.get(f'/admin/usuarios/usuario/{usuario.pk}/change/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertContains(response, 'admin@test.com')